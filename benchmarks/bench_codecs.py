@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+存储编解码器微基准
+
+比较 JSON 与 msgpack 两种格式的记录大小与编解码耗时，以及时间戳两种保存方式的解析耗时。
+
+用法::
+
+    python -m benchmarks.bench_codecs [--number 20000]
+"""
+
+import argparse
+import timeit
+from datetime import UTC, datetime
+
+from src.models.room import Room
+from src.models.user import User
+from src.repositories.codecs import JsonCodec, MsgpackCodec, decode_record, parse_timestamp, to_epoch_us
+
+
+def _samples() -> dict[str, dict]:
+    room = Room(room_id="1234", creator="o" * 28, players=[f"o{i:027d}" for i in range(8)])
+    room.words = {'civilian': "苹果", 'undercover': "香蕉"}
+    room.undercovers = room.players[2:4]
+    room_data = room.to_dict()
+    # 二进制格式直接保存 datetime，由 msgpack Timestamp 扩展类型编码
+    room_data['created_at'] = room.created_at
+    room_data['last_active'] = room.last_active
+    return {
+        'user': User(openid="o" * 28, nickname="小明", current_room="1234").to_dict(),
+        'room': room_data,
+    }
+
+
+def _per_op_us(stmt, number: int) -> float:
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--number', type=int, default=20000, help="每轮执行次数")
+    args = parser.parse_args()
+
+    print(f"{'record':<8}{'codec':<10}{'bytes':>8}{'encode µs':>12}{'decode µs':>12}")
+    for record, data in _samples().items():
+        for codec in (JsonCodec(), MsgpackCodec()):
+            raw = codec.encode(data)
+            encode = _per_op_us(lambda codec=codec, data=data: codec.encode(data), args.number)
+            decode = _per_op_us(lambda raw=raw: decode_record(raw), args.number)
+            print(f"{record:<8}{codec.name:<10}{len(raw):>8}{encode:>12.2f}{decode:>12.2f}")
+
+    now = datetime.now(UTC)
+    iso, epoch = now.isoformat(), str(to_epoch_us(now))
+    print()
+    print(f"{'timestamp':<18}{'bytes':>8}{'parse µs':>12}")
+    print(f"{'iso-8601':<18}{len(iso):>8}{_per_op_us(lambda: parse_timestamp(iso), args.number):>12.3f}")
+    print(f"{'epoch-us':<18}{len(epoch):>8}{_per_op_us(lambda: parse_timestamp(epoch), args.number):>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
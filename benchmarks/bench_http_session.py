@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+出站 HTTP 会话基准
+
+对本地 HTTP/1.1 服务发起请求，比较每次新建连接、wechatpy 默认会话与连接池会话的单次调用耗时和新建连接数。
+并发线程数超过默认连接池容量（10）时，默认会话会丢弃多出的连接并反复重建。
+
+用法::
+
+    python -m benchmarks.bench_http_session [--requests 2000] [--threads 16]
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from src.services.http_session import create_session
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    connections: set[tuple[str, int]] = set()
+
+    def do_GET(self):
+        _Handler.connections.add(self.client_address)
+        body = b'{"errcode":0,"errmsg":"ok"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _run(get, url: str, total: int, threads: int) -> tuple[float, int]:
+    """返回单次调用的平均耗时（微秒）与新建连接数"""
+    _Handler.connections.clear()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for response in executor.map(lambda _: get(url), range(total)):
+            response.raise_for_status()
+    elapsed = time.perf_counter() - started
+    return elapsed / total * 1e6 * threads, len(_Handler.connections)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=2000, help="每种方式的请求总数")
+    parser.add_argument('--threads', type=int, default=16, help="并发线程数")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/cgi-bin/user/info"
+
+    def new_connection(target):
+        return requests.get(target, headers={'Connection': 'close'}, timeout=5)
+
+    default_session = requests.Session()
+    pooled = create_session(pool_size=args.threads)
+    cases = {
+        'new connection': new_connection,
+        'default session': lambda target: default_session.get(target, timeout=5),
+        'pooled session': pooled.get,
+    }
+
+    print(f"{'client':<18}{'threads':>8}{'µs/call':>12}{'connections':>13}")
+    for threads in sorted({1, args.threads}):
+        for name, get in cases.items():
+            per_call, connections = _run(get, url, args.requests, threads)
+            print(f"{name:<18}{threads:>8}{per_call:>12.1f}{connections:>13}")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
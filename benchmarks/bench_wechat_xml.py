@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+微信消息 XML 解析与渲染微基准
+
+比较 wechatpy 通用路径（先解码为字符串，parse_message + create_reply().render()）
+与快速路径（直接解析字节，按模板渲染文本回复）每条消息的 CPU 耗时。
+
+用法::
+
+    python -m benchmarks.bench_wechat_xml [--number 20000]
+"""
+
+import argparse
+import time
+
+from wechatpy import parse_message
+from wechatpy.replies import create_reply
+
+from src.services.wechat_xml import parse_message as parse_fast, render_text_reply
+
+_MESSAGES = {
+    'text': (
+        "<xml><ToUserName><![CDATA[gh_0123456789ab]]></ToUserName>"
+        "<FromUserName><![CDATA[oAbCdEfGhIjKlMnOpQrStUvWxYz0]]></FromUserName>"
+        "<CreateTime>1700000000</CreateTime><MsgType><![CDATA[text]]></MsgType>"
+        "<Content><![CDATA[加入1234]]></Content><MsgId>24123456789012345</MsgId></xml>"
+    ).encode(),
+    'event': (
+        b"<xml><ToUserName><![CDATA[gh_0123456789ab]]></ToUserName>"
+        b"<FromUserName><![CDATA[oAbCdEfGhIjKlMnOpQrStUvWxYz0]]></FromUserName>"
+        b"<CreateTime>1700000000</CreateTime><MsgType><![CDATA[event]]></MsgType>"
+        b"<Event><![CDATA[subscribe]]></Event></xml>"
+    ),
+}
+
+_REPLY = "成功加入房间，当前房间人数：4\n\n房间号：1234\n房间状态：waiting\n房间成员：\n1. 小明(房主)\n2. 玩家2"
+
+
+def _wechatpy(data: bytes) -> str:
+    msg = parse_message(data.decode('utf-8'))
+    return create_reply(_REPLY, msg).render()
+
+
+def _fast(data: bytes) -> str:
+    msg = parse_fast(data)
+    return render_text_reply(msg, _REPLY)
+
+
+def _cpu_us(func, data: bytes, number: int) -> float:
+    """每条消息的 CPU 耗时（微秒），取 5 轮中的最小值"""
+    best = float('inf')
+    for _ in range(5):
+        started = time.process_time()
+        for _ in range(number):
+            func(data)
+        best = min(best, time.process_time() - started)
+    return best / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--number', type=int, default=20000, help="每轮处理的消息数")
+    args = parser.parse_args()
+
+    print(f"{'message':<10}{'wechatpy µs':>14}{'fast µs':>10}{'speedup':>10}")
+    for name, data in _MESSAGES.items():
+        slow = _cpu_us(_wechatpy, data, args.number)
+        fast = _cpu_us(_fast, data, args.number)
+        print(f"{name:<10}{slow:>14.2f}{fast:>10.2f}{slow / fast:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
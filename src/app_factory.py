@@ -8,14 +8,31 @@ import redis
 from flask import Flask
 
 from src.config.settings import settings
+from src.exceptions import RedisConnectionError, RepositoryException
+from src.repositories.codecs import get_codec
+from src.repositories.room_cache import RoomCache
+from src.repositories.room_id_allocator import RoomIdAllocator
 from src.repositories.room_repository import RoomRepository
+from src.repositories.unit_of_work import UnitOfWork
 from src.repositories.user_repository import UserRepository
+from src.services.async_reply import AsyncReplier
+from src.services.circuit_breaker import CircuitBreakers
 from src.services.exception_handler import register_global_exception_handlers
 from src.services.game_service import GameService
+from src.services.http_session import create_session
 from src.services.message_service import MessageService
+from src.services.nickname_service import NicknameService
+from src.services.push_dispatcher import PushDispatcher
+from src.services.push_queue import PushQueue
 from src.services.push_service import PushService
+from src.services.rate_limiter import RateLimiter
+from src.services.reply_cache import ReplyCache
+from src.services.reply_tracker import ReplyTracker
 from src.services.wechat_client import WeChatClient
-from src.utils.logger import setup_logger
+from src.services.wechat_crypto import MessageCrypto
+from src.utils.deadline import Deadline
+from src.utils.logger import log_exception, setup_logger
+from src.utils.metrics import registry as metrics_registry
 
 
 class AppFactory:
@@ -94,8 +111,27 @@ class AppFactory:
             redis_client = redis.Redis.from_url(app.config['REDIS_URL'])
         
         # 创建仓储
-        room_repo = RoomRepository(redis_client)
-        user_repo = UserRepository(redis_client)
+        room_cache = RoomCache(
+            max_size=app.config['ROOM_CACHE_SIZE'],
+            ttl_seconds=app.config['ROOM_CACHE_TTL_SECONDS'],
+            staleness_seconds=app.config['ROOM_CACHE_STALENESS_SECONDS']
+        )
+        room_repo = RoomRepository(redis_client, cache=room_cache)
+        user_repo = UserRepository(
+            redis_client,
+            codec=get_codec(app.config['STORAGE_CODEC']),
+            ttl_seconds=app.config['USER_TTL_SECONDS']
+        )
+        id_allocator = RoomIdAllocator(
+            redis_client,
+            min_digits=app.config['ROOM_ID_MIN_DIGITS'],
+            max_digits=app.config['ROOM_ID_MAX_DIGITS']
+        )
+        try:
+            # 启动时按批填满最少位数的号码；之后由房间过期任务维护号码池，号码池为空时分配会就地补充一批
+            id_allocator.replenish()
+        except (RepositoryException, RedisConnectionError) as e:
+            log_exception(app.logger, e, {'operation': 'replenish_room_ids'})
         
         # 创建服务
         client = None
@@ -107,11 +143,77 @@ class AppFactory:
             client = WeChatClient(
                 app.config['WECHAT_APP_ID'], 
                 app.config['WECHAT_APP_SECRET'],
-                redis_client=redis_client
+                redis_client=redis_client,
+                token_refresh_margin_seconds=app.config['WECHAT_TOKEN_REFRESH_MARGIN_SECONDS'],
+                http_session=create_session(
+                    pool_size=app.config['WECHAT_HTTP_POOL_SIZE'],
+                    connect_timeout=app.config['WECHAT_HTTP_CONNECT_TIMEOUT'],
+                    read_timeout=app.config['WECHAT_HTTP_READ_TIMEOUT'],
+                    max_retries=app.config['WECHAT_HTTP_MAX_RETRIES']
+                ),
+                breakers=CircuitBreakers(
+                    failure_threshold=app.config['WECHAT_BREAKER_FAILURE_THRESHOLD'],
+                    recovery_seconds=app.config['WECHAT_BREAKER_RECOVERY_SECONDS']
+                )
             )
-            push_service = PushService(client)
-        game_service = GameService(room_repo, user_repo, push_service)
-        message_service = MessageService(game_service, app.config['WECHAT_TOKEN'])
+            if app.config['PUSH_BACKEND'] == 'stream':
+                # 只负责入队，由推送消费任务发送
+                push_service = PushService(client, queue=PushQueue(redis_client))
+            else:
+                limiter = None
+                if app.config['PUSH_RATE_PER_SECOND'] > 0:
+                    limiter = RateLimiter(
+                        redis_client,
+                        rate_per_second=app.config['PUSH_RATE_PER_SECOND'],
+                        capacity=app.config['PUSH_RATE_BURST'],
+                        high_priority_reserve=app.config['PUSH_HIGH_PRIORITY_RESERVE']
+                    )
+                dispatcher = PushDispatcher(
+                    max_workers=app.config['PUSH_WORKERS'],
+                    max_queue=app.config['PUSH_QUEUE_SIZE'],
+                    limiter=limiter,
+                    throttle_timeout_seconds=app.config['PUSH_THROTTLE_TIMEOUT_SECONDS']
+                )
+                push_service = PushService(client, dispatcher=dispatcher)
+        nicknames = None
+        if push_service is not None:
+            nicknames = NicknameService(
+                redis_client,
+                push_service,
+                user_repo,
+                ttl_seconds=app.config['NICKNAME_CACHE_TTL_SECONDS']
+            )
+        game_service = GameService(
+            room_repo, user_repo, push_service, id_allocator=id_allocator, nicknames=nicknames
+        )
+        reply_cache = ReplyCache(redis_client, ttl_seconds=app.config['REPLY_CACHE_TTL_SECONDS'])
+        async_replies = None
+        if push_service is not None and app.config['ASYNC_REPLY_ENABLED']:
+            async_replies = AsyncReplier(
+                push_service,
+                commands=frozenset(filter(None, (c.strip() for c in app.config['ASYNC_REPLY_COMMANDS'].split(',')))),
+                cost_threshold_seconds=app.config['ASYNC_REPLY_COST_THRESHOLD_SECONDS'],
+                max_workers=app.config['ASYNC_REPLY_WORKERS']
+            )
+        reply_tracker = None
+        if app.config['REPLY_DELTA_ENABLED']:
+            reply_tracker = ReplyTracker(redis_client, ttl_seconds=app.config['REPLY_LAST_SEEN_TTL_SECONDS'])
+        crypto = None
+        if app.config['WECHAT_ENCODING_AES_KEY']:
+            # 安全模式：密钥与 Cipher 每个进程只准备一次
+            crypto = MessageCrypto(
+                app.config['WECHAT_TOKEN'], app.config['WECHAT_ENCODING_AES_KEY'], app.config['WECHAT_APP_ID']
+            )
+        message_service = MessageService(
+            game_service,
+            app.config['WECHAT_TOKEN'],
+            reply_cache=reply_cache,
+            async_replies=async_replies,
+            crypto=crypto,
+            reply_tracker=reply_tracker
+        )
+        # 健康检查展示熔断器状态
+        app.wechat_client = client
         
         return room_repo, user_repo, game_service, message_service
     
@@ -137,11 +239,49 @@ class AppFactory:
                     return '验证失败', 400
             else:
                 # 微信消息处理接口
-                xml_data = request.data.decode('utf-8')
-                response_xml = message_service.handle_wechat_message(xml_data)
+                # 截止时间从收到请求起计算并覆盖退出工作单元时的写回，写回时间从可选步骤的预算中预留；
+                # 剩余时间不足时跳过可选步骤，保证在微信的 5 秒内回复
+                with Deadline(
+                    app.config['REQUEST_DEADLINE_SECONDS'],
+                    reserve_seconds=app.config['REQUEST_COMMIT_RESERVE_SECONDS']
+                ):
+                    # 直接解析请求体字节，不先解码为字符串
+                    xml_data = request.data
+                    response_xml = None
+                    # 一次消息请求内每个用户/房间只加载一次，业务操作在回复成功前写回自己的修改
+                    try:
+                        with UnitOfWork():
+                            if request.args.get('encrypt_type') == 'aes':
+                                # 安全模式：解密、处理、加密回复
+                                response_xml = message_service.handle_encrypted_message(
+                                    xml_data,
+                                    request.args.get('msg_signature', ''),
+                                    request.args.get('timestamp', ''),
+                                    request.args.get('nonce', '')
+                                )
+                            else:
+                                response_xml = message_service.handle_wechat_message(xml_data)
+                    except (RepositoryException, RedisConnectionError) as e:
+                        if response_xml is None:
+                            raise
+                        # 退出时只剩清除失效房间指针等附带写入，失败不影响已生成的回复，下一次请求会重做
+                        log_exception(app.logger, e, {'operation': 'commit_unit_of_work'})
+                if response_xml is None:
+                    return '验证失败', 400
                 return Response(response_xml, mimetype='application/xml')
         
         @app.route('/health')
         def health_check():
-            """健康检查接口，可用于kube-probe"""
-            return {'status': 'healthy', 'timestamp': int(time.time())}
+            """健康检查接口，可用于kube-probe；微信接口熔断时仍返回 200，避免实例被反复重启"""
+            result = {'status': 'healthy', 'timestamp': int(time.time())}
+            client = getattr(app, 'wechat_client', None)
+            if client is not None:
+                result['circuits'] = client.breakers.snapshot()
+                if client.breakers.any_open():
+                    result['status'] = 'degraded'
+            return result
+        
+        @app.route('/metrics')
+        def metrics():
+            """进程内指标，Prometheus 文本格式"""
+            return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
@@ -71,7 +71,8 @@ HELP_MESSAGES = {
 ✅加入+房间号（例如：加入1234）
 ✅开始，房主开始游戏（至少3人）
 👑t+序号，房主投票给指定玩家（例如：t1）
-💡发送任意消息时，系统都会自动显示当前的游戏状态和您的词语
+🔍查看状态 / 查看词语，随时查看完整的游戏状态或您的词语
+💡游戏状态有变化时，回复会自动附带当前的游戏状态和您的词语
 """,
 
 "WELCOME": """欢迎您的关注👏
@@ -17,11 +17,83 @@ class Settings(BaseSettings):
     WECHAT_TOKEN: str = ""
     WECHAT_APP_ID: str = ""
     WECHAT_APP_SECRET: str = ""
+    # Safe-mode message encryption; empty = plaintext messages only
+    WECHAT_ENCODING_AES_KEY: str = ""
     ENABLE_WECHAT_PUSH: bool = False
+    # Shared access token is refreshed in the background once fewer than this many seconds remain
+    WECHAT_TOKEN_REFRESH_MARGIN_SECONDS: int = 600
+    # Outbound HTTP to the WeChat API: keep-alive pool size per host, connect/read timeouts,
+    # and retries (read errors and 5xx are retried for idempotent methods only)
+    WECHAT_HTTP_POOL_SIZE: int = 10
+    WECHAT_HTTP_CONNECT_TIMEOUT: float = 3.0
+    WECHAT_HTTP_READ_TIMEOUT: float = 5.0
+    WECHAT_HTTP_MAX_RETRIES: int = 2
+    # Per-operation circuit breaker (per process): opens after this many consecutive failures,
+    # then lets a single probe through once the recovery period has passed
+    WECHAT_BREAKER_FAILURE_THRESHOLD: int = 5
+    WECHAT_BREAKER_RECOVERY_SECONDS: float = 30.0
+    # Push fan-out runs on a bounded worker pool off the request thread
+    PUSH_WORKERS: int = 4
+    PUSH_QUEUE_SIZE: int = 1000
+    # thread: in-process pool above; stream: durable Redis Stream consumed by
+    # python -m src.jobs.push_worker
+    PUSH_BACKEND: str = "thread"
+    # Push worker: messages per batch, attempts before dead-lettering, first retry delay (doubles each time)
+    PUSH_BATCH_SIZE: int = 10
+    PUSH_MAX_ATTEMPTS: int = 5
+    PUSH_RETRY_BACKOFF_SECONDS: float = 2.0
+    # Shared Redis token bucket in front of the WeChat message API (all workers and pods);
+    # PUSH_HIGH_PRIORITY_RESERVE tokens are kept for word deliveries. 0 rate = unlimited
+    PUSH_RATE_PER_SECOND: float = 20.0
+    PUSH_RATE_BURST: int = 40
+    PUSH_HIGH_PRIORITY_RESERVE: int = 10
+    PUSH_THROTTLE_TIMEOUT_SECONDS: float = 10.0
+    # WeChat nicknames cached in Redis; misses are fetched in the background after the reply
+    NICKNAME_CACHE_TTL_SECONDS: int = 7 * 24 * 60 * 60
+    # Replies are kept this long so WeChat's retries of a slow message (MsgId) reuse the first reply
+    REPLY_CACHE_TTL_SECONDS: int = 30
+    # Delta replies: the status/word block is appended only when the room version changed since the
+    # user's last full reply ("查看状态" always shows it). Last-seen versions expire after the TTL
+    REPLY_DELTA_ENABLED: bool = True
+    REPLY_LAST_SEEN_TTL_SECONDS: int = 24 * 60 * 60
+    # Async replies (requires push): matching commands are acked with "success" and their result is
+    # pushed from a background pool. Commands listed in ASYNC_REPLY_COMMANDS (comma-separated:
+    # help, create_room, join_room, start_game, vote) always go async; others switch once their
+    # moving-average latency exceeds the threshold (0 = never switch automatically)
+    ASYNC_REPLY_ENABLED: bool = False
+    ASYNC_REPLY_COMMANDS: str = "start_game"
+    ASYNC_REPLY_COST_THRESHOLD_SECONDS: float = 2.0
+    ASYNC_REPLY_WORKERS: int = 4
+    # Budget of each webhook request, counted from its arrival; optional stages (status/word append,
+    # synchronous nickname lookup, status push) are skipped when less time remains. 0 = no deadline
+    REQUEST_DEADLINE_SECONDS: float = 4.5
+    # Part of the budget kept free of optional stages for the unit-of-work flush at the end of the request
+    REQUEST_COMMIT_RESERVE_SECONDS: float = 0.3
 
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    # Room cache (in-process LRU, validated by per-room version)
+    ROOM_CACHE_SIZE: int = 1024
+    ROOM_CACHE_TTL_SECONDS: float = 60.0
+    # 0 = always validate the version against Redis before reuse
+    ROOM_CACHE_STALENESS_SECONDS: float = 0.0
+
+    # Room IDs start at ROOM_ID_MIN_DIGITS digits (pool filled at startup); the room expiry job
+    # widens the pool in batches when free IDs run low, up to ROOM_ID_MAX_DIGITS
+    ROOM_ID_MIN_DIGITS: int = 4
+    ROOM_ID_MAX_DIGITS: int = 6
+
+    # Safety-net sweep interval of the room expiry job (python -m src.jobs.room_expiry)
+    ROOM_EXPIRY_SWEEP_SECONDS: float = 60.0
+
+    # Idle TTL of user records, refreshed on every read by ID and every write; 0 = never expire
+    USER_TTL_SECONDS: int = 30 * 24 * 60 * 60
+
+    # Storage codec for user records: msgpack (compact binary) or json (legacy)
+    # Both formats are always readable; this only selects the format written
+    STORAGE_CODEC: str = "msgpack"
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
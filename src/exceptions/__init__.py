@@ -48,6 +48,7 @@ from src.exceptions.client import (
 # ============================================================================
 from src.exceptions.server import (
     CacheError,
+    CircuitOpenError,
     DataAccessError,
     ExternalServiceException,
     RedisConnectionError,
@@ -70,7 +71,7 @@ __all__ = [
 
     # 服务端
     'RepositoryException', 'DataAccessError', 'SerializationError', 'CacheError',
-    'ExternalServiceException', 'WeChatAPIError', 'RedisConnectionError',
+    'ExternalServiceException', 'WeChatAPIError', 'CircuitOpenError', 'RedisConnectionError',
 
     # 客户端
     'ValidationException', 'InvalidInputError', 'InvalidCommandError',
@@ -47,6 +47,16 @@ class WeChatAPIError(ExternalServiceException):
         )
 
 
+class CircuitOpenError(ExternalServiceException):
+    """微信接口熔断中，调用被直接拒绝"""
+    def __init__(self, operation: str):
+        super().__init__(
+            message="微信服务暂时不可用，请稍后重试",
+            error_code="SYS-EXTERNAL-003",
+            details={'operation': operation}
+        )
+
+
 class RedisConnectionError(ExternalServiceException):
     """Redis 数据库连接失败"""
     def __init__(self, operation: str, cause: Exception | None = None):
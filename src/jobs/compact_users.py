@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+用户记录压缩任务
+以 SCAN 分批遍历 user:* 键，删除（可先归档）长期不活跃的用户，并为没有过期时间的旧记录补上闲置过期时间
+
+- 已设置过期时间的记录交由 Redis 自动清除，不做处理
+- 最后活跃时间早于闲置阈值的记录被删除；删除前比对内容，期间被更新的记录不会被误删
+- 缺少最后活跃时间的旧记录无法判断是否活跃，只补上过期时间，之后由读写刷新
+
+用法::
+
+    python -m src.jobs.compact_users [--max-idle-days 30] [--archive users.jsonl] [--dry-run]
+"""
+
+import argparse
+import sys
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import TextIO
+
+import redis
+
+from src.config.settings import settings
+from src.models.user import User
+from src.repositories.codecs import decode_record, json_dumps
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# 仅当内容未变化时删除
+_COMPARE_AND_DELETE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass
+class CompactionReport:
+    """压缩结果统计"""
+    scanned: int = 0
+    deleted: int = 0
+    archived: int = 0
+    ttl_applied: int = 0
+    skipped: int = 0
+    bytes_reclaimed: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"扫描 {self.scanned} 个键，删除 {self.deleted} 个（归档 {self.archived} 个），"
+            f"补充过期时间 {self.ttl_applied} 个，跳过 {self.skipped} 个，回收约 {self.bytes_reclaimed} 字节"
+        )
+
+
+class UserCompactor:
+    """用户记录压缩器"""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        max_idle_seconds: int,
+        ttl_seconds: int = 0,
+        batch_size: int = 500,
+        archive: TextIO | None = None,
+        dry_run: bool = False,
+    ):
+        self.redis = redis_client
+        self.max_idle_seconds = max_idle_seconds
+        self.ttl_seconds = ttl_seconds
+        self.batch_size = batch_size
+        self.archive = archive
+        self.dry_run = dry_run
+        self._compare_and_delete = redis_client.register_script(_COMPARE_AND_DELETE)
+        self._memory_usage_supported = True
+
+    def run(self) -> CompactionReport:
+        """执行一次完整遍历"""
+        report = CompactionReport()
+        cursor = 0
+        while True:
+            cursor, keys = self.redis.scan(cursor, match="user:*", count=self.batch_size)
+            if keys:
+                self._compact_batch(keys, report)
+            if cursor == 0:
+                return report
+
+    def _compact_batch(self, keys: list, report: CompactionReport) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.ttl(key)
+            pipe.get(key)
+        results = pipe.execute()
+        sizes = self._sizes(keys, results[1::2])
+        now = datetime.now(UTC)
+
+        for key, ttl, payload, size in zip(keys, results[::2], results[1::2], sizes, strict=True):
+            report.scanned += 1
+            if payload is None or ttl != -1:
+                # 已过期或已有过期时间
+                report.skipped += 1
+                continue
+            try:
+                user = User.from_dict(decode_record(payload))
+            except (TypeError, ValueError, KeyError) as e:
+                logger.warning(f"无法解析的用户记录，跳过: {key!r} ({e})")
+                report.skipped += 1
+                continue
+
+            idle_seconds = (now - user.last_active).total_seconds() if user.last_active else None
+            if idle_seconds is not None and idle_seconds >= self.max_idle_seconds and not user.has_joined_room():
+                self._delete(key, payload, user, size, report)
+            elif self.ttl_seconds:
+                remaining = self.ttl_seconds - int(idle_seconds or 0)
+                if not self.dry_run:
+                    self.redis.expire(key, max(remaining, 1), nx=True)
+                report.ttl_applied += 1
+            else:
+                report.skipped += 1
+
+    def _delete(self, key, payload: bytes, user: User, size: int, report: CompactionReport) -> None:
+        if self.dry_run:
+            deleted = True
+        else:
+            deleted = bool(self._compare_and_delete(keys=[key], args=[payload]))
+        if not deleted:
+            # 扫描后被更新，说明用户重新活跃
+            report.skipped += 1
+            return
+        if self.archive is not None:
+            self.archive.write(json_dumps(user.to_dict()) + "\n")
+            report.archived += 1
+        report.deleted += 1
+        report.bytes_reclaimed += size
+
+    def _sizes(self, keys: list, payloads: list) -> list[int]:
+        """估算每个键占用的内存，Redis 不支持 MEMORY USAGE 时退回键与值的长度之和"""
+        if self._memory_usage_supported:
+            pipe = self.redis.pipeline(transaction=False)
+            for key in keys:
+                pipe.memory_usage(key)
+            try:
+                return [usage or 0 for usage in pipe.execute()]
+            except redis.ResponseError:
+                self._memory_usage_supported = False
+        return [len(key) + len(payload or b'') for key, payload in zip(keys, payloads, strict=True)]
+
+
+def main(argv: list[str] | None = None) -> CompactionReport:
+    """任务入口"""
+    default_idle_days = settings.USER_TTL_SECONDS / 86400 if settings.USER_TTL_SECONDS else 30
+    parser = argparse.ArgumentParser(description="删除或归档长期不活跃的用户记录")
+    parser.add_argument('--max-idle-days', type=float, default=default_idle_days, help="闲置多少天视为不活跃")
+    parser.add_argument('--batch-size', type=int, default=500, help="每批 SCAN 的键数量")
+    parser.add_argument('--archive', help="删除前将用户记录以 JSON Lines 追加写入该文件")
+    parser.add_argument('--dry-run', action='store_true', help="只统计，不修改数据")
+    args = parser.parse_args(argv)
+
+    archive = open(args.archive, 'a', encoding='utf-8') if args.archive else None
+    try:
+        compactor = UserCompactor(
+            redis.Redis.from_url(settings.REDIS_URL),
+            max_idle_seconds=int(args.max_idle_days * 86400),
+            ttl_seconds=settings.USER_TTL_SECONDS,
+            batch_size=args.batch_size,
+            archive=archive,
+            dry_run=args.dry_run,
+        )
+        report = compactor.run()
+    finally:
+        if archive is not None:
+            archive.close()
+
+    logger.info(report.summary())
+    print(report.summary(), file=sys.stdout)
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+推送消费任务
+常驻运行，消费持久化推送队列并调用微信接口发送；可按推送量独立扩容，多个实例组成同一消费组
+
+用法::
+
+    python -m src.jobs.push_worker
+"""
+
+import os
+import signal
+import socket
+import threading
+
+import redis
+
+from src.config.settings import settings
+from src.services.circuit_breaker import CircuitBreakers
+from src.services.http_session import create_session
+from src.services.push_queue import PushQueue
+from src.services.push_worker import PushWorker
+from src.services.rate_limiter import RateLimiter
+from src.services.wechat_client import WeChatClient
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def main():
+    """任务入口"""
+    redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    client = WeChatClient(
+        settings.WECHAT_APP_ID,
+        settings.WECHAT_APP_SECRET,
+        redis_client=redis_client,
+        token_refresh_margin_seconds=settings.WECHAT_TOKEN_REFRESH_MARGIN_SECONDS,
+        http_session=create_session(
+            pool_size=settings.WECHAT_HTTP_POOL_SIZE,
+            connect_timeout=settings.WECHAT_HTTP_CONNECT_TIMEOUT,
+            read_timeout=settings.WECHAT_HTTP_READ_TIMEOUT,
+            max_retries=settings.WECHAT_HTTP_MAX_RETRIES,
+        ),
+        breakers=CircuitBreakers(
+            failure_threshold=settings.WECHAT_BREAKER_FAILURE_THRESHOLD,
+            recovery_seconds=settings.WECHAT_BREAKER_RECOVERY_SECONDS,
+        ),
+    )
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+    limiter = None
+    if settings.PUSH_RATE_PER_SECOND > 0:
+        limiter = RateLimiter(
+            redis_client,
+            rate_per_second=settings.PUSH_RATE_PER_SECOND,
+            capacity=settings.PUSH_RATE_BURST,
+            high_priority_reserve=settings.PUSH_HIGH_PRIORITY_RESERVE,
+        )
+    worker = PushWorker(
+        PushQueue(redis_client),
+        client,
+        consumer,
+        batch_size=settings.PUSH_BATCH_SIZE,
+        max_attempts=settings.PUSH_MAX_ATTEMPTS,
+        backoff_seconds=settings.PUSH_RETRY_BACKOFF_SECONDS,
+        limiter=limiter,
+        throttle_timeout_seconds=settings.PUSH_THROTTLE_TIMEOUT_SECONDS,
+    )
+
+    # 收到终止信号后处理完当前批次再退出，未处理的消息留在队列中
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+
+    logger.info(f"推送消费任务启动: {consumer}")
+    worker.run(stop_event)
+    logger.info(f"推送消费任务退出: {consumer}")
+
+
+if __name__ == '__main__':
+    main()
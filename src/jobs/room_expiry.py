@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+房间过期处理任务
+常驻运行，清除过期房间成员的当前房间并归还房间号，按批回收与填充房间号池
+
+用法::
+
+    python -m src.jobs.room_expiry
+"""
+
+import redis
+
+from src.config.settings import settings
+from src.repositories.codecs import get_codec
+from src.repositories.room_id_allocator import RoomIdAllocator
+from src.repositories.room_repository import RoomRepository
+from src.repositories.user_repository import UserRepository
+from src.services.room_expiry_service import RoomExpiryService
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def main():
+    """任务入口"""
+    redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    service = RoomExpiryService(
+        RoomRepository(redis_client),
+        UserRepository(
+            redis_client, codec=get_codec(settings.STORAGE_CODEC), ttl_seconds=settings.USER_TTL_SECONDS
+        ),
+        RoomIdAllocator(redis_client, min_digits=settings.ROOM_ID_MIN_DIGITS, max_digits=settings.ROOM_ID_MAX_DIGITS),
+    )
+    logger.info("房间过期处理任务启动")
+    service.run(redis_client, sweep_interval_seconds=settings.ROOM_EXPIRY_SWEEP_SECONDS)
+
+
+if __name__ == '__main__':
+    main()
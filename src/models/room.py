@@ -4,7 +4,7 @@
 定义房间的数据结构和相关操作
 """
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from datetime import UTC, datetime
 from enum import Enum
 from typing import Any
@@ -30,6 +30,8 @@ class Room:
     eliminated: list[str] = field(default_factory=list)
     created_at: datetime = field(default_factory=lambda: datetime.now(UTC))
     last_active: datetime = field(default_factory=lambda: datetime.now(UTC))
+    # 存储版本号，每次写入递增，由仓储维护，不参与序列化
+    version: int = field(default=0, compare=False)
     
     def __post_init__(self):
         """初始化后自动将创建者添加到玩家列表"""
@@ -59,9 +61,9 @@ class Room:
         # 处理枚举类型
         status = RoomStatus(data.get('status', 'waiting'))
         
-        # 处理时间戳
-        created_at = datetime.fromisoformat(data.get('created_at', datetime.now(UTC).isoformat()))
-        last_active = datetime.fromisoformat(data.get('last_active', datetime.now(UTC).isoformat()))
+        # 处理时间戳，已是 datetime 的值（由存储层解码）直接使用
+        created_at = cls._to_datetime(data.get('created_at'))
+        last_active = cls._to_datetime(data.get('last_active'))
         
         return cls(
             room_id=data.get('room_id', ''),
@@ -76,6 +78,25 @@ class Room:
             last_active=last_active
         )
     
+    @staticmethod
+    def _to_datetime(value: datetime | str | None) -> datetime:
+        """将 ISO-8601 字符串转换为时间，缺失时取当前时间"""
+        if value is None:
+            return datetime.now(UTC)
+        if isinstance(value, datetime):
+            return value
+        return datetime.fromisoformat(value)
+
+    def clone(self) -> 'Room':
+        """创建独立副本，列表与词语字典不与原对象共享"""
+        return replace(
+            self,
+            players=list(self.players),
+            words=dict(self.words) if self.words is not None else None,
+            undercovers=list(self.undercovers),
+            eliminated=list(self.eliminated),
+        )
+    
     def is_creator(self, user_id: str) -> bool:
         """检查用户是否为房主"""
         return self.creator == user_id
@@ -4,7 +4,8 @@
 定义用户的数据结构和相关操作
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime
 from typing import Any
 
 
@@ -14,22 +15,29 @@ class User:
     openid: str
     nickname: str = ""
     current_room: str | None = None
+    # 最后一次写入的时间，由仓储维护，旧记录中可能缺失
+    last_active: datetime | None = field(default=None, compare=False)
     
     def to_dict(self) -> dict[str, Any]:
         """转换为字典格式，用于存储到Redis"""
         return {
             'openid': self.openid,
             'nickname': self.nickname,
-            'current_room': self.current_room
+            'current_room': self.current_room,
+            'last_active': self.last_active
         }
     
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> 'User':
         """从字典数据创建用户实例"""
+        last_active = data.get('last_active')
+        if isinstance(last_active, str):
+            last_active = datetime.fromisoformat(last_active)
         return cls(
             openid=data.get('openid', ''),
             nickname=data.get('nickname', ''),
-            current_room=data.get('current_room')
+            current_room=data.get('current_room'),
+            last_active=last_active
         )
     
     def join_room(self, room_id: str) -> None:
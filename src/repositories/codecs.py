@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+实体存储编解码器
+负责实体字典与 Redis 中字节串之间的转换
+
+- JsonCodec: 旧格式，JSON 文本，时间戳为 ISO-8601 字符串
+- MsgpackCodec: 紧凑二进制格式，首字节为格式版本号，时间戳以 msgpack Timestamp 扩展类型（纪元整数）保存
+
+读取时按首字节自动识别格式，旧 JSON 记录仍可解码，并在下次写入时以当前编解码器的格式写回
+"""
+
+import json
+from datetime import UTC, datetime, timedelta
+from typing import Any, Protocol
+
+import msgpack
+
+# 二进制格式版本号，写在记录的首字节；JSON 文档总是以 '{' 开头，不会与之冲突
+MSGPACK_V1 = 0x01
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class Codec(Protocol):
+    """编解码器接口"""
+
+    name: str
+
+    def encode(self, data: dict[str, Any]) -> bytes:
+        """将实体字典编码为字节串"""
+        ...
+
+    def decode(self, raw: bytes) -> dict[str, Any]:
+        """将字节串解码为实体字典"""
+        ...
+
+
+class JsonCodec:
+    """JSON 编解码器（旧格式）"""
+
+    name = "json"
+
+    def encode(self, data: dict[str, Any]) -> bytes:
+        return json_dumps(data).encode('utf-8')
+
+    def decode(self, raw: bytes) -> dict[str, Any]:
+        return json.loads(raw)
+
+
+class MsgpackCodec:
+    """msgpack 编解码器，带格式版本号"""
+
+    name = "msgpack"
+
+    def encode(self, data: dict[str, Any]) -> bytes:
+        return bytes((MSGPACK_V1,)) + msgpack.packb(data, datetime=True)
+
+    def decode(self, raw: bytes) -> dict[str, Any]:
+        if raw[0] != MSGPACK_V1:
+            raise ValueError(f"不支持的存储格式版本: {raw[0]}")
+        return msgpack.unpackb(raw[1:], timestamp=3)
+
+
+CODECS: dict[str, Codec] = {codec.name: codec for codec in (JsonCodec(), MsgpackCodec())}
+
+
+def get_codec(name: str) -> Codec:
+    """
+    按名称获取编解码器
+
+    Raises:
+        ValueError: 未知的编解码器名称
+    """
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"未知的存储编解码器: {name}") from None
+
+
+def decode_record(raw: bytes | str) -> dict[str, Any]:
+    """
+    按首字节识别格式并解码记录，兼容旧 JSON 记录
+
+    Raises:
+        ValueError: 数据格式无法识别或已损坏
+    """
+    if isinstance(raw, str):
+        raw = raw.encode('utf-8')
+    if not raw:
+        raise ValueError("空记录")
+    if raw[:1] == b'{':
+        return CODECS['json'].decode(raw)
+    return CODECS['msgpack'].decode(raw)
+
+
+def json_dumps(value: Any) -> str:
+    """以 UTF-8 原文（不转义中文）序列化为 JSON"""
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+
+def to_epoch_us(value: datetime) -> int:
+    """将带时区的时间转换为纪元微秒整数，不经过浮点运算，保证精度"""
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def parse_timestamp(value: Any) -> datetime:
+    """
+    解析存储中的时间戳，支持 datetime、纪元微秒整数（或其字符串）与旧的 ISO-8601 字符串
+
+    Raises:
+        ValueError: 无法解析的时间戳
+    """
+    if isinstance(value, bytes):
+        value = value.decode('utf-8')
+    if isinstance(value, str):
+        if value.isdigit():
+            return _EPOCH + int(value) * _MICROSECOND
+        return datetime.fromisoformat(value)
+    if isinstance(value, int):
+        return _EPOCH + value * _MICROSECOND
+    if isinstance(value, datetime):
+        return value
+    raise ValueError(f"无法解析的时间戳: {value!r}")
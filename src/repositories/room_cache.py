@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+进程内房间缓存
+以 LRU 方式保存反序列化后的房间对象，命中后只需比对 Redis 中的版本号即可复用
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from src.models.room import Room
+
+
+@dataclass
+class CachedRoom:
+    """缓存条目"""
+    room: Room
+    version: int
+    loaded_at: float
+    validated_at: float
+
+
+class RoomCache:
+    """
+    有界、带过期时间的房间 LRU 缓存
+
+    - 条目超过 ttl_seconds 未重新加载即被淘汰
+    - 在 staleness_seconds 内校验过版本的条目可直接使用，不再访问 Redis；
+      设为 0 时每次读取都会校验版本，保证多个 worker 之间的一致性
+    - 缓存中保存的是私有副本，读取时返回新的副本，调用方修改不会污染缓存
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 60.0, staleness_seconds: float = 0.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.staleness_seconds = staleness_seconds
+        self._entries: OrderedDict[str, CachedRoom] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, room_id: str) -> CachedRoom | None:
+        """查找未过期的缓存条目"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(room_id)
+            if entry is None:
+                return None
+            if now - entry.loaded_at > self.ttl_seconds:
+                del self._entries[room_id]
+                return None
+            self._entries.move_to_end(room_id)
+            return entry
+
+    def is_fresh(self, entry: CachedRoom) -> bool:
+        """条目是否仍处于免校验的时间窗口内"""
+        return time.monotonic() - entry.validated_at <= self.staleness_seconds
+
+    def mark_validated(self, entry: CachedRoom) -> None:
+        """记录条目刚刚通过了版本校验"""
+        entry.validated_at = time.monotonic()
+
+    def put(self, room: Room) -> None:
+        """缓存房间的副本，版本号取自 room.version"""
+        now = time.monotonic()
+        entry = CachedRoom(room=room.clone(), version=room.version, loaded_at=now, validated_at=now)
+        with self._lock:
+            self._entries[room.room_id] = entry
+            self._entries.move_to_end(room.room_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, room_id: str) -> None:
+        """移除缓存条目"""
+        with self._lock:
+            self._entries.pop(room_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+房间号分配器
+从预先填充的空闲号码池中一次原子操作取出房间号，取代“随机生成 + 检查是否存在”的探测方式
+
+- {room:ids}:free    空闲号码集合，SPOP 随机取出，等价于从预先洗牌的号码池中依次取号
+- {room:ids}:leased  已分配号码的有序集合，分值为分配或最近一次确认房间仍存在的时间（毫秒）
+- {room:ids}:cursor  下一个待填充的号码；号码按数值递增填充，越过 10^n 即进入 n+1 位
+
+号码池的填充与回收通常不在分配路径上：应用启动时填满最少位数的号码，之后由房间过期任务定期
+按批回收房间已不存在的号码，并在空闲号码低于水位时继续填充（即自动增加一位），直至配置的上限。
+过期任务未运行或来不及维护时，分配遇到空号码池会先回收、填充一批再重试一次。
+每批只处理固定数量的号码，Redis 不会因为一次填充或回收而长时间阻塞
+
+房间删除或过期后号码才归还号码池；键名带相同的哈希标签，脚本只访问 KEYS 中声明的键，兼容 Redis Cluster
+"""
+
+import time
+
+import redis
+
+from src.exceptions import DataAccessError, RedisConnectionError
+from src.utils.logger import log_exception, setup_logger
+
+logger = setup_logger(__name__)
+
+# KEYS: 空闲集合, 已分配集合; ARGV[1]=当前毫秒时间；返回房间号，号码池为空时返回 nil
+ALLOCATE = """
+local room_id = redis.call('SPOP', KEYS[1])
+if not room_id then
+    return false
+end
+redis.call('ZADD', KEYS[2], ARGV[1], room_id)
+return room_id
+"""
+
+# ARGV[1]=房间号；只有已分配的号码才会归还，重复释放无副作用
+RELEASE = """
+if redis.call('ZREM', KEYS[2], ARGV[1]) == 1 then
+    redis.call('SADD', KEYS[1], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+# KEYS: 空闲集合, 已分配集合, 填充游标
+# ARGV[1]=读取到的游标（未初始化为空串）, ARGV[2]=新游标, ARGV[3]=当前毫秒时间, ARGV[4]=空闲号码数量,
+# 之后依次为空闲号码与已被房间占用的号码；游标已被其他进程推进时不做任何修改并返回 -1
+FILL = """
+if (redis.call('GET', KEYS[3]) or '') ~= ARGV[1] then
+    return -1
+end
+local free_count = tonumber(ARGV[4])
+for i = 5, 4 + free_count, 1000 do
+    redis.call('SADD', KEYS[1], unpack(ARGV, i, math.min(i + 999, 4 + free_count)))
+end
+for i = 5 + free_count, #ARGV do
+    redis.call('ZADD', KEYS[2], ARGV[3], ARGV[i])
+end
+redis.call('SET', KEYS[3], ARGV[2])
+return free_count
+"""
+
+# KEYS: 空闲集合, 已分配集合
+# ARGV[1]=回收截止分值, ARGV[2]=当前毫秒时间, ARGV[3]=房间已不存在的号码数量，之后依次为这些号码与房间仍存在的号码
+# 房间已不存在且分配时间仍早于截止分值的号码归还号码池；房间仍存在的号码刷新分值，下一批不再扫描
+RECLAIM = """
+local cutoff = tonumber(ARGV[1])
+local gone = tonumber(ARGV[3])
+local reclaimed = 0
+for i = 4, 3 + gone do
+    local score = redis.call('ZSCORE', KEYS[2], ARGV[i])
+    if score and tonumber(score) < cutoff then
+        redis.call('ZREM', KEYS[2], ARGV[i])
+        redis.call('SADD', KEYS[1], ARGV[i])
+        reclaimed = reclaimed + 1
+    end
+end
+for i = 4 + gone, #ARGV do
+    redis.call('ZADD', KEYS[2], 'XX', ARGV[2], ARGV[i])
+end
+return reclaimed
+"""
+
+
+class RoomIdAllocator:
+    """房间号分配器"""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        min_digits: int = 4,
+        max_digits: int = 6,
+        reclaim_grace_seconds: float = 60.0,
+        low_water: int = 1000,
+        batch_size: int = 1000,
+    ):
+        """
+        Args:
+            redis_client: Redis 客户端
+            min_digits: 最少位数，启动时填满该位数的所有号码
+            max_digits: 最多位数
+            reclaim_grace_seconds: 回收宽限秒数
+            low_water: 空闲号码低于该数量时继续填充更多位数的号码
+            batch_size: 每批填充或回收的号码数量
+        """
+        self.redis = redis_client
+        self.min_digits = min_digits
+        self.max_digits = max_digits
+        # 号码分配后到房间写入前有短暂间隔，宽限期内的号码即使房间不存在也不回收
+        self.reclaim_grace_ms = int(reclaim_grace_seconds * 1000)
+        self.low_water = low_water
+        self.batch_size = batch_size
+        self.room_prefix = "room:"
+        self.free_key = "{room:ids}:free"
+        self.leased_key = "{room:ids}:leased"
+        self.cursor_key = "{room:ids}:cursor"
+        self._allocate_script = redis_client.register_script(ALLOCATE)
+        self._release_script = redis_client.register_script(RELEASE)
+        self._fill_script = redis_client.register_script(FILL)
+        self._reclaim_script = redis_client.register_script(RECLAIM)
+
+    def allocate(self) -> str:
+        """
+        分配一个空闲的房间号
+
+        Returns:
+            房间号
+
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 号码池为空或其他数据访问错误
+        """
+        room_id = self._pop()
+        if room_id is None:
+            # 号码池已空：就地回收、填充一批后重试一次，不依赖过期任务
+            logger.warning("号码池为空，分配时补充一批号码")
+            self.reclaim(max_batches=1)
+            self.replenish(max_batches=1)
+            room_id = self._pop()
+        if room_id is None:
+            error = DataAccessError(
+                message="房间号已耗尽",
+                error_code="REPO-DATA-002",
+                details={'max_digits': self.max_digits}
+            )
+            log_exception(logger, error)
+            raise error
+        logger.debug("房间号分配成功", extra={'room_id': room_id})
+        return room_id
+
+    def _pop(self) -> str | None:
+        """从号码池取出一个号码并登记为已分配，号码池为空时返回 None"""
+        room_id = self._run(
+            self._allocate_script, "分配房间号", [self.free_key, self.leased_key], [self._now_ms()]
+        )
+        if isinstance(room_id, bytes):
+            room_id = room_id.decode('utf-8')
+        return room_id
+
+    def release(self, room_id: str) -> bool:
+        """
+        将房间号归还号码池，调用方须确保房间已删除或已过期
+
+        Args:
+            room_id: 房间号
+
+        Returns:
+            号码是否由本次调用归还
+
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 其他数据访问错误
+        """
+        released = bool(self._run(
+            self._release_script, "释放房间号", [self.free_key, self.leased_key], [room_id]
+        ))
+        if released:
+            logger.debug("房间号已归还", extra={'room_id': room_id})
+        return released
+
+    def replenish(self, max_batches: int | None = None) -> int:
+        """
+        按批填充号码池：先填满最少位数的号码，之后空闲号码低于水位时继续填充更多位数的号码
+
+        多个进程同时填充时每批只有一个进程生效
+
+        Args:
+            max_batches: 最多填充的批数，None 表示填充到无需继续为止
+
+        Returns:
+            本次加入号码池的号码数量
+
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 其他数据访问错误
+        """
+        added = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            batches += 1
+            raw = self._call("读取号码池", self.redis.get, self.cursor_key)
+            cursor = int(raw) if raw else 10 ** (self.min_digits - 1)
+            if cursor >= 10 ** self.max_digits:
+                break
+            if cursor >= 10 ** self.min_digits and self._free_count() >= self.low_water:
+                break
+            added += max(0, self._fill(raw.decode('utf-8') if raw else '', cursor))
+        if added:
+            logger.info("号码池已填充", extra={'added': added})
+        return added
+
+    def reclaim(self, max_batches: int | None = None) -> int:
+        """
+        按批回收房间已不存在但未释放的号码
+
+        Args:
+            max_batches: 最多处理的批数，None 表示处理到没有待回收的号码为止
+
+        Returns:
+            回收的号码数量
+
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 其他数据访问错误
+        """
+        now = self._now_ms()
+        cutoff = now - self.reclaim_grace_ms
+        reclaimed = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            batches += 1
+            # 房间仍存在的号码在本批中刷新为当前时间，不小于截止分值，下一批不会再次取到
+            candidates = self._call(
+                "回收房间号", self.redis.zrangebyscore, self.leased_key, '-inf', f"({cutoff}", 0, self.batch_size
+            )
+            if not candidates:
+                break
+            room_ids = [c.decode('utf-8') if isinstance(c, bytes) else c for c in candidates]
+            exists = self._exists(room_ids)
+            gone = [room_id for room_id, found in zip(room_ids, exists, strict=True) if not found]
+            alive = [room_id for room_id, found in zip(room_ids, exists, strict=True) if found]
+            reclaimed += int(self._run(
+                self._reclaim_script, "回收房间号", [self.free_key, self.leased_key],
+                [cutoff, now, len(gone), *gone, *alive]
+            ))
+            if len(room_ids) < self.batch_size:
+                break
+        if reclaimed:
+            logger.info("回收过期房间号", extra={'count': reclaimed})
+        return reclaimed
+
+    def _fill(self, expected: str, cursor: int) -> int:
+        """填充从游标开始的一批号码，已被房间占用的号码直接登记为已分配"""
+        # 一批不跨越位数，只在空闲号码不足时才进入更多位数
+        end = min(cursor + self.batch_size, 10 ** len(str(cursor)), 10 ** self.max_digits)
+        room_ids = [str(i) for i in range(cursor, end)]
+        exists = self._exists(room_ids)
+        free = [room_id for room_id, found in zip(room_ids, exists, strict=True) if not found]
+        taken = [room_id for room_id, found in zip(room_ids, exists, strict=True) if found]
+        return int(self._run(
+            self._fill_script, "填充号码池", [self.free_key, self.leased_key, self.cursor_key],
+            [expected, end, self._now_ms(), len(free), *free, *taken]
+        ))
+
+    def _free_count(self) -> int:
+        return self._call("读取号码池", self.redis.scard, self.free_key)
+
+    def _exists(self, room_ids: list[str]) -> list[bool]:
+        """以一次流水线检查一批房间是否存在"""
+        def check():
+            pipe = self.redis.pipeline(transaction=False)
+            for room_id in room_ids:
+                pipe.exists(f"{self.room_prefix}{room_id}")
+            return [bool(found) for found in pipe.execute()]
+        return self._call("检查房间是否存在", check)
+
+    @staticmethod
+    def _now_ms() -> int:
+        return int(time.time() * 1000)
+
+    def _run(self, script, operation: str, keys: list[str], args: list):
+        return self._call(operation, lambda: script(keys=keys, args=args))
+
+    @staticmethod
+    def _call(operation: str, func, *args):
+        try:
+            return func(*args)
+
+        except redis.ConnectionError as e:
+            error = RedisConnectionError(operation, cause=e)
+            log_exception(logger, error)
+            raise error from e
+
+        except Exception as e:
+            error = DataAccessError(
+                message=f"{operation}失败",
+                error_code="REPO-DATA-001",
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
@@ -2,15 +2,25 @@
 """
 房间仓储类
 负责房间数据的持久化操作
+
+房间以 Redis 哈希存储，小的修改（加入玩家、淘汰、切换状态、刷新活跃时间）只写入变化的字段；
+旧版本以 JSON 字符串保存的房间在首次读写时自动迁移为哈希。
+时间戳以纪元微秒整数保存，旧的 ISO-8601 字符串仍可读取，并在下次写入时被替换
 """
 
 import json
+import random
+from datetime import UTC, datetime
 
 import redis
 
 from src.config.game_config import GameConfig
 from src.exceptions import DataAccessError, RedisConnectionError, SerializationError
-from src.models.room import Room
+from src.models.room import Room, RoomStatus
+from src.repositories import room_scripts
+from src.repositories.codecs import json_dumps, parse_timestamp, to_epoch_us
+from src.repositories.room_cache import RoomCache
+from src.repositories.unit_of_work import UnitOfWork
 from src.utils.logger import log_exception, setup_logger
 
 logger = setup_logger(__name__)
@@ -19,18 +29,52 @@ logger = setup_logger(__name__)
 class RoomRepository:
     """房间仓储类"""
     
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: redis.Redis, cache: RoomCache | None = None):
         self.redis = redis_client
         self.prefix = "room:"
+        self.cache = cache
+        # 注册后通过 EVALSHA 调用，脚本缓存缺失时 redis-py 会自动重新加载
+        self._save_script = redis_client.register_script(room_scripts.SAVE_ROOM)
+        self._load_script = redis_client.register_script(room_scripts.LOAD_ROOM)
+        self._touch_script = redis_client.register_script(room_scripts.TOUCH_ROOM)
+        self._status_script = redis_client.register_script(room_scripts.SET_STATUS)
+        self._join_script = redis_client.register_script(room_scripts.JOIN_ROOM)
+        self._start_script = redis_client.register_script(room_scripts.START_GAME)
+        self._vote_script = redis_client.register_script(room_scripts.VOTE_PLAYER)
+        self._claim_expired_script = redis_client.register_script(room_scripts.CLAIM_EXPIRED)
+        # 房间过期索引：房间号 -> 预计过期时间（毫秒）
+        self.expiry_index_key = f"{self.prefix}expiry"
     
     def _get_key(self, room_id: str) -> str:
         """获取房间在Redis中的键"""
         return f"{self.prefix}{room_id}"
     
+    def _get_legacy_version_key(self, room_id: str) -> str:
+        """获取旧格式房间版本号的键，仅在迁移旧数据时使用"""
+        return f"{self.prefix}{room_id}:ver"
+    
+    def _get_members_key(self, room_id: str) -> str:
+        """获取房间成员集合的键，房间过期后仍保留一段时间"""
+        return f"{self.prefix}{room_id}:members"
+    
+    def _owned_keys(self, room_id: str) -> list[str]:
+        """房间独占的键，删除房间时一并删除"""
+        return [self._get_key(room_id), self._get_legacy_version_key(room_id), self._get_members_key(room_id)]
+    
+    def _keys(self, room_id: str) -> list[str]:
+        return [
+            self._get_key(room_id),
+            self._get_legacy_version_key(room_id),
+            self.expiry_index_key,
+            self._get_members_key(room_id),
+        ]
+    
     def save(self, room: Room) -> None:
         """
         保存房间信息
         
+        处于工作单元中时只登记为脏实体，由工作单元在请求结束时统一写回
+        
         Args:
             room: 房间对象
             
@@ -39,23 +83,29 @@ class RoomRepository:
             SerializationError: 序列化失败
             DataAccessError: 其他数据访问错误
         """
+        # 更新最后活跃时间
+        room.update_last_active()
+        
+        uow = UnitOfWork.current()
+        if uow is not None:
+            uow.register_dirty(self, self.prefix, room.room_id, room)
+            return
+        
+        self._write(room)
+    
+    def _write(self, room: Room) -> None:
+        """将房间写入Redis"""
         try:
-            # 更新最后活跃时间
-            room.update_last_active()
+            # 转换为哈希字段
+            fields = self._encode(room)
             
-            # 转换为字典并序列化
-            room_data = room.to_dict()
-            room_json = json.dumps(room_data, ensure_ascii=False)
+            # 保存到Redis，设置过期时间并递增版本号
+            args = self._save_args(fields)
+            room.version = int(self._save_script(keys=self._keys(room.room_id), args=args))
+            if self.cache is not None:
+                self.cache.put(room)
             
-            # 保存到Redis，设置过期时间
-            key = self._get_key(room.room_id)
-            self.redis.setex(
-                key, 
-                GameConfig.ROOM_TIMEOUT_SECONDS, 
-                room_json
-            )
-            
-            logger.debug("房间保存成功", extra={'room_id': room.room_id})
+            logger.debug("房间保存成功", extra={'room_id': room.room_id, 'version': room.version})
             
         except redis.ConnectionError as e:
             error = RedisConnectionError("保存房间", cause=e)
@@ -82,6 +132,85 @@ class RoomRepository:
             log_exception(logger, error)
             raise error from e
     
+    @staticmethod
+    def _save_args(fields: dict[str, str]) -> list:
+        """构造保存脚本的参数：过期秒数, 字段1, 值1, ..."""
+        args = [GameConfig.ROOM_TIMEOUT_SECONDS]
+        for name, value in fields.items():
+            args.extend((name, value))
+        return args
+    
+    def save_many(self, rooms: list[Room]) -> None:
+        """
+        批量保存房间信息，使用一次流水线写入
+        
+        处于工作单元中时只登记为脏实体，由工作单元在请求结束时统一写回
+        
+        Args:
+            rooms: 房间对象列表
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            SerializationError: 序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        for room in rooms:
+            room.update_last_active()
+        
+        uow = UnitOfWork.current()
+        if uow is not None:
+            for room in rooms:
+                uow.register_dirty(self, self.prefix, room.room_id, room)
+            return
+        
+        self._write_many(rooms)
+    
+    def _write_many(self, rooms: list[Room]) -> None:
+        """将多个房间以一次流水线写入Redis"""
+        if len(rooms) <= 1:
+            for room in rooms:
+                self._write(room)
+            return
+        
+        room_ids = [room.room_id for room in rooms]
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for room in rooms:
+                self._save_script(keys=self._keys(room.room_id), args=self._save_args(self._encode(room)), client=pipe)
+            versions = pipe.execute()
+            
+            for room, version in zip(rooms, versions, strict=True):
+                room.version = int(version)
+                if self.cache is not None:
+                    self.cache.put(room)
+            
+            logger.debug("批量保存房间成功", extra={'count': len(rooms)})
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("批量保存房间", cause=e)
+            log_exception(logger, error, {'room_ids': room_ids})
+            raise error from e
+            
+        except (TypeError, ValueError) as e:
+            error = SerializationError(
+                message="房间数据序列化失败",
+                error_code="REPO-INVALID-002",
+                details={'room_ids': room_ids},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+            
+        except Exception as e:
+            error = DataAccessError(
+                message="批量保存房间数据失败",
+                error_code="REPO-DATA-001",
+                details={'room_ids': room_ids},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+    
     def get(self, room_id: str) -> Room | None:
         """
         获取房间信息
@@ -97,20 +226,41 @@ class RoomRepository:
             SerializationError: 反序列化失败
             DataAccessError: 其他数据访问错误
         """
+        uow = UnitOfWork.current()
+        if uow is not None:
+            found, room = uow.lookup(self.prefix, room_id)
+            if found:
+                return room
+        
+        room = self._read(room_id)
+        if uow is not None:
+            uow.register_clean(self.prefix, room_id, room)
+        return room
+    
+    def _read(self, room_id: str) -> Room | None:
+        """从进程内缓存或Redis读取房间"""
         try:
-            key = self._get_key(room_id)
-            room_json = self.redis.get(key)
+            entry = self.cache.lookup(room_id) if self.cache is not None else None
+            if entry is not None:
+                # 免校验窗口内直接使用缓存，否则只比对版本号
+                if self.cache.is_fresh(entry):
+                    return entry.room.clone()
+                version = self._get_version(room_id)
+                if version == entry.version:
+                    self.cache.mark_validated(entry)
+                    logger.debug("房间缓存命中", extra={'room_id': room_id, 'version': entry.version})
+                    return entry.room.clone()
+                self.cache.invalidate(room_id)
+            
+            fields = self._load_fields(room_id)
             
-            if room_json is None:
+            if not fields:
                 logger.debug("房间不存在", extra={'room_id': room_id})
                 return None
             
-            # 处理bytes类型的JSON数据
-            if isinstance(room_json, bytes):
-                room_json = room_json.decode('utf-8')
-            
-            room_data = json.loads(room_json)
-            room = Room.from_dict(room_data)
+            room = self._decode(fields)
+            if self.cache is not None:
+                self.cache.put(room)
             
             logger.debug("房间获取成功", extra={'room_id': room_id})
             return room
@@ -140,6 +290,454 @@ class RoomRepository:
             log_exception(logger, error)
             raise error from e
     
+    def get_many(self, room_ids: list[str]) -> dict[str, Room | None]:
+        """
+        批量获取房间信息，使用一次流水线读取所有未缓存的房间
+        
+        Args:
+            room_ids: 房间号列表
+            
+        Returns:
+            房间号到房间对象的映射，不存在的房间映射为 None
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            SerializationError: 反序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        rooms: dict[str, Room | None] = {}
+        uow = UnitOfWork.current()
+        missing = []
+        for room_id in dict.fromkeys(room_ids):
+            if uow is not None:
+                found, room = uow.lookup(self.prefix, room_id)
+                if found:
+                    rooms[room_id] = room
+                    continue
+            missing.append(room_id)
+        
+        if not missing:
+            return rooms
+        
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for room_id in missing:
+                pipe.hgetall(self._get_key(room_id))
+            results = pipe.execute(raise_on_error=False)
+            
+            for room_id, fields in zip(missing, results, strict=True):
+                if isinstance(fields, redis.ResponseError) and 'WRONGTYPE' in str(fields):
+                    # 旧格式数据，逐个迁移
+                    fields = self._load_fields(room_id)
+                elif isinstance(fields, Exception):
+                    raise fields
+                room = self._decode(fields) if fields else None
+                if room is not None and self.cache is not None:
+                    self.cache.put(room)
+                rooms[room_id] = room
+                if uow is not None:
+                    uow.register_clean(self.prefix, room_id, room)
+            
+            logger.debug("批量获取房间成功", extra={'count': len(missing)})
+            return rooms
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("批量获取房间", cause=e)
+            log_exception(logger, error, {'room_ids': missing})
+            raise error from e
+            
+        except (TypeError, ValueError, KeyError) as e:
+            error = SerializationError(
+                message="房间数据反序列化失败",
+                error_code="REPO-INVALID-002",
+                details={'room_ids': missing},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+            
+        except Exception as e:
+            error = DataAccessError(
+                message="批量获取房间数据失败",
+                error_code="REPO-DATA-001",
+                details={'room_ids': missing},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+    
+    def _load_fields(self, room_id: str) -> dict:
+        """读取房间的全部哈希字段，遇到旧格式数据时先迁移"""
+        try:
+            return self.redis.hgetall(self._get_key(room_id))
+        except redis.ResponseError as e:
+            if 'WRONGTYPE' not in str(e):
+                raise
+            flat = self._load_script(keys=self._keys(room_id))
+            logger.info("旧格式房间已迁移为哈希", extra={'room_id': room_id})
+            return dict(zip(flat[::2], flat[1::2], strict=True))
+    
+    def get_version(self, room_id: str) -> int | None:
+        """
+        只读取房间的版本号，房间的任何修改都会递增版本号
+        
+        工作单元中有尚未写回的修改时，返回的是修改前的版本号
+        
+        Returns:
+            版本号，房间不存在时返回 None
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 其他数据访问错误
+        """
+        try:
+            return self._get_version(room_id)
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("读取房间版本号", cause=e)
+            log_exception(logger, error, {'room_id': room_id})
+            raise error from e
+            
+        except Exception as e:
+            error = DataAccessError(
+                message="读取房间版本号失败",
+                error_code="REPO-DATA-001",
+                details={'room_id': room_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+    
+    def _get_version(self, room_id: str) -> int | None:
+        """只读取房间版本号字段，房间不存在或为旧格式时返回 None"""
+        try:
+            version = self.redis.hget(self._get_key(room_id), 'ver')
+        except redis.ResponseError as e:
+            if 'WRONGTYPE' not in str(e):
+                raise
+            return None
+        return int(version) if version is not None else None
+    
+    @staticmethod
+    def _encode(room: Room) -> dict[str, str]:
+        """将房间对象转换为哈希字段"""
+        fields = {}
+        for name, value in room.to_dict().items():
+            if name in room_scripts.JSON_FIELDS:
+                fields[name] = json_dumps(value)
+            elif name in room_scripts.TIMESTAMP_FIELDS:
+                fields[name] = str(to_epoch_us(getattr(room, name)))
+            else:
+                fields[name] = str(value)
+        return fields
+    
+    @staticmethod
+    def _decode(fields: dict) -> Room:
+        """将Redis哈希字段反序列化为房间对象"""
+        data = {
+            (k.decode('utf-8') if isinstance(k, bytes) else k): (v.decode('utf-8') if isinstance(v, bytes) else v)
+            for k, v in fields.items()
+        }
+        room_data = dict(data)
+        for name in room_scripts.JSON_FIELDS:
+            if name in data:
+                room_data[name] = json.loads(data[name])
+        # Lua cjson 会把空数组编码为 {}，在此统一还原为列表
+        for name in ('players', 'undercovers', 'eliminated'):
+            if room_data.get(name) == {}:
+                room_data[name] = []
+        for name in room_scripts.TIMESTAMP_FIELDS:
+            if name in data:
+                room_data[name] = parse_timestamp(data[name])
+        room_data['current_round'] = int(data.get('current_round', 1))
+        room = Room.from_dict(room_data)
+        room.version = int(data.get('ver', 0))
+        return room
+    
+    def add_player(self, room_id: str, user_id: str, max_players: int) -> Room:
+        """
+        原子地将玩家加入等待中的房间
+        
+        Args:
+            room_id: 房间号
+            user_id: 加入的用户ID
+            max_players: 房间最大人数
+            
+        Returns:
+            加入后的房间对象
+            
+        Raises:
+            RoomNotFoundError: 房间不存在
+            RoomStateError: 房间不在等待状态
+            UserAlreadyInRoomError: 用户已在房间中
+            RoomFullError: 房间已满
+            RedisConnectionError: Redis连接失败
+            SerializationError: 反序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        return self._run_script(
+            self._join_script, "加入房间", room_id, user_id,
+            [user_id, max_players, self._now(), GameConfig.ROOM_TIMEOUT_SECONDS]
+        )
+    
+    def start_game(
+        self,
+        room_id: str,
+        user_id: str,
+        words: dict[str, str],
+        status: RoomStatus,
+        min_players: int,
+        undercover_rules: dict[tuple[int, int], int],
+    ) -> Room:
+        """
+        原子地校验并开始游戏：随机分配卧底、写入词语并切换房间状态
+        
+        Args:
+            room_id: 房间号
+            user_id: 发起开始的用户ID（须为房主）
+            words: 词语，包含 civilian 与 undercover
+            status: 开始后的房间状态
+            min_players: 最少游戏人数
+            undercover_rules: (最少人数, 最多人数) -> 卧底数量
+            
+        Returns:
+            开始后的房间对象
+            
+        Raises:
+            RoomNotFoundError: 房间不存在
+            RoomPermissionError: 非房主操作
+            InsufficientPlayersError: 人数不足
+            GameAlreadyStartedError: 游戏已开始
+            GameEndedError: 游戏已结束
+            RedisConnectionError: Redis连接失败
+            SerializationError: 反序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        max_players = max(high for _, high in undercover_rules)
+        shuffled = random.sample(range(1, max_players + 1), max_players)
+        rules = [[low, high, count] for (low, high), count in undercover_rules.items()]
+        return self._run_script(
+            self._start_script, "开始游戏", room_id, user_id,
+            [
+                user_id, min_players, status.value,
+                words['civilian'], words['undercover'],
+                json.dumps(shuffled), json.dumps(rules),
+                self._now(), GameConfig.ROOM_TIMEOUT_SECONDS,
+            ]
+        )
+    
+    def eliminate_player(self, room_id: str, user_id: str, target_index: int) -> Room:
+        """
+        原子地校验并淘汰指定序号的玩家
+        
+        Args:
+            room_id: 房间号
+            user_id: 发起投票的用户ID（须为房主）
+            target_index: 被淘汰玩家的序号（从1开始）
+            
+        Returns:
+            淘汰后的房间对象
+            
+        Raises:
+            RoomNotFoundError: 房间不存在
+            GameNotStartedError: 游戏未在进行中
+            RoomPermissionError: 非房主操作
+            InvalidPlayerIndexError: 序号无效
+            PlayerEliminatedError: 目标玩家已被淘汰
+            RedisConnectionError: Redis连接失败
+            SerializationError: 反序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        return self._run_script(
+            self._vote_script, "投票淘汰", room_id, user_id,
+            [user_id, target_index, self._now(), GameConfig.ROOM_TIMEOUT_SECONDS]
+        )
+    
+    @staticmethod
+    def _now() -> str:
+        return str(to_epoch_us(datetime.now(UTC)))
+    
+    def _run_script(self, script, operation: str, room_id: str, user_id: str, args: list) -> Room:
+        """执行房间脚本，将错误码转换为业务异常并刷新工作单元中的房间"""
+        try:
+            result = script(keys=self._keys(room_id), args=args)
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError(operation, cause=e)
+            log_exception(logger, error, {'room_id': room_id})
+            raise error from e
+            
+        except Exception as e:
+            error = DataAccessError(
+                message=f"{operation}失败",
+                error_code="REPO-DATA-001",
+                details={'room_id': room_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+        
+        code = result[0].decode('utf-8') if isinstance(result[0], bytes) else result[0]
+        if code != 'OK':
+            params = [v.decode('utf-8') if isinstance(v, bytes) else str(v) for v in result[1:]]
+            raise room_scripts.translate_script_error(code, params, room_id, user_id)
+        
+        try:
+            room = self._decode(dict(zip(result[2::2], result[3::2], strict=True)))
+            room.version = int(result[1])
+        except (TypeError, ValueError, KeyError) as e:
+            error = SerializationError(
+                message="房间数据反序列化失败",
+                error_code="REPO-INVALID-002",
+                details={'room_id': room_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+        
+        if self.cache is not None:
+            self.cache.put(room)
+        uow = UnitOfWork.current()
+        if uow is not None:
+            uow.refresh(self.prefix, room_id, room)
+        
+        logger.debug(f"{operation}脚本执行成功", extra={'room_id': room_id})
+        return room
+    
+    def set_status(self, room_id: str, status: RoomStatus) -> Room:
+        """
+        只更新房间状态字段
+        
+        Args:
+            room_id: 房间号
+            status: 新的房间状态
+            
+        Returns:
+            更新后的房间对象
+            
+        Raises:
+            RoomNotFoundError: 房间不存在
+            RedisConnectionError: Redis连接失败
+            SerializationError: 反序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        return self._run_script(
+            self._status_script, "更新房间状态", room_id, "",
+            [status.value, self._now(), GameConfig.ROOM_TIMEOUT_SECONDS]
+        )
+    
+    def touch(self, room_id: str) -> bool:
+        """
+        刷新房间的最后活跃时间与过期时间，不改变版本号
+        
+        Args:
+            room_id: 房间号
+            
+        Returns:
+            房间存在返回 True，否则返回 False
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 其他数据访问错误
+        """
+        try:
+            touched = self._touch_script(
+                keys=self._keys(room_id),
+                args=[self._now(), GameConfig.ROOM_TIMEOUT_SECONDS]
+            )
+            if self.cache is not None:
+                # 版本号不变，缓存中的活跃时间无法通过版本校验发现过时
+                self.cache.invalidate(room_id)
+            return bool(touched)
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("刷新房间活跃时间", cause=e)
+            log_exception(logger, error, {'room_id': room_id})
+            raise error from e
+            
+        except Exception as e:
+            error = DataAccessError(
+                message="刷新房间活跃时间失败",
+                error_code="REPO-DATA-001",
+                details={'room_id': room_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+    
+    def expired_room_ids(self, limit: int = 100) -> list[str]:
+        """
+        从过期索引中取出预计过期时间已过的房间号
+        
+        Args:
+            limit: 最多返回的数量
+            
+        Returns:
+            房间号列表
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 其他数据访问错误
+        """
+        try:
+            seconds, microseconds = self.redis.time()
+            now_ms = seconds * 1000 + microseconds // 1000
+            room_ids = self.redis.zrangebyscore(self.expiry_index_key, '-inf', now_ms, start=0, num=limit)
+            return [room_id.decode('utf-8') if isinstance(room_id, bytes) else room_id for room_id in room_ids]
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("读取房间过期索引", cause=e)
+            log_exception(logger, error)
+            raise error from e
+            
+        except Exception as e:
+            error = DataAccessError(
+                message="读取房间过期索引失败",
+                error_code="REPO-DATA-001",
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+    
+    def claim_expired(self, room_id: str) -> list[str] | None:
+        """
+        认领已过期的房间，移除其过期索引与成员集合
+        
+        多个进程同时认领同一房间时只有一个能取得成员列表
+        
+        Args:
+            room_id: 房间号
+            
+        Returns:
+            过期房间的成员列表；房间仍存在时返回 None
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 其他数据访问错误
+        """
+        if self.cache is not None:
+            self.cache.invalidate(room_id)
+        try:
+            members = self._claim_expired_script(keys=self._keys(room_id))
+            if members is None:
+                return None
+            return [member.decode('utf-8') if isinstance(member, bytes) else member for member in members]
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("认领过期房间", cause=e)
+            log_exception(logger, error, {'room_id': room_id})
+            raise error from e
+            
+        except Exception as e:
+            error = DataAccessError(
+                message="认领过期房间失败",
+                error_code="REPO-DATA-001",
+                details={'room_id': room_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+    
     def delete(self, room_id: str) -> None:
         """
         删除房间
@@ -151,9 +749,17 @@ class RoomRepository:
             RedisConnectionError: Redis连接失败
             DataAccessError: 其他数据访问错误
         """
+        uow = UnitOfWork.current()
+        if uow is not None:
+            uow.register_removed(self.prefix, room_id)
+        if self.cache is not None:
+            self.cache.invalidate(room_id)
+        
         try:
-            key = self._get_key(room_id)
-            self.redis.delete(key)
+            pipe = self.redis.pipeline()
+            pipe.delete(*self._owned_keys(room_id))
+            pipe.zrem(self.expiry_index_key, room_id)
+            pipe.execute()
             logger.debug("房间删除成功", extra={'room_id': room_id})
             
         except redis.ConnectionError as e:
@@ -171,6 +777,50 @@ class RoomRepository:
             log_exception(logger, error)
             raise error from e
     
+    def delete_many(self, room_ids: list[str]) -> None:
+        """
+        批量删除房间，使用一次流水线
+        
+        Args:
+            room_ids: 房间号列表
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 其他数据访问错误
+        """
+        if not room_ids:
+            return
+        
+        uow = UnitOfWork.current()
+        for room_id in room_ids:
+            if uow is not None:
+                uow.register_removed(self.prefix, room_id)
+            if self.cache is not None:
+                self.cache.invalidate(room_id)
+        
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for room_id in room_ids:
+                pipe.delete(*self._owned_keys(room_id))
+            pipe.zrem(self.expiry_index_key, *room_ids)
+            pipe.execute()
+            logger.debug("批量删除房间成功", extra={'count': len(room_ids)})
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("批量删除房间", cause=e)
+            log_exception(logger, error, {'room_ids': room_ids})
+            raise error from e
+            
+        except Exception as e:
+            error = DataAccessError(
+                message="批量删除房间数据失败",
+                error_code="REPO-DATA-001",
+                details={'room_ids': room_ids},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+    
     def exists(self, room_id: str) -> bool:
         """
         检查房间是否存在
@@ -185,6 +835,12 @@ class RoomRepository:
             RedisConnectionError: Redis连接失败
             DataAccessError: 其他数据访问错误
         """
+        uow = UnitOfWork.current()
+        if uow is not None:
+            found, room = uow.lookup(self.prefix, room_id)
+            if found:
+                return room is not None
+        
         try:
             key = self._get_key(room_id)
             exists = self.redis.exists(key) > 0
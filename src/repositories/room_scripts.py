@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+房间状态迁移的 Redis Lua 脚本
+每个脚本在服务端一次性完成状态校验与修改，避免多个 worker 并发读-改-写互相覆盖
+
+房间以哈希存储（room:{id}），列表/字典类字段以 JSON 字符串保存在单个字段中，
+版本号保存在 ver 字段，每次有意义的修改递增。
+每次写入同时维护过期索引（有序集合，分值为预计过期时间毫秒数）与成员集合，
+成员集合比房间多保留一段时间，房间过期后据此清除成员的当前房间。
+所有脚本约定 KEYS[1]=房间键，KEYS[2]=旧版本号键（仅用于迁移旧格式数据），
+KEYS[3]=过期索引键，KEYS[4]=成员集合键
+"""
+
+from src.exceptions import (
+    BaseAppException,
+    GameAlreadyStartedError,
+    GameEndedError,
+    GameNotStartedError,
+    InsufficientPlayersError,
+    InvalidPlayerIndexError,
+    PlayerEliminatedError,
+    RoomFullError,
+    RoomNotFoundError,
+    RoomPermissionError,
+    RoomStateError,
+    UserAlreadyInRoomError,
+)
+
+# 以 JSON 字符串保存的房间字段
+JSON_FIELDS = ('players', 'words', 'undercovers', 'eliminated')
+# 以纪元微秒整数保存的时间戳字段
+TIMESTAMP_FIELDS = ('created_at', 'last_active')
+
+# 公共函数
+# 成功时返回 {'OK', 版本号, 字段1, 值1, ...}，失败时返回 {错误码, 参数...}
+_PRELUDE = """
+local JSON_FIELDS = {players = true, words = true, undercovers = true, eliminated = true}
+local MEMBERS_GRACE_SECONDS = 86400
+local ROOM_ID = string.match(KEYS[1], ':(.+)$')
+
+local function now_ms()
+    local now = redis.call('TIME')
+    return now[1] * 1000 + math.floor(now[2] / 1000)
+end
+
+-- 初始版本号取服务端毫秒时间戳，这样房间号被复用后新房间的版本号也不会与其他进程中旧缓存的版本号相同
+local function initial_version()
+    return string.format('%d', now_ms())
+end
+
+-- 刷新过期索引，并以当前玩家列表重建成员集合
+local function track(players, ttl)
+    ttl = tonumber(ttl)
+    redis.call('ZADD', KEYS[3], string.format('%d', now_ms() + ttl * 1000), ROOM_ID)
+    redis.call('DEL', KEYS[4])
+    local members = cjson.decode(players)
+    if #members > 0 then
+        redis.call('SADD', KEYS[4], unpack(members))
+        redis.call('EXPIRE', KEYS[4], ttl + MEMBERS_GRACE_SECONDS)
+    end
+end
+
+-- 将旧格式（整个 JSON 文档保存在字符串键中）的房间原地转换为哈希，保留剩余过期时间
+local function migrate_legacy()
+    if redis.call('TYPE', KEYS[1]).ok ~= 'string' then
+        return
+    end
+    local doc = cjson.decode(redis.call('GET', KEYS[1]))
+    local ttl = redis.call('PTTL', KEYS[1])
+    local fields = {}
+    for name, value in pairs(doc) do
+        if JSON_FIELDS[name] then
+            value = cjson.encode(value)
+        elseif type(value) == 'number' then
+            value = string.format('%d', value)
+        end
+        table.insert(fields, name)
+        table.insert(fields, value)
+    end
+    local version = redis.call('GET', KEYS[2])
+    table.insert(fields, 'ver')
+    table.insert(fields, version or initial_version())
+    redis.call('DEL', KEYS[1], KEYS[2])
+    redis.call('HSET', KEYS[1], unpack(fields))
+    if ttl > 0 then
+        redis.call('PEXPIRE', KEYS[1], ttl)
+    end
+end
+
+local function load_room()
+    migrate_legacy()
+    local flat = redis.call('HGETALL', KEYS[1])
+    if #flat == 0 then
+        return nil
+    end
+    local room = {}
+    for i = 1, #flat, 2 do
+        room[flat[i]] = flat[i + 1]
+    end
+    return room
+end
+
+-- 只写入发生变化的字段，递增版本号并刷新过期时间
+local function commit(room, changes, now, ttl)
+    table.insert(changes, 'last_active')
+    table.insert(changes, now)
+    redis.call('HSET', KEYS[1], unpack(changes))
+    for i = 1, #changes, 2 do
+        room[changes[i]] = changes[i + 1]
+    end
+    room.ver = redis.call('HINCRBY', KEYS[1], 'ver', 1)
+    redis.call('EXPIRE', KEYS[1], ttl)
+    track(room.players, ttl)
+    local reply = {'OK', room.ver}
+    for name, value in pairs(room) do
+        if name ~= 'ver' then
+            table.insert(reply, name)
+            table.insert(reply, value)
+        end
+    end
+    return reply
+end
+
+local function index_of(list, value)
+    for i, item in ipairs(list) do
+        if item == value then
+            return i
+        end
+    end
+    return nil
+end
+"""
+
+# ARGV: 过期秒数, 字段1, 值1, ...
+SAVE_ROOM = _PRELUDE + """
+migrate_legacy()
+if redis.call('HEXISTS', KEYS[1], 'ver') == 0 then
+    redis.call('HSET', KEYS[1], 'ver', initial_version())
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+local version = redis.call('HINCRBY', KEYS[1], 'ver', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+track(redis.call('HGET', KEYS[1], 'players'), ARGV[1])
+return version
+"""
+
+# 读取房间，必要时先迁移旧格式；返回 HGETALL 结果
+LOAD_ROOM = _PRELUDE + """
+migrate_legacy()
+return redis.call('HGETALL', KEYS[1])
+"""
+
+# ARGV: 当前时间, 过期秒数；仅刷新活跃时间与过期时间，不递增版本号
+TOUCH_ROOM = _PRELUDE + """
+migrate_legacy()
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'last_active', ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+track(redis.call('HGET', KEYS[1], 'players'), ARGV[2])
+return 1
+"""
+
+# 认领已过期的房间：房间仍存在时按剩余过期时间修正索引并返回 nil，
+# 否则移除索引与成员集合并返回成员列表
+CLAIM_EXPIRED = _PRELUDE + """
+local pttl = redis.call('PTTL', KEYS[1])
+if pttl == -1 then
+    redis.call('ZREM', KEYS[3], ROOM_ID)
+    return false
+elseif pttl >= 0 then
+    redis.call('ZADD', KEYS[3], string.format('%d', now_ms() + pttl), ROOM_ID)
+    return false
+end
+local members = redis.call('SMEMBERS', KEYS[4])
+redis.call('DEL', KEYS[2], KEYS[4])
+redis.call('ZREM', KEYS[3], ROOM_ID)
+return members
+"""
+
+# ARGV: 目标状态, 当前时间, 过期秒数
+SET_STATUS = _PRELUDE + """
+local room = load_room()
+if not room then
+    return {'ROOM_NOT_FOUND'}
+end
+return commit(room, {'status', ARGV[1]}, ARGV[2], ARGV[3])
+"""
+
+# ARGV: 用户ID, 最大人数, 当前时间, 过期秒数
+JOIN_ROOM = _PRELUDE + """
+local room = load_room()
+if not room then
+    return {'ROOM_NOT_FOUND'}
+end
+if room.status ~= 'waiting' then
+    return {'ROOM_NOT_WAITING', room.status}
+end
+local players = cjson.decode(room.players)
+if index_of(players, ARGV[1]) then
+    return {'ALREADY_IN_ROOM'}
+end
+if #players >= tonumber(ARGV[2]) then
+    return {'ROOM_FULL', ARGV[2]}
+end
+table.insert(players, ARGV[1])
+return commit(room, {'players', cjson.encode(players)}, ARGV[3], ARGV[4])
+"""
+
+# ARGV: 用户ID, 最少人数, 目标状态, 平民词, 卧底词, 序号随机排列(JSON), 卧底数量规则(JSON), 当前时间, 过期秒数
+START_GAME = _PRELUDE + """
+local room = load_room()
+if not room then
+    return {'ROOM_NOT_FOUND'}
+end
+if room.creator ~= ARGV[1] then
+    return {'NOT_CREATOR', 'start'}
+end
+local players = cjson.decode(room.players)
+local count = #players
+local min_players = tonumber(ARGV[2])
+if count < min_players then
+    return {'INSUFFICIENT_PLAYERS', tostring(count), ARGV[2]}
+end
+if room.status == 'playing' then
+    return {'GAME_ALREADY_STARTED'}
+elseif room.status == 'ended' then
+    return {'GAME_ENDED'}
+end
+
+local undercover_count = 0
+for _, rule in ipairs(cjson.decode(ARGV[7])) do
+    if rule[1] <= count and count <= rule[2] then
+        undercover_count = rule[3]
+        break
+    end
+end
+if undercover_count == 0 then
+    return {'INSUFFICIENT_PLAYERS', tostring(count), ARGV[2]}
+end
+
+-- 从 1..最大人数 的随机排列中依次取出不超过当前人数的序号，等价于均匀随机抽样
+local undercovers = {}
+for _, index in ipairs(cjson.decode(ARGV[6])) do
+    if #undercovers >= undercover_count then
+        break
+    end
+    if index <= count then
+        table.insert(undercovers, players[index])
+    end
+end
+
+return commit(room, {
+    'undercovers', cjson.encode(undercovers),
+    'words', cjson.encode({civilian = ARGV[4], undercover = ARGV[5]}),
+    'status', ARGV[3],
+    'current_round', '1',
+}, ARGV[8], ARGV[9])
+"""
+
+# ARGV: 用户ID, 目标序号, 当前时间, 过期秒数
+VOTE_PLAYER = _PRELUDE + """
+local room = load_room()
+if not room then
+    return {'ROOM_NOT_FOUND'}
+end
+if room.status ~= 'playing' then
+    return {'GAME_NOT_STARTED'}
+end
+if room.creator ~= ARGV[1] then
+    return {'NOT_CREATOR', 'vote'}
+end
+local players = cjson.decode(room.players)
+local target_index = tonumber(ARGV[2])
+if target_index < 1 or target_index > #players then
+    return {'INVALID_INDEX', ARGV[2], tostring(#players)}
+end
+local target = players[target_index]
+local eliminated = {}
+if room.eliminated then
+    eliminated = cjson.decode(room.eliminated)
+end
+if index_of(eliminated, target) then
+    return {'PLAYER_ELIMINATED', target}
+end
+table.insert(eliminated, target)
+return commit(room, {'eliminated', cjson.encode(eliminated)}, ARGV[3], ARGV[4])
+"""
+
+_ACTIONS = {'start': "开始游戏", 'vote': "投票"}
+
+
+def translate_script_error(code: str, args: list[str], room_id: str, user_id: str) -> BaseAppException:
+    """
+    将脚本返回的错误码转换为对应的业务异常
+
+    Args:
+        code: 脚本返回的错误码
+        args: 错误码附带的参数
+        room_id: 房间号
+        user_id: 发起操作的用户ID
+
+    Returns:
+        业务异常实例
+    """
+    if code == 'ROOM_NOT_FOUND':
+        return RoomNotFoundError(room_id)
+    if code == 'ROOM_NOT_WAITING':
+        return RoomStateError(
+            message="游戏已经开始，无法加入房间",
+            error_code="ROOM-STATE-003",
+            details={'room_id': room_id, 'status': args[0]}
+        )
+    if code == 'ALREADY_IN_ROOM':
+        return UserAlreadyInRoomError(user_id, room_id)
+    if code == 'ROOM_FULL':
+        return RoomFullError(room_id, int(args[0]))
+    if code == 'NOT_CREATOR':
+        return RoomPermissionError(user_id, _ACTIONS[args[0]])
+    if code == 'INSUFFICIENT_PLAYERS':
+        return InsufficientPlayersError(int(args[0]), int(args[1]))
+    if code == 'GAME_ALREADY_STARTED':
+        return GameAlreadyStartedError()
+    if code == 'GAME_ENDED':
+        return GameEndedError()
+    if code == 'GAME_NOT_STARTED':
+        return GameNotStartedError()
+    if code == 'INVALID_INDEX':
+        return InvalidPlayerIndexError(int(args[0]), int(args[1]))
+    if code == 'PLAYER_ELIMINATED':
+        return PlayerEliminatedError(args[0])
+    raise ValueError(f"未知的脚本错误码: {code}")
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+请求级工作单元
+在一次请求的生命周期内缓存已加载的实体（身份映射），并在请求结束时统一写回脏实体；
+提交成功后依次执行登记的回调，用于在回复之后才需要执行的后续工作；提交失败时执行回滚回调
+"""
+
+from collections.abc import Callable
+from contextvars import ContextVar
+from typing import Any
+
+from src.utils.logger import log_exception, setup_logger
+
+logger = setup_logger(__name__)
+
+_current_uow: ContextVar['UnitOfWork | None'] = ContextVar('current_unit_of_work', default=None)
+
+
+class UnitOfWork:
+    """
+    工作单元
+
+    用法::
+
+        with UnitOfWork():
+            ...  # 期间仓储的 get 会命中身份映射，save 只登记为脏实体
+
+    退出上下文且未发生异常时提交所有脏实体并执行提交后回调；发生异常或提交失败时丢弃未提交的修改，
+    改为执行回滚回调。
+    """
+
+    def __init__(self):
+        # (命名空间, 实体ID) -> 实体对象，None 表示已确认不存在
+        self._identity_map: dict[tuple[str, str], Any] = {}
+        # (命名空间, 实体ID) -> (仓储, 实体对象)
+        self._dirty: dict[tuple[str, str], tuple[Any, Any]] = {}
+        # 提交成功后执行的回调
+        self._after_commit: list[Callable[[], Any]] = []
+        # 发生异常或提交失败时执行的回调
+        self._after_rollback: list[Callable[[], Any]] = []
+        self._token = None
+
+    @staticmethod
+    def current() -> 'UnitOfWork | None':
+        """获取当前上下文中的工作单元，不存在时返回 None"""
+        return _current_uow.get()
+
+    def __enter__(self) -> 'UnitOfWork':
+        self._token = _current_uow.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        committed = False
+        try:
+            if exc_type is None:
+                self.commit()
+                committed = True
+        finally:
+            callbacks = list(self._after_commit if committed else self._after_rollback)
+            _current_uow.reset(self._token)
+            self._token = None
+            self._identity_map.clear()
+            self._dirty.clear()
+            self._after_commit.clear()
+            self._after_rollback.clear()
+            self._run_callbacks(callbacks)
+
+    def lookup(self, namespace: str, entity_id: str) -> tuple[bool, Any]:
+        """
+        从身份映射中查找实体
+
+        Returns:
+            (是否命中, 实体对象或 None)
+        """
+        key = (namespace, entity_id)
+        if key in self._identity_map:
+            return True, self._identity_map[key]
+        return False, None
+
+    def register_clean(self, namespace: str, entity_id: str, entity: Any) -> None:
+        """登记从存储中加载的实体（包括确认不存在的 None）"""
+        key = (namespace, entity_id)
+        if key not in self._dirty:
+            self._identity_map[key] = entity
+
+    def register_dirty(self, repository: Any, namespace: str, entity_id: str, entity: Any) -> None:
+        """登记需要在提交时写回的实体"""
+        key = (namespace, entity_id)
+        self._identity_map[key] = entity
+        self._dirty[key] = (repository, entity)
+
+    def is_dirty(self, namespace: str, entity_id: str) -> bool:
+        """实体是否有尚未写回的修改"""
+        return (namespace, entity_id) in self._dirty
+
+    def refresh(self, namespace: str, entity_id: str, entity: Any) -> None:
+        """用服务端原子操作返回的最新实体替换身份映射中的旧实体"""
+        key = (namespace, entity_id)
+        self._identity_map[key] = entity
+        self._dirty.pop(key, None)
+
+    def register_removed(self, namespace: str, entity_id: str) -> None:
+        """登记已删除的实体，避免提交时被重新写回"""
+        key = (namespace, entity_id)
+        self._identity_map[key] = None
+        self._dirty.pop(key, None)
+
+    def after_commit(self, callback: Callable[[], Any]) -> None:
+        """
+        登记提交成功后执行的回调
+
+        回调在工作单元退出后执行，此时脏实体已写回；回调中的异常只记录日志，不影响请求结果
+        """
+        self._after_commit.append(callback)
+
+    def after_rollback(self, callback: Callable[[], Any]) -> None:
+        """
+        登记发生异常或提交失败时执行的回调，用于撤销在提交前已产生的外部副作用
+
+        回调在工作单元退出后执行；回调中的异常只记录日志，原异常照常抛出
+        """
+        self._after_rollback.append(callback)
+
+    @staticmethod
+    def _run_callbacks(callbacks: list[Callable[[], Any]]) -> None:
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                log_exception(logger, e, {'operation': 'after_commit'})
+
+    def commit(self) -> None:
+        """
+        写回所有脏实体
+
+        Raises:
+            RepositoryException: 仓储写入失败
+        """
+        dirty = list(self._dirty.values())
+        self._dirty.clear()
+        # 同一仓储的脏实体以一次流水线写回
+        batches: dict[int, tuple[Any, list[Any]]] = {}
+        for repository, entity in dirty:
+            batches.setdefault(id(repository), (repository, []))[1].append(entity)
+        for repository, entities in batches.values():
+            repository._write_many(entities)
+        if dirty:
+            logger.debug("工作单元提交完成", extra={'entities': len(dirty)})
@@ -2,14 +2,19 @@
 """
 用户仓储类
 负责用户数据的持久化操作
+
+用户记录的存储格式由编解码器决定，读取时自动识别格式，旧 JSON 记录在下次写入时升级。
+配置了闲置过期时间时，写入与按ID读取都会刷新过期时间，长期不活跃的用户由 Redis 自动清除
 """
 
-import json
+from datetime import UTC, datetime
 
 import redis
 
 from src.exceptions import DataAccessError, RedisConnectionError, SerializationError
 from src.models.user import User
+from src.repositories.codecs import Codec, MsgpackCodec, decode_record
+from src.repositories.unit_of_work import UnitOfWork
 from src.utils.logger import log_exception, setup_logger
 
 logger = setup_logger(__name__)
@@ -18,9 +23,13 @@ logger = setup_logger(__name__)
 class UserRepository:
     """用户仓储类"""
     
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: redis.Redis, codec: Codec | None = None, ttl_seconds: int = 0):
         self.redis = redis_client
         self.prefix = "user:"
+        # 写入时使用的编解码器
+        self.codec = codec if codec is not None else MsgpackCodec()
+        # 闲置过期秒数，0 表示永不过期
+        self.ttl_seconds = ttl_seconds
     
     def _get_key(self, user_id: str) -> str:
         """获取用户在Redis中的键"""
@@ -30,6 +39,8 @@ class UserRepository:
         """
         保存用户信息
         
+        处于工作单元中时只登记为脏实体，由工作单元在请求结束时统一写回
+        
         Args:
             user: 用户对象
             
@@ -38,14 +49,24 @@ class UserRepository:
             SerializationError: 序列化失败
             DataAccessError: 其他数据访问错误
         """
+        uow = UnitOfWork.current()
+        if uow is not None:
+            uow.register_dirty(self, self.prefix, user.openid, user)
+            return
+        
+        self._write(user)
+    
+    def _write(self, user: User) -> None:
+        """将用户写入Redis"""
         try:
-            # 转换为字典并序列化
+            # 转换为字典并编码
+            user.last_active = datetime.now(UTC)
             user_data = user.to_dict()
-            user_json = json.dumps(user_data, ensure_ascii=False)
+            payload = self.codec.encode(user_data)
             
-            # 保存到Redis
+            # 保存到Redis，同时刷新闲置过期时间
             key = self._get_key(user.openid)
-            self.redis.set(key, user_json)
+            self.redis.set(key, payload, ex=self.ttl_seconds or None)
             
             logger.debug("用户保存成功", extra={'user_id': user.openid})
             
@@ -74,6 +95,71 @@ class UserRepository:
             log_exception(logger, error)
             raise error from e
     
+    def save_many(self, users: list[User]) -> None:
+        """
+        批量保存用户信息，使用一次流水线写入
+        
+        处于工作单元中时只登记为脏实体，由工作单元在请求结束时统一写回
+        
+        Args:
+            users: 用户对象列表
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            SerializationError: 序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        uow = UnitOfWork.current()
+        if uow is not None:
+            for user in users:
+                uow.register_dirty(self, self.prefix, user.openid, user)
+            return
+        
+        self._write_many(users)
+    
+    def _write_many(self, users: list[User]) -> None:
+        """将多个用户以一次流水线写入Redis"""
+        if len(users) <= 1:
+            for user in users:
+                self._write(user)
+            return
+        
+        user_ids = [user.openid for user in users]
+        try:
+            now = datetime.now(UTC)
+            pipe = self.redis.pipeline(transaction=False)
+            for user in users:
+                user.last_active = now
+                pipe.set(self._get_key(user.openid), self.codec.encode(user.to_dict()), ex=self.ttl_seconds or None)
+            pipe.execute()
+            
+            logger.debug("批量保存用户成功", extra={'count': len(users)})
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("批量保存用户", cause=e)
+            log_exception(logger, error, {'user_ids': user_ids})
+            raise error from e
+            
+        except (TypeError, ValueError) as e:
+            error = SerializationError(
+                message="用户数据序列化失败",
+                error_code="REPO-INVALID-002",
+                details={'user_ids': user_ids},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+            
+        except Exception as e:
+            error = DataAccessError(
+                message="批量保存用户数据失败",
+                error_code="REPO-DATA-001",
+                details={'user_ids': user_ids},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+    
     def get(self, user_id: str) -> User | None:
         """
         获取用户信息
@@ -89,19 +175,32 @@ class UserRepository:
             SerializationError: 反序列化失败
             DataAccessError: 其他数据访问错误
         """
+        uow = UnitOfWork.current()
+        if uow is not None:
+            found, user = uow.lookup(self.prefix, user_id)
+            if found:
+                return user
+        
+        user = self._read(user_id)
+        if uow is not None:
+            uow.register_clean(self.prefix, user_id, user)
+        return user
+    
+    def _read(self, user_id: str) -> User | None:
+        """从Redis读取用户"""
         try:
             key = self._get_key(user_id)
-            user_json = self.redis.get(key)
+            if self.ttl_seconds:
+                # 读取的同时刷新闲置过期时间
+                payload = self.redis.getex(key, ex=self.ttl_seconds)
+            else:
+                payload = self.redis.get(key)
             
-            if user_json is None:
+            if payload is None:
                 logger.debug("用户不存在", extra={'user_id': user_id})
                 return None
             
-            # 处理bytes类型的JSON数据
-            if isinstance(user_json, bytes):
-                user_json = user_json.decode('utf-8')
-            
-            user_data = json.loads(user_json)
+            user_data = decode_record(payload)
             user = User.from_dict(user_data)
             
             logger.debug("用户获取成功", extra={'user_id': user_id})
@@ -132,6 +231,204 @@ class UserRepository:
             log_exception(logger, error)
             raise error from e
     
+    def get_many(self, user_ids: list[str]) -> dict[str, User | None]:
+        """
+        批量获取用户信息，使用一次 MGET 读取所有未缓存的用户
+        
+        Args:
+            user_ids: 用户ID列表
+            
+        Returns:
+            用户ID到用户对象的映射，不存在的用户映射为 None
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            SerializationError: 反序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        users: dict[str, User | None] = {}
+        uow = UnitOfWork.current()
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            if uow is not None:
+                found, user = uow.lookup(self.prefix, user_id)
+                if found:
+                    users[user_id] = user
+                    continue
+            missing.append(user_id)
+        
+        if not missing:
+            return users
+        
+        try:
+            values = self.redis.mget([self._get_key(user_id) for user_id in missing])
+            for user_id, payload in zip(missing, values, strict=True):
+                user = None
+                if payload is not None:
+                    user = User.from_dict(decode_record(payload))
+                users[user_id] = user
+                if uow is not None:
+                    uow.register_clean(self.prefix, user_id, user)
+            
+            logger.debug("批量获取用户成功", extra={'count': len(missing)})
+            return users
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("批量获取用户", cause=e)
+            log_exception(logger, error, {'user_ids': missing})
+            raise error from e
+            
+        except (TypeError, ValueError, KeyError) as e:
+            error = SerializationError(
+                message="用户数据反序列化失败",
+                error_code="REPO-INVALID-002",
+                details={'user_ids': missing},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+            
+        except Exception as e:
+            error = DataAccessError(
+                message="批量获取用户数据失败",
+                error_code="REPO-DATA-001",
+                details={'user_ids': missing},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+    
+    def update_nickname(self, user_id: str, nickname: str) -> bool:
+        """
+        只更新用户昵称，其余字段保持存储中的最新值
+        
+        以 WATCH 乐观锁读改写，期间记录被其他请求修改时自动重试，不会覆盖并发写入的房间等字段
+        
+        Args:
+            user_id: 用户ID
+            nickname: 昵称
+            
+        Returns:
+            是否已更新；用户不存在时返回 False
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            SerializationError: 序列化或反序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        key = self._get_key(user_id)
+        
+        def update(pipe) -> bool:
+            payload = pipe.get(key)
+            if payload is None:
+                return False
+            user = User.from_dict(decode_record(payload))
+            user.nickname = nickname
+            ttl = pipe.ttl(key)
+            pipe.multi()
+            # 只修改昵称不算用户活跃，保留原有的最后活跃时间与剩余过期时间
+            pipe.set(key, self.codec.encode(user.to_dict()), ex=ttl if ttl > 0 else None)
+            return True
+        
+        try:
+            updated = self.redis.transaction(update, key, value_from_callable=True)
+            logger.debug("用户昵称更新完成", extra={'user_id': user_id, 'updated': updated})
+            return updated
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("更新用户昵称", cause=e)
+            log_exception(logger, error, {'user_id': user_id})
+            raise error from e
+            
+        except (TypeError, ValueError, KeyError) as e:
+            error = SerializationError(
+                message="用户数据序列化失败",
+                error_code="REPO-INVALID-002",
+                details={'user_id': user_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+            
+        except Exception as e:
+            error = DataAccessError(
+                message="更新用户昵称失败",
+                error_code="REPO-DATA-001",
+                details={'user_id': user_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+    
+    def clear_room_many(self, user_ids: list[str], room_id: str) -> list[str]:
+        """
+        批量清除当前房间，只处理当前房间仍为 room_id 的用户，其余字段保持存储中的最新值
+        
+        以 WATCH 乐观锁读改写，期间有用户加入其他房间或更新昵称时整批重试，不会覆盖并发写入
+        
+        Args:
+            user_ids: 用户ID列表
+            room_id: 要清除的房间号
+            
+        Returns:
+            被清除当前房间的用户ID列表
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            SerializationError: 序列化或反序列化失败
+            DataAccessError: 其他数据访问错误
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return []
+        keys = [self._get_key(user_id) for user_id in user_ids]
+        
+        def update(pipe) -> list[str]:
+            leaving = []
+            for key, payload in zip(keys, pipe.mget(keys), strict=True):
+                if payload is None:
+                    continue
+                user = User.from_dict(decode_record(payload))
+                # 成员可能已经加入了其他房间，只清除仍指向该房间的用户
+                if user.current_room == room_id:
+                    user.leave_room()
+                    leaving.append((key, user))
+            pipe.multi()
+            # 被动离开房间不算用户活跃，保留原有的最后活跃时间与剩余过期时间
+            for key, user in leaving:
+                pipe.set(key, self.codec.encode(user.to_dict()), keepttl=True)
+            return [user.openid for _, user in leaving]
+        
+        try:
+            cleared = self.redis.transaction(update, *keys, value_from_callable=True)
+            logger.debug("批量清除当前房间完成", extra={'room_id': room_id, 'count': len(cleared)})
+            return cleared
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("批量清除当前房间", cause=e)
+            log_exception(logger, error, {'room_id': room_id})
+            raise error from e
+            
+        except (TypeError, ValueError, KeyError) as e:
+            error = SerializationError(
+                message="用户数据序列化失败",
+                error_code="REPO-INVALID-002",
+                details={'user_ids': user_ids},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+            
+        except Exception as e:
+            error = DataAccessError(
+                message="批量清除当前房间失败",
+                error_code="REPO-DATA-001",
+                details={'room_id': room_id},
+                cause=e
+            )
+            log_exception(logger, error)
+            raise error from e
+    
     def delete(self, user_id: str) -> None:
         """
         删除用户
@@ -143,6 +440,10 @@ class UserRepository:
             RedisConnectionError: Redis连接失败
             DataAccessError: 其他数据访问错误
         """
+        uow = UnitOfWork.current()
+        if uow is not None:
+            uow.register_removed(self.prefix, user_id)
+        
         try:
             key = self._get_key(user_id)
             self.redis.delete(key)
@@ -161,4 +462,42 @@ class UserRepository:
                 cause=e
             )
             log_exception(logger, error)
+            raise error from e
+    
+    def delete_many(self, user_ids: list[str]) -> None:
+        """
+        批量删除用户，使用一次 DEL
+        
+        Args:
+            user_ids: 用户ID列表
+            
+        Raises:
+            RedisConnectionError: Redis连接失败
+            DataAccessError: 其他数据访问错误
+        """
+        if not user_ids:
+            return
+        
+        uow = UnitOfWork.current()
+        if uow is not None:
+            for user_id in user_ids:
+                uow.register_removed(self.prefix, user_id)
+        
+        try:
+            self.redis.delete(*(self._get_key(user_id) for user_id in user_ids))
+            logger.debug("批量删除用户成功", extra={'count': len(user_ids)})
+            
+        except redis.ConnectionError as e:
+            error = RedisConnectionError("批量删除用户", cause=e)
+            log_exception(logger, error, {'user_ids': user_ids})
+            raise error from e
+            
+        except Exception as e:
+            error = DataAccessError(
+                message="批量删除用户数据失败",
+                error_code="REPO-DATA-001",
+                details={'user_ids': user_ids},
+                cause=e
+            )
+            log_exception(logger, error)
             raise error from e
\ No newline at end of file
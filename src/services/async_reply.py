@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+异步回复
+耗时较长的命令先以 success 应答微信，命令在后台线程执行后通过客服消息接口把结果发给用户，
+避免被动回复错过微信的 5 秒窗口
+
+- 按命令名称配置始终异步执行的命令
+- 按命令统计耗时的指数加权移动平均（EWMA），估计耗时超过阈值的命令自动改为异步执行
+"""
+
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+from src.exceptions import BusinessException, ClientException
+from src.repositories.unit_of_work import UnitOfWork
+from src.services.push_service import PushService
+from src.services.rate_limiter import PRIORITY_HIGH
+from src.utils.logger import log_exception, setup_logger
+from src.utils.metrics import MetricsRegistry, registry as default_registry
+
+logger = setup_logger(__name__)
+
+
+class CommandLatency:
+    """按命令统计耗时的指数加权移动平均"""
+
+    def __init__(self, alpha: float = 0.2, metrics: MetricsRegistry | None = None):
+        """
+        Args:
+            alpha: 新样本的权重，越大越快反映最近的耗时
+        """
+        self.alpha = alpha
+        self._estimates: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        metrics = metrics or default_registry
+        self._gauge = metrics.gauge("command_latency_ewma_seconds", "命令耗时的指数加权移动平均（秒）")
+
+    def observe(self, command: str, seconds: float) -> None:
+        with self._lock:
+            previous = self._estimates.get(command)
+            estimate = seconds if previous is None else previous + self.alpha * (seconds - previous)
+            self._estimates[command] = estimate
+        self._gauge.set(estimate, {'command': command})
+
+    def estimate(self, command: str) -> float | None:
+        """估计耗时，没有样本时返回 None"""
+        with self._lock:
+            return self._estimates.get(command)
+
+
+class AsyncReplier:
+    """异步回复执行器"""
+
+    def __init__(
+        self,
+        push_service: PushService,
+        commands: frozenset[str] = frozenset(),
+        cost_threshold_seconds: float = 2.0,
+        max_workers: int = 4,
+        latency: CommandLatency | None = None,
+        metrics: MetricsRegistry | None = None,
+    ):
+        """
+        Args:
+            push_service: 推送服务，用于发送命令结果
+            commands: 始终异步执行的命令名称
+            cost_threshold_seconds: 估计耗时超过该值的命令自动异步执行，0 表示不自动切换
+            max_workers: 后台执行命令的线程数
+        """
+        self.push_service = push_service
+        self.commands = commands
+        self.cost_threshold_seconds = cost_threshold_seconds
+        self.max_workers = max_workers
+        self.latency = latency or CommandLatency(metrics=metrics)
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        # 记录创建线程池的进程，fork 后的子进程需要重新创建
+        self._pid: int | None = None
+
+        metrics = metrics or default_registry
+        self._deferred = metrics.counter("async_reply_total", "改为异步回复的命令数量")
+        self._failed = metrics.counter("async_reply_failed_total", "异步回复执行或发送失败的数量")
+
+    def should_defer(self, command: str | None) -> bool:
+        """命令是否改为异步执行"""
+        if command is None or not self.push_service.enabled():
+            return False
+        if command in self.commands:
+            return True
+        if self.cost_threshold_seconds <= 0:
+            return False
+        estimate = self.latency.estimate(command)
+        return estimate is not None and estimate > self.cost_threshold_seconds
+
+    def measure(self, command: str | None, run: Callable[[], str]) -> str:
+        """同步执行命令并记录耗时"""
+        started = time.perf_counter()
+        try:
+            return run()
+        finally:
+            if command is not None:
+                self.latency.observe(command, time.perf_counter() - started)
+
+    def submit(self, user_id: str, command: str, run: Callable[[], str]) -> None:
+        """在后台执行命令，完成后把结果推送给用户"""
+        self._deferred.inc(labels={'command': command})
+        self._ensure_executor().submit(self._run, user_id, command, run)
+
+    def join(self) -> None:
+        """等待已提交的命令执行完毕"""
+        with self._lock:
+            executor, self._executor, self._pid = self._executor, None, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _ensure_executor(self) -> ThreadPoolExecutor:
+        pid = os.getpid()
+        with self._lock:
+            if self._executor is None or self._pid != pid:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="async-reply")
+                self._pid = pid
+            return self._executor
+
+    def _run(self, user_id: str, command: str, run: Callable[[], str]) -> None:
+        try:
+            # 后台线程没有请求级工作单元，单独开启一个
+            with UnitOfWork():
+                content = self.measure(command, run)
+        except (BusinessException, ClientException) as e:
+            # 与同步回复一致，把业务提示发给用户
+            content = e.message
+        except Exception as e:
+            self._failed.inc(labels={'command': command})
+            log_exception(logger, e, {'operation': 'async_reply', 'user_id': user_id, 'command': command})
+            content = "系统繁忙，请稍后重试"
+        if not self.push_service.send_text(user_id, content, priority=PRIORITY_HIGH):
+            self._failed.inc(labels={'command': command})
+            logger.warning("异步回复推送失败", extra={'user_id': user_id, 'command': command})
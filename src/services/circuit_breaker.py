@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+熔断器
+外部接口连续失败达到阈值后熔断，熔断期间直接拒绝调用，不再等待每一次超时；
+冷却时间过后放行一次探测调用，成功则恢复，失败则继续熔断
+
+状态保存在进程内：每个 worker 独立判断，调用路径上不增加 Redis 往返
+"""
+
+import threading
+import time
+from collections.abc import Callable
+from enum import Enum
+
+from src.utils.logger import setup_logger
+from src.utils.metrics import MetricsRegistry, registry as default_registry
+
+logger = setup_logger(__name__)
+
+
+class CircuitState(Enum):
+    """熔断器状态"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+# 指标中的状态取值
+_STATE_VALUES = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+
+
+
+class CircuitBreaker:
+    """单个接口的熔断器"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_seconds: float = 30.0,
+        metrics: MetricsRegistry | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        # 半开状态下是否已有探测调用在执行
+        self._probing = False
+
+        metrics = metrics or default_registry
+        self._state_gauge = metrics.gauge("wechat_circuit_state", "熔断器状态：0 关闭，1 半开，2 熔断")
+        self._rejected = metrics.counter("wechat_circuit_rejected_total", "熔断期间被拒绝的调用次数")
+        self._state_gauge.set(0, {'operation': name})
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            return self._current_state()
+
+    def allow(self) -> bool:
+        """
+        判断是否放行一次调用；放行后必须调用 record_success 或 record_failure
+
+        Returns:
+            关闭状态放行；熔断状态拒绝；冷却结束后只放行一次探测调用
+        """
+        with self._lock:
+            state = self._current_state()
+            if state is CircuitState.CLOSED:
+                return True
+            if state is CircuitState.HALF_OPEN and not self._probing:
+                self._transition(CircuitState.HALF_OPEN)
+                self._probing = True
+                return True
+        self._rejected.inc(labels={'operation': self.name})
+        return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if self._state is not CircuitState.CLOSED:
+                self._transition(CircuitState.CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            probing, self._probing = self._probing, False
+            if probing or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+                if self._state is not CircuitState.OPEN:
+                    self._transition(CircuitState.OPEN)
+
+    def snapshot(self) -> dict:
+        """当前状态，用于健康检查"""
+        with self._lock:
+            state = self._current_state()
+            snapshot = {'state': state.value, 'failures': self._failures}
+            if state is not CircuitState.CLOSED:
+                retry_in = self._opened_at + self.recovery_seconds - self._clock()
+                snapshot['retry_in_seconds'] = round(max(0.0, retry_in), 1)
+            return snapshot
+
+    def _current_state(self) -> CircuitState:
+        if self._state is CircuitState.OPEN and self._clock() - self._opened_at >= self.recovery_seconds:
+            return CircuitState.HALF_OPEN
+        return self._state
+
+    def _transition(self, state: CircuitState) -> None:
+        if state is not self._state:
+            logger.warning(f"熔断器状态变化: {self.name} {self._state.value} -> {state.value}")
+        self._state = state
+        self._state_gauge.set(_STATE_VALUES[state], {'operation': self.name})
+
+
+class CircuitBreakers:
+    """按接口名称管理的一组熔断器"""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_seconds: float = 30.0,
+        metrics: MetricsRegistry | None = None,
+    ):
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.metrics = metrics
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(
+                    name, self.failure_threshold, self.recovery_seconds, self.metrics
+                )
+            return breaker
+
+    def any_open(self) -> bool:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return any(breaker.state is not CircuitState.CLOSED for breaker in breakers)
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.snapshot() for breaker in breakers}
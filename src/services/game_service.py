@@ -5,21 +5,17 @@
 """
 
 import random
+from datetime import UTC, datetime
 
 from src.config.game_config import GameConfig
 from src.exceptions import (
     ClientException,
     DomainException,
-    GameAlreadyStartedError,
-    GameEndedError,
     GameNotStartedError,
-    InsufficientPlayersError,
-    InvalidPlayerIndexError,
     PlayerEliminatedError,
+    RedisConnectionError,
     RepositoryException,
-    RoomFullError,
     RoomNotFoundError,
-    RoomPermissionError,
     RoomStateError,
     UserAlreadyInRoomError,
     UserNotInRoomError,
@@ -27,27 +23,51 @@ from src.exceptions import (
 from src.fsm.game_state_machine import GameEvent, GameState, GameStateMachine
 from src.models.room import Room, RoomStatus
 from src.models.user import User
+from src.repositories.room_id_allocator import RoomIdAllocator
 from src.repositories.room_repository import RoomRepository
+from src.repositories.unit_of_work import UnitOfWork
 from src.repositories.user_repository import UserRepository
+from src.services.nickname_service import NicknameService
 from src.services.push_service import PushService
+from src.services.rate_limiter import PRIORITY_HIGH
+from src.utils.deadline import has_budget
 from src.utils.logger import log_business_event, log_exception, setup_logger
 from src.utils.word_generator import WordGenerator
 
 logger = setup_logger(__name__)
 
+# 同步调用微信接口获取昵称需要的剩余秒数
+NICKNAME_LOOKUP_BUDGET_SECONDS = 1.5
+# 投票后推送房间状态需要的剩余秒数
+STATUS_PUSH_BUDGET_SECONDS = 1.0
+# 玩家仍在使用的房间，距上次活跃超过该秒数时在读取时刷新活跃时间与过期时间
+ROOM_TOUCH_INTERVAL_SECONDS = 5 * 60
+
 
 class GameService:
     """游戏服务类"""
     
-    def __init__(self, room_repo: RoomRepository, user_repo: UserRepository, push_service: PushService | None = None):
+    def __init__(
+        self,
+        room_repo: RoomRepository,
+        user_repo: UserRepository,
+        push_service: PushService | None = None,
+        id_allocator: RoomIdAllocator | None = None,
+        nicknames: NicknameService | None = None,
+    ):
         self.room_repo = room_repo
         self.user_repo = user_repo
         self.word_generator = WordGenerator(GameConfig.WORD_PAIRS)
         self.fsm = GameStateMachine()
         self.push = push_service
+        # 未配置分配器时退回随机探测房间号
+        self.id_allocator = id_allocator
+        # 未配置昵称服务时在请求中同步获取昵称
+        self.nicknames = nicknames
     
     def create_room(self, user_id: str) -> tuple[bool, str]:
         """创建房间"""
+        room_id = None
         try:
             # 生成唯一的房间号
             room_id = self._generate_unique_room_id()
@@ -60,33 +80,34 @@ class GameService:
             )
             
             # 创建用户对象
+            nickname = self._lookup_nickname(user_id)
             user = User(
                 openid=user_id,
-                nickname="玩家1",
+                nickname=nickname or "玩家1",
                 current_room=room_id
             )
             
-            # 保存房间和用户信息
+            # 保存房间和用户信息，回复成功之前写回
             self.room_repo.save(room)
             self.user_repo.save(user)
+            self._flush()
             
-            if self.push and self.push.enabled():
-                nickname = self.push.get_user_nickname(user_id)
-                if nickname:
-                    user.nickname = nickname
-                    self.user_repo.save(user)
-            else:
+            if not (self.push and self.push.enabled()):
                 logger.warning("推送服务未启用，无法获取用户昵称")
+            elif nickname is None:
+                self._enrich_nickname_later(user_id)
 
             log_business_event(logger, "房间创建成功", user_id=user_id, room_id=room_id)
             return True, room_id
             
         except RepositoryException as e:
             log_exception(logger, e, {'user_id': user_id})
+            self._abandon_room(room_id)
             return False, "创建房间失败，请稍后重试"
             
         except Exception as e:
             log_exception(logger, e, {'user_id': user_id})
+            self._abandon_room(room_id)
             return False, "创建房间时发生错误"
     
     def join_room(self, user_id: str, room_id: str) -> tuple[bool, str]:
@@ -94,54 +115,31 @@ class GameService:
         try:
             # 获取用户信息
             user = self.user_repo.get(user_id)
-            if user and user.has_joined_room():
+            if user and user.has_joined_room() and self._load_current_room(user) is not None:
                 # 用户已经在其他房间中
                 raise UserAlreadyInRoomError(user_id, user.current_room)
             
-            # 检查房间是否存在
-            room = self.room_repo.get(room_id)
-            if not room:
-                raise RoomNotFoundError(room_id)
-            
-            # 检查房间状态
-            if room.status != RoomStatus.WAITING:
-                raise RoomStateError(
-                    message="游戏已经开始，无法加入房间",
-                    error_code="ROOM-STATE-003",
-                    details={'room_id': room_id, 'status': room.status.value}
-                )
-            
-            # 检查是否已在房间中
-            if room.is_player(user_id):
-                raise UserAlreadyInRoomError(user_id, room_id)
-            
-            # 检查房间人数
-            if room.get_player_count() >= GameConfig.MAX_PLAYERS:
-                raise RoomFullError(room_id, GameConfig.MAX_PLAYERS)
-            
-            # 加入房间
-            room.players.append(user_id)
+            # 原子地校验房间状态、成员与人数并加入房间
+            room = self.room_repo.add_player(room_id, user_id, GameConfig.MAX_PLAYERS)
             
             # 创建或更新用户对象
+            nickname = self._lookup_nickname(user_id)
             if not user:
                 user = User(
                     openid=user_id,
-                    nickname=f"玩家{room.get_player_count()}",
+                    nickname=nickname or f"玩家{room.get_player_count()}",
                     current_room=room_id
                 )
             else:
                 user.current_room = room_id
-                user.nickname = f"玩家{room.get_player_count()}"
+                user.nickname = nickname or f"玩家{room.get_player_count()}"
             
-            # 保存房间和用户信息
-            self.room_repo.save(room)
+            # 房间已由原子操作写入，只需保存用户信息
             self.user_repo.save(user)
+            self._flush()
             
-            if self.push and self.push.enabled():
-                nickname = self.push.get_user_nickname(user_id)
-                if nickname:
-                    user.nickname = nickname
-                    self.user_repo.save(user)
+            if nickname is None:
+                self._enrich_nickname_later(user_id)
             
             log_business_event(
                 logger, "用户加入房间", 
@@ -170,67 +168,40 @@ class GameService:
             if not user or not user.has_joined_room():
                 raise UserNotInRoomError(user_id)
             
-            # 获取房间信息
-            room = self.room_repo.get(user.current_room)
-            if not room:
-                raise RoomNotFoundError(user.current_room)
-            
-            # 检查是否为房主
-            if not room.is_creator(user_id):
-                raise RoomPermissionError(user_id, "开始游戏")
-            
-            # 检查房间人数
-            if room.get_player_count() < GameConfig.MIN_PLAYERS:
-                raise InsufficientPlayersError(room.get_player_count(), GameConfig.MIN_PLAYERS)
-            
-            # 检查房间状态
-            if room.status == RoomStatus.PLAYING:
-                raise GameAlreadyStartedError()
-            elif room.status == RoomStatus.ENDED:
-                raise GameEndedError()
-
             # 状态机校验
             can_start = self.fsm.can_transition(GameState.WAITING, GameEvent.START)
             if not can_start:
                 raise RoomStateError(
                     message="当前状态无法开始游戏",
                     error_code="ROOM-STATE-003",
-                    details={'room_id': room.room_id, 'status': room.status.value}
+                    details={'room_id': user.current_room}
                 )
-            
-            # 根据人数确定卧底数量
-            player_count = room.get_player_count()
-            undercover_count = GameConfig.get_undercover_count(player_count)
-            if undercover_count == 0:
-                raise InsufficientPlayersError(player_count, GameConfig.MIN_PLAYERS)
-            
-            # 随机选择卧底
-            room.undercovers = random.sample(room.players, undercover_count)
+            next_state = self.fsm.next_state(GameState.WAITING, GameEvent.START)
             
             # 随机选择词语对
             word_pair = self.word_generator.get_random_word_pair()
             
-            # 分配词语
-            room.words = {
-                'civilian': word_pair[0],
-                'undercover': word_pair[1]
-            }
-            
-            # 更新房间状态
-            next_state = self.fsm.next_state(GameState.WAITING, GameEvent.START)
-            room.status = RoomStatus(next_state.value)
-            room.current_round = 1
-            
-            # 保存房间信息
-            self.room_repo.save(room)
+            # 原子地校验房主、人数与状态，并分配卧底和词语
+            try:
+                room = self.room_repo.start_game(
+                    user.current_room,
+                    user_id,
+                    words={'civilian': word_pair[0], 'undercover': word_pair[1]},
+                    status=RoomStatus(next_state.value),
+                    min_players=GameConfig.MIN_PLAYERS,
+                    undercover_rules=GameConfig.UNDERCOVER_COUNT_RULES,
+                )
+            except RoomNotFoundError:
+                self._clear_stale_room(user)
+                raise
+            player_count = room.get_player_count()
+            undercover_count = len(room.undercovers)
             
             if self.push and self.push.enabled():
-                for pid in room.players:
-                    if pid in room.undercovers:
-                        w = room.words['undercover']
-                    else:
-                        w = room.words['civilian']
-                    self.push.send_text(pid, f"您的词语：{w}")
+                self._push_words(room)
+                if self.nicknames is not None:
+                    # 以一次批量请求补全房间内仍未获取到的昵称
+                    self.nicknames.enrich_many_later(room.players)
             
             log_business_event(logger, "游戏开始", 
                              user_id=user_id, room_id=room.room_id, 
@@ -257,19 +228,16 @@ class GameService:
             if not user or not user.has_joined_room():
                 raise UserNotInRoomError(user_id)
             
-            # 获取房间信息
-            room = self.room_repo.get(user.current_room)
+            # 获取房间信息，房间已失效时清除用户的房间指针
+            room_id = user.current_room
+            room = self._load_current_room(user)
             if not room:
-                raise RoomNotFoundError(user.current_room)
+                raise RoomNotFoundError(room_id)
             
             # 检查游戏状态
             if room.status != RoomStatus.PLAYING:
                 raise GameNotStartedError()
             
-            # 检查用户是否在房间中
-            if not room.is_player(user_id):
-                raise UserNotInRoomError(user_id)
-            
             # 检查用户是否已被淘汰
             if room.is_eliminated(user_id):
                 raise PlayerEliminatedError(user_id)
@@ -302,58 +270,36 @@ class GameService:
             if not user or not user.has_joined_room():
                 raise UserNotInRoomError(user_id)
             
-            # 获取房间信息
-            room = self.room_repo.get(user.current_room)
-            if not room:
-                raise RoomNotFoundError(user.current_room)
-            
-            # 检查游戏状态
-            if room.status != RoomStatus.PLAYING:
-                raise GameNotStartedError()
-            
-            # 检查是否为房主
-            if not room.is_creator(user_id):
-                raise RoomPermissionError(user_id, "投票")
-            
-            # 检查序号是否有效
-            if target_index < 1 or target_index > room.get_player_count():
-                raise InvalidPlayerIndexError(target_index, room.get_player_count())
-            
-            # 获取目标玩家
-            target_player = room.players[target_index - 1]
-            
-            # 检查目标玩家是否已被淘汰
-            if room.is_eliminated(target_player):
-                raise PlayerEliminatedError(target_player)
-            
-            # 记录被淘汰的玩家
-            room.eliminated.append(target_player)
-            
-            # 保存房间信息
-            self.room_repo.save(room)
-            
             # 状态机：投票事件保持在 PLAYING
             if not self.fsm.can_transition(GameState.PLAYING, GameEvent.VOTE):
                 raise RoomStateError(
                     message="当前状态无法投票",
                     error_code="ROOM-STATE-003",
-                    details={'room_id': room.room_id, 'status': room.status.value}
+                    details={'room_id': user.current_room}
                 )
-
+            
+            # 原子地校验游戏状态、房主、序号与淘汰状态，并记录被淘汰的玩家
+            try:
+                room = self.room_repo.eliminate_player(user.current_room, user_id, target_index)
+            except RoomNotFoundError:
+                self._clear_stale_room(user)
+                raise
+            target_player = room.players[target_index - 1]
+            
             # 检查游戏是否结束
             game_ended, result_message = self._check_game_end(room)
+            self._flush()
             
             log_business_event(logger, "投票淘汰", 
                              user_id=user_id, room_id=room.room_id, 
                              target_index=target_index, target_player=target_player,
                              game_ended=game_ended)
             
+            # 状态推送只是通知，请求即将超时时跳过
+            if self.push and self.push.enabled() and has_budget("status_push", STATUS_PUSH_BUDGET_SECONDS):
+                self._push_room_status(room)
             if game_ended:
-                if self.push and self.push.enabled():
-                    self._push_room_status(room)
                 return True, result_message
-            if self.push and self.push.enabled():
-                self._push_room_status(room)
             return True, "投票成功"
             
         except (DomainException, ClientException) as e:
@@ -376,10 +322,11 @@ class GameService:
             if not user or not user.has_joined_room():
                 raise UserNotInRoomError(user_id)
             
-            # 获取房间信息
-            room = self.room_repo.get(user.current_room)
+            # 获取房间信息，房间已失效时清除用户的房间指针
+            room_id = user.current_room
+            room = self._load_current_room(user)
             if not room:
-                raise RoomNotFoundError(user.current_room)
+                raise RoomNotFoundError(room_id)
             
             # 构建状态信息
             status_lines = []
@@ -399,9 +346,10 @@ class GameService:
             status_lines.append(f"房间状态：{room.status.value}")
             status_lines.append("房间成员：")
             
-            # 玩家列表
+            # 玩家列表（一次批量读取所有成员昵称）
+            members = self.user_repo.get_many(room.players)
             for i, player in enumerate(room.players):
-                player_obj = self.user_repo.get(player)
+                player_obj = members.get(player)
                 nickname = player_obj.nickname if player_obj else f"玩家{i+1}"
                 
                 # 添加角色标识
@@ -437,13 +385,117 @@ class GameService:
             log_exception(logger, e, {'user_id': user_id})
             return False, "显示状态时发生错误"
     
+    def room_version(self, user_id: str) -> tuple[str, int | None] | None:
+        """
+        用户所在房间的版本，用于判断房间自上次回复后是否有变化
+        
+        Returns:
+            (房间号, 版本号)；房间在本次请求中有尚未写回的修改、不存在或读取失败时版本号为 None；
+            用户不在房间中时返回 None
+        """
+        try:
+            user = self.user_repo.get(user_id)
+            if not user or not user.has_joined_room():
+                return None
+            room_id = user.current_room
+            uow = UnitOfWork.current()
+            if uow is not None and uow.is_dirty(self.room_repo.prefix, room_id):
+                return room_id, None
+            return room_id, self.room_repo.get_version(room_id)
+        
+        except RepositoryException as e:
+            log_exception(logger, e, {'user_id': user_id})
+            return "", None
+    
+    @staticmethod
+    def _flush() -> None:
+        """
+        在业务操作内写回工作单元中的修改
+        
+        写入失败时抛出的仓储异常由所在操作转换为错误回复，不会在回复成功之后才失败
+        """
+        uow = UnitOfWork.current()
+        if uow is not None:
+            uow.commit()
+    
+    def _abandon_room(self, room_id: str | None) -> None:
+        """创建房间失败时删除可能已写入的房间并归还房间号，清理失败时号码由过期任务按批回收"""
+        if room_id is None:
+            return
+        try:
+            self.room_repo.delete(room_id)
+            if self.id_allocator is not None:
+                self.id_allocator.release(room_id)
+        except (RepositoryException, RedisConnectionError) as e:
+            log_exception(logger, e, {'room_id': room_id})
+    
     def _generate_unique_room_id(self) -> str:
         """生成唯一的房间号"""
+        if self.id_allocator is not None:
+            return self.id_allocator.allocate()
         while True:
             room_id = str(random.randint(1000, 9999))
             if not self.room_repo.exists(room_id):
                 return room_id
     
+    def _lookup_nickname(self, user_id: str) -> str | None:
+        """
+        查找用户昵称
+        
+        配置了昵称服务时只读取缓存，否则同步调用微信接口；请求即将超时时不调用，使用默认昵称
+        
+        Returns:
+            昵称；未命中或无法获取时返回 None
+        """
+        if not (self.push and self.push.enabled()):
+            return None
+        if self.nicknames is not None:
+            return self.nicknames.cached(user_id)
+        if not has_budget("nickname_lookup", NICKNAME_LOOKUP_BUDGET_SECONDS):
+            return None
+        return self.push.get_user_nickname(user_id) or None
+    
+    def _enrich_nickname_later(self, user_id: str) -> None:
+        """昵称未命中缓存时，在回复之后由后台获取并写回用户记录"""
+        if self.nicknames is not None and self.push and self.push.enabled():
+            self.nicknames.enrich_later(user_id)
+    
+    def _load_current_room(self, user: User) -> Room | None:
+        """
+        读取用户所在的房间
+        
+        房间已过期，或房间号已被新房间复用而用户不在其中时，清除用户的房间指针并返回 None，
+        之后该用户的请求不会再访问失效的房间
+        """
+        room = self.room_repo.get(user.current_room)
+        if room is not None and room.is_player(user.openid):
+            self._keep_alive(room)
+            return room
+        self._clear_stale_room(user)
+        return None
+    
+    def _keep_alive(self, room: Room) -> None:
+        """
+        玩家查看状态或词语时延长房间的过期时间
+        
+        只改写活跃时间字段且不递增版本号；距上次活跃不足刷新间隔时跳过，避免每次读取都写入。
+        刷新失败不影响本次读取，房间仍按原过期时间过期
+        """
+        idle_seconds = (datetime.now(UTC) - room.last_active).total_seconds()
+        if idle_seconds < ROOM_TOUCH_INTERVAL_SECONDS:
+            return
+        try:
+            self.room_repo.touch(room.room_id)
+            room.update_last_active()
+        except (RepositoryException, RedisConnectionError) as e:
+            log_exception(logger, e, {'room_id': room.room_id})
+    
+    def _clear_stale_room(self, user: User) -> None:
+        """清除指向失效房间的用户指针"""
+        logger.info("清除失效的房间指针", extra={'user_id': user.openid, 'room_id': user.current_room})
+        user.leave_room()
+        self.user_repo.save(user)
+    
     def _check_game_end(self, room: Room) -> tuple[bool, str]:
         """检查游戏是否结束"""
         # 检查是否有卧底被淘汰
@@ -453,10 +505,11 @@ class GameService:
         if len(eliminated_undercovers) == len(room.undercovers):
             next_state = self.fsm.next_state(GameState.PLAYING, GameEvent.END)
             room.status = RoomStatus(next_state.value)
-            self.room_repo.save(room)
+            self.room_repo.set_status(room.room_id, room.status)
             
-            # 让所有玩家自动退出房间
+            # 让所有玩家自动退出房间，并归还房间号
             self._auto_leave_room(room)
+            self._release_room_id(room)
             
             return True, "游戏结束！平民获胜，成功找出了所有卧底！"
         
@@ -467,10 +520,11 @@ class GameService:
         if len(remaining_players) < 3:
             next_state = self.fsm.next_state(GameState.PLAYING, GameEvent.END)
             room.status = RoomStatus(next_state.value)
-            self.room_repo.save(room)
+            self.room_repo.set_status(room.room_id, room.status)
             
-            # 让所有玩家自动退出房间
+            # 让所有玩家自动退出房间，并归还房间号
             self._auto_leave_room(room)
+            self._release_room_id(room)
             
             return True, "游戏结束！卧底获胜！"
         
@@ -481,22 +535,55 @@ class GameService:
         if len(remaining_undercovers) >= len(remaining_civilians):
             next_state = self.fsm.next_state(GameState.PLAYING, GameEvent.END)
             room.status = RoomStatus(next_state.value)
-            self.room_repo.save(room)
+            self.room_repo.set_status(room.room_id, room.status)
             
-            # 让所有玩家自动退出房间
+            # 让所有玩家自动退出房间，并归还房间号
             self._auto_leave_room(room)
+            self._release_room_id(room)
             
             return True, "游戏结束！卧底获胜！"
         
         return False, ""
     
     def _auto_leave_room(self, room: Room) -> None:
-        """自动让玩家离开房间"""
-        for player_id in room.players:
-            user = self.user_repo.get(player_id)
+        """自动让玩家离开房间，批量读取并写回所有成员"""
+        leaving = []
+        for user in self.user_repo.get_many(room.players).values():
             if user and user.current_room == room.room_id:
                 user.leave_room()
-                self.user_repo.save(user)
+                leaving.append(user)
+        self.user_repo.save_many(leaving)
+
+    def _release_room_id(self, room: Room) -> None:
+        """
+        游戏结束后删除房间并将房间号归还号码池
+        
+        所有成员已离开，已结束的房间不再被读取；先删除房间再归还，复用号码的新房间不会写到旧数据上。
+        删除失败时不归还，号码在房间过期后由过期任务归还
+        """
+        if self.id_allocator is None:
+            return
+        try:
+            self.room_repo.delete(room.room_id)
+            self.id_allocator.release(room.room_id)
+        except (RepositoryException, RedisConnectionError) as e:
+            log_exception(logger, e, {'room_id': room.room_id})
+
+    @staticmethod
+    def _push_key(kind: str, room: Room, openid: str) -> str:
+        """推送幂等键：同一房间（号码可能复用，以创建时间区分）同一版本的同类消息只推送一次"""
+        return f"{kind}:{room.room_id}:{room.created_at.timestamp():.6f}:{room.version}:{openid}"
+
+    def _push_words(self, room: Room) -> None:
+        for pid in room.players:
+            if pid in room.undercovers:
+                w = room.words['undercover']
+            else:
+                w = room.words['civilian']
+            # 发词优先于状态推送，限流时使用预留配额
+            self.push.send_text(
+                pid, f"您的词语：{w}", priority=PRIORITY_HIGH, idempotency_key=self._push_key("word", room, pid)
+            )
 
     def _push_room_status(self, room: Room) -> None:
         lines = [
@@ -504,8 +591,9 @@ class GameService:
             f"房间状态：{room.status.value}",
             "房间成员：",
         ]
+        members = self.user_repo.get_many(room.players)
         for i, player in enumerate(room.players):
-            u = self.user_repo.get(player)
+            u = members.get(player)
             n = (u.nickname if u else f"玩家{i+1}")
             if player == room.creator:
                 n += "(房主)"
@@ -519,4 +607,4 @@ class GameService:
         content = "\n".join(lines)
         for pid in room.players:
             if self.push and self.push.enabled():
-                self.push.send_text(pid, content)
+                self.push.send_text(pid, content, idempotency_key=self._push_key("status", room, pid))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+出站 HTTP 会话
+为调用微信接口的 requests 会话配置连接池、默认超时与重试策略
+
+- 连接池按主机复用 keep-alive 连接，省去每次调用的 TCP/TLS 握手
+- 所有请求都有连接与读取超时，包括 wechatpy 获取 token 时未传 timeout 的调用，慢响应不会无限占用 worker
+- 只对幂等请求重试读取失败与 5xx 响应；连接失败时请求尚未发出，任何方法都可以安全重试
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 读取失败与状态码重试只适用于这些方法，POST（如发送客服消息）重试可能导致重复发送
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """为未指定超时的请求使用默认超时的适配器"""
+
+    def __init__(self, timeout: tuple[float, float], **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def create_session(
+    pool_size: int = 10,
+    connect_timeout: float = 3.0,
+    read_timeout: float = 5.0,
+    max_retries: int = 2,
+    backoff_factor: float = 0.2,
+    session: requests.Session | None = None,
+) -> requests.Session:
+    """
+    创建或配置出站 HTTP 会话
+
+    Args:
+        pool_size: 每个主机保留的连接数，应不小于同时发起请求的线程数
+        connect_timeout: 连接超时秒数
+        read_timeout: 读取超时秒数
+        max_retries: 最大重试次数，0 表示不重试
+        backoff_factor: 重试退避系数，第 n 次重试前等待 backoff_factor * 2^(n-1) 秒
+        session: 要配置的已有会话，不传时新建
+
+    Returns:
+        配置好的会话
+    """
+    session = session or requests.Session()
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        allowed_methods=IDEMPOTENT_METHODS,
+        status_forcelist=(502, 503, 504),
+        backoff_factor=backoff_factor,
+        raise_on_status=False,
+    )
+    adapter = TimeoutHTTPAdapter(
+        timeout=(connect_timeout, read_timeout),
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
@@ -7,12 +7,17 @@
 import logging
 
 from wechatpy import parse_message
-from wechatpy.exceptions import InvalidSignatureException
+from wechatpy.exceptions import InvalidAppIdException, InvalidSignatureException
 from wechatpy.replies import create_reply
 from wechatpy.utils import check_signature
 
 from src.config.messages import HELP_MESSAGES
+from src.services.async_reply import AsyncReplier
 from src.services.game_service import GameService
+from src.services.reply_cache import NO_REPLY, ReplyCache
+from src.services.reply_tracker import ReplyTracker
+from src.services.wechat_crypto import MessageCrypto
+from src.services.wechat_xml import InboundMessage, parse_message as parse_fast, render_text_reply
 from src.strategies.commands import CommandRouter
 
 logger = logging.getLogger(__name__)
@@ -20,10 +25,25 @@ logger = logging.getLogger(__name__)
 class MessageService:
     """消息服务类"""
     
-    def __init__(self, game_service: GameService, token: str):
+    def __init__(
+        self,
+        game_service: GameService,
+        token: str,
+        reply_cache: ReplyCache | None = None,
+        async_replies: AsyncReplier | None = None,
+        crypto: MessageCrypto | None = None,
+        reply_tracker: ReplyTracker | None = None,
+    ):
         self.game_service = game_service
         self.token = token
-        self.router = CommandRouter(game_service)
+        # 房间自上次完整回复后没有变化时，回复不再追加状态与词语
+        self.router = CommandRouter(game_service, reply_tracker=reply_tracker)
+        # 微信超时重试的重复消息直接返回首次处理的回复
+        self.reply_cache = reply_cache
+        # 耗时命令先应答微信，结果通过客服消息发送
+        self.async_replies = async_replies
+        # 安全模式的消息加解密，未配置 EncodingAESKey 时为 None
+        self.crypto = crypto
     
     def verify_wechat_signature(self, signature: str, timestamp: str, nonce: str) -> bool:
         """验证微信签名"""
@@ -33,10 +53,33 @@ class MessageService:
         except InvalidSignatureException:
             return False
     
-    def handle_wechat_message(self, xml_data: str) -> str:
+    def handle_encrypted_message(self, data: bytes, signature: str, timestamp: str, nonce: str) -> str | None:
+        """
+        处理安全模式的加密消息：解密后按明文消息处理，回复加密后返回
+
+        Returns:
+            加密的回复；未配置加解密、签名或 AppID 校验失败时返回 None
+        """
+        if self.crypto is None:
+            logger.warning("收到加密消息，但未配置 EncodingAESKey")
+            return None
+        try:
+            xml_data = self.crypto.decrypt_message(data, signature, timestamp, nonce)
+        except (InvalidSignatureException, InvalidAppIdException):
+            logger.warning("加密消息校验失败")
+            return None
+        reply = self.handle_wechat_message(xml_data)
+        if reply == NO_REPLY:
+            # success 无需加密
+            return reply
+        return self.crypto.encrypt_message(reply, nonce)
+    
+    def handle_wechat_message(self, xml_data: bytes | str) -> str:
         """处理微信消息"""
-        # 解析消息
-        msg = parse_message(xml_data)
+        # 解析消息：文本消息与普通事件走快速解析，其他类型交给 wechatpy
+        if isinstance(xml_data, str):
+            xml_data = xml_data.encode('utf-8')
+        msg = parse_fast(xml_data) or parse_message(xml_data)
         
         # 检查消息是否成功解析
         if msg is None:
@@ -45,22 +88,39 @@ class MessageService:
         
         logger.info(f"解析微信消息: 类型={msg.type}, 用户={msg.source}")
         
+        if self.reply_cache is not None:
+            return self.reply_cache.get_or_render(msg, lambda: self._reply(msg))
+        return self._reply(msg)
+    
+    def _reply(self, msg) -> str:
+        """处理消息并渲染回复"""
         # 根据消息类型处理
         if msg.type == 'text':
             response_content = self._handle_text_message(msg.source, msg.content)
+            if response_content is None:
+                # 命令已转入后台执行，结果稍后推送
+                return NO_REPLY
         elif msg.type == 'event':
             response_content = self._handle_event_message(msg.source, msg.event)
         else:
             response_content = HELP_MESSAGES["INSTRUCTIONS"]
         
         # 构造响应
+        if isinstance(msg, InboundMessage):
+            return render_text_reply(msg, response_content)
         reply = create_reply(response_content, msg)
         return reply.render()
     
-    def _handle_text_message(self, user_id: str, content: str) -> str:
-        """处理文本消息"""
+    def _handle_text_message(self, user_id: str, content: str) -> str | None:
+        """处理文本消息，命令改为异步执行时返回 None"""
         content = content.strip().lower()
-        return self.router.route(user_id, content)
+        if self.async_replies is None:
+            return self.router.route(user_id, content)
+        command = self.router.command_name(content)
+        if self.async_replies.should_defer(command):
+            self.async_replies.submit(user_id, command, lambda: self.router.route(user_id, content))
+            return None
+        return self.async_replies.measure(command, lambda: self.router.route(user_id, content))
 
     def _handle_event_message(self, user_id: str, event: str) -> str:
         """处理事件消息"""
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+昵称服务
+缓存微信用户昵称，未命中时在回复之后由后台线程获取并写回用户记录，创建与加入房间不再等待微信接口
+
+- 昵称缓存在 Redis 中并设有过期时间，所有 worker 共享
+- 同一用户的获取以 SET NX 锁去重，多个 worker 同时未命中时只有一个调用微信接口；
+  获取失败时锁自然过期，期间不会重复请求
+- 开局时整个房间未命中缓存的成员以一次批量接口获取
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import redis
+
+from src.repositories.unit_of_work import UnitOfWork
+from src.repositories.user_repository import UserRepository
+from src.services.push_service import PushService
+from src.utils.logger import log_exception, setup_logger
+from src.utils.metrics import MetricsRegistry, registry as default_registry
+
+logger = setup_logger(__name__)
+
+
+class NicknameService:
+    """昵称服务"""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        push_service: PushService,
+        user_repo: UserRepository,
+        ttl_seconds: int = 7 * 24 * 60 * 60,
+        lock_seconds: int = 30,
+        max_workers: int = 2,
+        metrics: MetricsRegistry | None = None,
+    ):
+        self.redis = redis_client
+        self.push = push_service
+        self.user_repo = user_repo
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds
+        self.max_workers = max_workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        # 记录创建线程池的进程，fork 后的子进程需要重新创建
+        self._pid: int | None = None
+
+        metrics = metrics or default_registry
+        self._hits = metrics.counter("nickname_cache_hit_total", "昵称缓存命中次数")
+        self._misses = metrics.counter("nickname_cache_miss_total", "昵称缓存未命中次数")
+        self._fetches = metrics.counter("nickname_fetch_total", "调用微信接口获取昵称的次数")
+
+    @staticmethod
+    def _cache_key(openid: str) -> str:
+        return f"nickname:{openid}"
+
+    @staticmethod
+    def _lock_key(openid: str) -> str:
+        return f"nickname:lock:{openid}"
+
+    def cached(self, openid: str) -> str | None:
+        """
+        读取缓存的昵称
+
+        Returns:
+            昵称；未命中或缓存不可用时返回 None
+        """
+        try:
+            value = self.redis.get(self._cache_key(openid))
+        except redis.RedisError as e:
+            logger.warning(f"读取昵称缓存失败: {e}")
+            return None
+        if value is None:
+            self._misses.inc()
+            return None
+        self._hits.inc()
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def enrich_later(self, openid: str) -> None:
+        """
+        在后台获取昵称并写回用户记录
+
+        处于工作单元中时在提交之后才开始，保证用户记录已经写入
+        """
+        uow = UnitOfWork.current()
+        if uow is not None:
+            uow.after_commit(lambda: self._submit(self.enrich, openid))
+        else:
+            self._submit(self.enrich, openid)
+
+    def enrich_many_later(self, openids: list[str]) -> None:
+        """在后台以批量接口获取多个用户的昵称，处于工作单元中时在提交之后才开始"""
+        openids = list(openids)
+        uow = UnitOfWork.current()
+        if uow is not None:
+            uow.after_commit(lambda: self._submit(self.enrich_many, openids))
+        else:
+            self._submit(self.enrich_many, openids)
+
+    def enrich(self, openid: str) -> str | None:
+        """
+        获取昵称，写入缓存并更新用户记录
+
+        Returns:
+            获取到的昵称；其他 worker 正在获取或获取失败时返回 None
+        """
+        try:
+            if not self.redis.set(self._lock_key(openid), 1, nx=True, ex=self.lock_seconds):
+                return None
+            self._fetches.inc()
+            nickname = self.push.get_user_nickname(openid)
+            if not nickname:
+                return None
+            self.redis.set(self._cache_key(openid), nickname, ex=self.ttl_seconds)
+            self.redis.delete(self._lock_key(openid))
+            self.user_repo.update_nickname(openid, nickname)
+            return nickname
+        except Exception as e:
+            log_exception(logger, e, {'user_id': openid})
+            return None
+
+    def enrich_many(self, openids: list[str]) -> dict[str, str]:
+        """
+        获取多个用户中未命中缓存的昵称，写入缓存并更新用户记录
+
+        Returns:
+            本次获取到的 openid 到昵称的映射
+        """
+        try:
+            openids = list(dict.fromkeys(openids))
+            cached = self.redis.mget([self._cache_key(openid) for openid in openids])
+            missing = [openid for openid, value in zip(openids, cached, strict=True) if value is None]
+            if not missing:
+                return {}
+            self._misses.inc(len(missing))
+
+            pipe = self.redis.pipeline(transaction=False)
+            for openid in missing:
+                pipe.set(self._lock_key(openid), 1, nx=True, ex=self.lock_seconds)
+            locked = [openid for openid, acquired in zip(missing, pipe.execute(), strict=True) if acquired]
+            if not locked:
+                return {}
+
+            self._fetches.inc()
+            nicknames = self.push.get_user_nicknames(locked)
+            if nicknames:
+                pipe = self.redis.pipeline(transaction=False)
+                for openid, nickname in nicknames.items():
+                    pipe.set(self._cache_key(openid), nickname, ex=self.ttl_seconds)
+                pipe.delete(*(self._lock_key(openid) for openid in nicknames))
+                pipe.execute()
+            for openid, nickname in nicknames.items():
+                self.user_repo.update_nickname(openid, nickname)
+            return nicknames
+        except Exception as e:
+            log_exception(logger, e, {'user_ids': openids})
+            return {}
+
+    def join(self) -> None:
+        """等待已提交的获取全部完成"""
+        with self._lock:
+            executor, self._executor, self._pid = self._executor, None, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _submit(self, task, *args) -> None:
+        pid = os.getpid()
+        with self._lock:
+            if self._pid != pid:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="nickname")
+                self._pid = pid
+            self._executor.submit(task, *args)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+推送分发器
+以有界队列加固定数量的工作线程异步执行推送，请求线程提交后立即返回
+
+队列已满或微信接口熔断时丢弃推送并计数，避免微信接口变慢时拖垮请求线程或无限占用内存；
+队列按优先级出队，配置限流器时发送前先取得令牌
+"""
+
+import itertools
+import os
+import queue
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from src.exceptions import CircuitOpenError
+from src.services.rate_limiter import PRIORITIES, PRIORITY_NORMAL, RateLimiter, priority_rank
+from src.utils.logger import setup_logger
+from src.utils.metrics import MetricsRegistry, registry as default_registry
+
+logger = setup_logger(__name__)
+
+# 停止信号排在所有推送之后
+_STOP_RANK = len(PRIORITIES) + 1
+
+
+class PushDispatcher:
+    """推送分发器"""
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_queue: int = 1000,
+        metrics: MetricsRegistry | None = None,
+        limiter: RateLimiter | None = None,
+        throttle_timeout_seconds: float = 10.0,
+    ):
+        self.max_workers = max_workers
+        self.limiter = limiter
+        self.throttle_timeout_seconds = throttle_timeout_seconds
+        self._queue: queue.PriorityQueue = queue.PriorityQueue(maxsize=max_queue)
+        # 同一优先级内保持提交顺序
+        self._sequence = itertools.count()
+        self._workers: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        # 记录启动线程的进程，gunicorn 预加载后 fork 的子进程需要重新启动线程
+        self._pid: int | None = None
+
+        metrics = metrics or default_registry
+        metrics.gauge("push_queue_depth", "待发送的推送数量", callback=self._queue.qsize)
+        self._latency = metrics.histogram("push_send_seconds", "单次推送耗时（秒）")
+        self._sent = metrics.counter("push_sent_total", "发送成功的推送数量")
+        self._failed = metrics.counter("push_failed_total", "发送失败的推送数量")
+        self._dropped = metrics.counter("push_dropped_total", "因队列已满或微信接口熔断被丢弃的推送数量")
+
+    def submit(self, send: Callable[..., Any], *args: Any, priority: str = PRIORITY_NORMAL) -> bool:
+        """
+        提交一次推送
+
+        Args:
+            send: 执行推送的函数，返回假值或抛出异常视为失败
+            *args: 传给 send 的参数
+            priority: 优先级，高优先级先出队，并可使用限流器为其预留的令牌
+
+        Returns:
+            是否成功入队
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((priority_rank(priority), next(self._sequence), send, args, priority))
+            return True
+        except queue.Full:
+            self._dropped.inc()
+            logger.warning("推送队列已满，丢弃推送", extra={'queue_size': self._queue.maxsize})
+            return False
+
+    def join(self) -> None:
+        """等待已提交的推送全部执行完毕"""
+        self._queue.join()
+
+    def shutdown(self) -> None:
+        """执行完已提交的推送后停止工作线程"""
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._pid = None
+        for _ in workers:
+            self._queue.put((_STOP_RANK, next(self._sequence), None, (), None))
+        for worker in workers:
+            worker.join()
+
+    def _ensure_started(self) -> None:
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._workers = [
+                threading.Thread(target=self._run, name=f"push-dispatcher-{i}", daemon=True)
+                for i in range(self.max_workers)
+            ]
+            for worker in self._workers:
+                worker.start()
+            self._pid = pid
+
+    def _run(self) -> None:
+        while True:
+            rank, _, send, args, priority = self._queue.get()
+            try:
+                if rank == _STOP_RANK:
+                    return
+                self._execute(send, args, priority)
+            finally:
+                self._queue.task_done()
+
+    def _execute(self, send: Callable[..., Any], args: tuple, priority: str) -> None:
+        if self.limiter is not None and not self.limiter.acquire(priority, self.throttle_timeout_seconds):
+            logger.warning("推送等待限流令牌超时，放弃推送", extra={'priority': priority})
+            self._failed.inc()
+            return
+        started = time.perf_counter()
+        try:
+            ok = bool(send(*args))
+        except CircuitOpenError:
+            self._dropped.inc()
+            logger.debug("微信接口熔断中，丢弃推送")
+            return
+        except Exception as e:
+            logger.warning(f"推送异常: {e}")
+            ok = False
+        self._latency.observe(time.perf_counter() - started)
+        if ok:
+            self._sent.inc()
+        else:
+            self._failed.inc()
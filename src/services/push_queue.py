@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+持久化推送队列
+推送消息写入 Redis Stream，由独立的推送进程以消费组消费（python -m src.jobs.push_worker）
+
+- 每条消息带幂等键：入队时重复的键被忽略，发送成功后记为已发送，重复投递时直接确认
+- 发送失败按指数退避写入重试集合，到期后重新入队；超过最大次数转入死信流
+- 消费者崩溃时未确认的消息留在待处理列表，闲置超时后由其他消费者认领
+
+投递语义为至少一次：发送成功后、确认前崩溃的消息会被再次发送
+"""
+
+import json
+import time
+import uuid
+
+import redis
+
+from src.services.rate_limiter import PRIORITY_NORMAL
+from src.utils.logger import log_exception, setup_logger
+
+logger = setup_logger(__name__)
+
+# 入队：幂等键不存在时才写入流
+_ENQUEUE = """
+if not redis.call('SET', KEYS[2], 'queued', 'NX', 'EX', ARGV[1]) then
+    return false
+end
+return redis.call('XADD', KEYS[1], '*', 'key', ARGV[2], 'openid', ARGV[3], 'content', ARGV[4],
+    'attempts', ARGV[5], 'priority', ARGV[6])
+"""
+
+# 安排重试：写入重试集合并确认、删除原消息
+_RETRY = """
+local now = redis.call('TIME')
+local due = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000) + tonumber(ARGV[2])
+redis.call('ZADD', KEYS[1], due, ARGV[3])
+redis.call('XACK', KEYS[2], ARGV[1], ARGV[4])
+redis.call('XDEL', KEYS[2], ARGV[4])
+return due
+"""
+
+# 将到期的重试消息移回流
+_PROMOTE = """
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now_ms, 'LIMIT', 0, tonumber(ARGV[1]))
+for _, payload in ipairs(due) do
+    local fields = cjson.decode(payload)
+    redis.call('XADD', KEYS[2], '*', 'key', fields.key, 'openid', fields.openid,
+        'content', fields.content, 'attempts', tostring(fields.attempts), 'priority', fields.priority or 'normal')
+    redis.call('ZREM', KEYS[1], payload)
+end
+return #due
+"""
+
+
+def _decode(value) -> str:
+    return value.decode('utf-8') if isinstance(value, bytes) else str(value)
+
+
+class PushMessage:
+    """从流中读取的一条推送消息"""
+
+    __slots__ = ('entry_id', 'key', 'openid', 'content', 'attempts', 'priority')
+
+    def __init__(
+        self, entry_id: str, key: str, openid: str, content: str, attempts: int, priority: str = PRIORITY_NORMAL
+    ):
+        self.entry_id = entry_id
+        self.key = key
+        self.openid = openid
+        self.content = content
+        self.attempts = attempts
+        self.priority = priority
+
+    @classmethod
+    def from_entry(cls, entry_id, fields: dict) -> 'PushMessage':
+        fields = {_decode(name): _decode(value) for name, value in fields.items()}
+        return cls(
+            _decode(entry_id),
+            fields.get('key', ''),
+            fields.get('openid', ''),
+            fields.get('content', ''),
+            int(fields.get('attempts', 0)),
+            fields.get('priority', PRIORITY_NORMAL),
+        )
+
+    def to_fields(self) -> dict:
+        return {
+            'key': self.key,
+            'openid': self.openid,
+            'content': self.content,
+            'attempts': self.attempts,
+            'priority': self.priority,
+        }
+
+
+class PushQueue:
+    """基于 Redis Stream 的推送队列"""
+
+    stream_key = "push:stream"
+    retry_key = "push:retry"
+    dead_letter_key = "push:dead"
+    group = "push-workers"
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        idempotency_ttl_seconds: int = 86400,
+        dead_letter_max_len: int = 10000,
+    ):
+        self.redis = redis_client
+        self.idempotency_ttl_seconds = idempotency_ttl_seconds
+        self.dead_letter_max_len = dead_letter_max_len
+        self._enqueue = redis_client.register_script(_ENQUEUE)
+        self._retry = redis_client.register_script(_RETRY)
+        self._promote = redis_client.register_script(_PROMOTE)
+
+    @staticmethod
+    def _idempotency_key(key: str) -> str:
+        return f"push:idem:{key}"
+
+    def enqueue(
+        self, openid: str, content: str, idempotency_key: str | None = None, priority: str = PRIORITY_NORMAL
+    ) -> bool:
+        """
+        写入一条推送
+
+        Args:
+            openid: 接收者
+            content: 文本内容
+            idempotency_key: 幂等键，相同的键在有效期内只推送一次；不传时自动生成
+            priority: 优先级
+
+        Returns:
+            是否成功入队；重复的幂等键视为已入队，返回 True
+        """
+        key = idempotency_key or uuid.uuid4().hex
+        try:
+            self._enqueue(
+                keys=[self.stream_key, self._idempotency_key(key)],
+                args=[self.idempotency_ttl_seconds, key, openid, content, 0, priority],
+            )
+            return True
+        except redis.RedisError as e:
+            log_exception(logger, e, {'operation': 'enqueue_push'})
+            return False
+
+    def ensure_group(self) -> None:
+        """创建消费组，已存在时忽略"""
+        try:
+            self.redis.xgroup_create(self.stream_key, self.group, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def read(self, consumer: str, count: int, block_ms: int | None = None) -> list[PushMessage]:
+        """读取分配给该消费者的新消息"""
+        response = self.redis.xreadgroup(self.group, consumer, {self.stream_key: '>'}, count=count, block=block_ms)
+        return [
+            PushMessage.from_entry(entry_id, fields) for _, entries in response or [] for entry_id, fields in entries
+        ]
+
+    def claim_stale(self, consumer: str, min_idle_ms: int, count: int) -> list[PushMessage]:
+        """认领其他消费者闲置超时未确认的消息"""
+        response = self.redis.xautoclaim(
+            self.stream_key, self.group, consumer, min_idle_ms, start_id='0-0', count=count
+        )
+        # 已被删除的条目以 None 返回
+        return [PushMessage.from_entry(entry_id, fields) for entry_id, fields in response[1] if fields]
+
+    def sent_keys(self, keys: list[str]) -> set[str]:
+        """返回其中已发送过的幂等键"""
+        if not keys:
+            return set()
+        states = self.redis.mget([self._idempotency_key(key) for key in keys])
+        return {key for key, state in zip(keys, states, strict=True) if state == b'sent'}
+
+    def ack(self, messages: list[PushMessage], sent: bool = True) -> None:
+        """
+        确认并删除一批消息
+
+        Args:
+            messages: 消息列表
+            sent: 是否将幂等键记为已发送
+        """
+        if not messages:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        if sent:
+            for message in messages:
+                pipe.set(self._idempotency_key(message.key), 'sent', ex=self.idempotency_ttl_seconds)
+        entry_ids = [message.entry_id for message in messages]
+        pipe.xack(self.stream_key, self.group, *entry_ids)
+        pipe.xdel(self.stream_key, *entry_ids)
+        pipe.execute()
+
+    def retry_later(self, message: PushMessage, delay_seconds: float, count_attempt: bool = True) -> None:
+        """确认原消息，并在延迟后重新入队；count_attempt 为假时（如被限流）不计入尝试次数"""
+        fields = message.to_fields()
+        fields['attempts'] = message.attempts + 1 if count_attempt else message.attempts
+        self._retry(
+            keys=[self.retry_key, self.stream_key],
+            args=[self.group, int(delay_seconds * 1000), json.dumps(fields, ensure_ascii=False), message.entry_id],
+        )
+
+    def promote_due(self, limit: int = 100) -> int:
+        """将到期的重试消息移回流，返回移动的数量"""
+        return int(self._promote(keys=[self.retry_key, self.stream_key], args=[limit]))
+
+    def dead_letter(self, message: PushMessage, error: str) -> None:
+        """将消息转入死信流并确认原消息"""
+        fields = message.to_fields()
+        fields.update(attempts=message.attempts + 1, error=error, failed_at=int(time.time()))
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.xadd(self.dead_letter_key, fields, maxlen=self.dead_letter_max_len, approximate=True)
+        pipe.xack(self.stream_key, self.group, message.entry_id)
+        pipe.xdel(self.stream_key, message.entry_id)
+        pipe.execute()
@@ -1,19 +1,41 @@
+from src.exceptions import CircuitOpenError
+from src.services.push_dispatcher import PushDispatcher
+from src.services.push_queue import PushQueue
+from src.services.rate_limiter import PRIORITY_NORMAL
 
 
 class PushService:
-    def __init__(self, client):
+    def __init__(self, client, dispatcher: PushDispatcher | None = None, queue: PushQueue | None = None):
         self.client = client
+        # 配置分发器或持久化队列时推送异步执行，send_text 只表示已入队
+        self.dispatcher = dispatcher
+        # 持久化队列优先，由独立的推送进程发送
+        self.queue = queue
 
     def enabled(self) -> bool:
         return self.client is not None
 
-    def send_text(self, openid: str, content: str) -> bool:
+    def send_text(
+        self, openid: str, content: str, priority: str = PRIORITY_NORMAL, idempotency_key: str | None = None
+    ) -> bool:
         if not self.enabled():
             return False
-        return bool(self.client.send_text(openid, content))
+        if self.queue is not None:
+            # 调用方按业务事件生成的幂等键使重试或重复投递的同一条推送只入队一次
+            return self.queue.enqueue(openid, content, idempotency_key=idempotency_key, priority=priority)
+        if self.dispatcher is not None:
+            return self.dispatcher.submit(self.client.send_text, openid, content, priority=priority)
+        try:
+            return bool(self.client.send_text(openid, content))
+        except CircuitOpenError:
+            return False
 
     def get_user_nickname(self, openid: str) -> str:
         if not self.enabled():
             return ""
         return self.client.get_user_nickname(openid)
 
+    def get_user_nicknames(self, openids: list[str]) -> dict[str, str]:
+        if not self.enabled() or not openids:
+            return {}
+        return self.client.get_user_nicknames(openids)
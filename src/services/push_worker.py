@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+推送消费者
+从持久化推送队列批量读取消息并调用微信接口发送，失败的消息按指数退避重试，超过次数转入死信流
+
+每批消息按优先级发送；配置限流器时发送前先取得令牌，等待超时的消息稍后重试且不计入尝试次数；
+微信接口熔断期间的消息同样留在队列中稍后重试，不计入尝试次数
+"""
+
+import threading
+import time
+
+import redis
+
+from src.exceptions import CircuitOpenError
+from src.services.push_queue import PushMessage, PushQueue
+from src.services.rate_limiter import RateLimiter, priority_rank
+from src.utils.logger import log_exception, setup_logger
+from src.utils.metrics import MetricsRegistry, registry as default_registry
+
+logger = setup_logger(__name__)
+
+
+class PushWorker:
+    """推送消费者"""
+
+    def __init__(
+        self,
+        queue: PushQueue,
+        client,
+        consumer: str,
+        batch_size: int = 10,
+        max_attempts: int = 5,
+        backoff_seconds: float = 2.0,
+        max_backoff_seconds: float = 300.0,
+        claim_idle_seconds: float = 60.0,
+        metrics: MetricsRegistry | None = None,
+        limiter: RateLimiter | None = None,
+        throttle_timeout_seconds: float = 10.0,
+    ):
+        self.queue = queue
+        self.client = client
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.claim_idle_seconds = claim_idle_seconds
+        self.limiter = limiter
+        self.throttle_timeout_seconds = throttle_timeout_seconds
+
+        metrics = metrics or default_registry
+        self._latency = metrics.histogram("push_send_seconds", "单次推送耗时（秒）")
+        self._sent = metrics.counter("push_sent_total", "发送成功的推送数量")
+        self._failed = metrics.counter("push_failed_total", "发送失败的推送数量")
+        self._retried = metrics.counter("push_retried_total", "安排重试的推送数量")
+        self._dead = metrics.counter("push_dead_letter_total", "转入死信流的推送数量")
+        self._duplicates = metrics.counter("push_duplicate_total", "因幂等键已发送而跳过的推送数量")
+
+    def backoff(self, attempts: int) -> float:
+        """第 attempts 次失败后的重试延迟（秒）"""
+        return min(self.max_backoff_seconds, self.backoff_seconds * (2 ** (attempts - 1)))
+
+    def run_once(self, block_ms: int | None = None) -> int:
+        """
+        处理一批消息：先移回到期的重试消息，再认领超时未确认的消息，最后读取新消息
+
+        Args:
+            block_ms: 没有新消息时阻塞等待的毫秒数，None 表示不等待
+
+        Returns:
+            本批处理的消息数量
+        """
+        self.queue.promote_due(self.batch_size)
+        messages = self.queue.claim_stale(self.consumer, int(self.claim_idle_seconds * 1000), self.batch_size)
+        if not messages:
+            messages = self.queue.read(self.consumer, self.batch_size, block_ms)
+        self._process(messages)
+        return len(messages)
+
+    def run(self, stop_event: threading.Event | None = None, block_ms: int = 1000) -> None:
+        """
+        持续消费，直到 stop_event 被设置；当前批次处理完后才退出
+
+        Args:
+            stop_event: 停止信号
+            block_ms: 每次读取阻塞等待的毫秒数
+        """
+        stop_event = stop_event or threading.Event()
+        self.queue.ensure_group()
+        while not stop_event.is_set():
+            try:
+                self.run_once(block_ms)
+            except redis.RedisError as e:
+                log_exception(logger, e, {'consumer': self.consumer})
+                stop_event.wait(1.0)
+
+    def _process(self, messages: list[PushMessage]) -> None:
+        if not messages:
+            return
+        # 重复投递（如确认前崩溃）的消息已发送过，直接确认
+        sent_keys = self.queue.sent_keys([message.key for message in messages])
+        duplicates = [message for message in messages if message.key in sent_keys]
+        self._duplicates.inc(len(duplicates))
+
+        delivered = []
+        for message in sorted(messages, key=lambda m: priority_rank(m.priority)):
+            if message.key in sent_keys:
+                continue
+            if self.limiter is not None and not self.limiter.acquire(message.priority, self.throttle_timeout_seconds):
+                self.queue.retry_later(message, self.backoff(1), count_attempt=False)
+                continue
+            try:
+                error = self._send(message)
+            except CircuitOpenError:
+                self.queue.retry_later(message, self.backoff(1), count_attempt=False)
+                continue
+            if error is None:
+                delivered.append(message)
+            elif message.attempts + 1 >= self.max_attempts:
+                logger.warning(
+                    "推送多次失败，转入死信流",
+                    extra={'openid': message.openid, 'attempts': message.attempts + 1, 'error': error},
+                )
+                self.queue.dead_letter(message, error)
+                self._dead.inc()
+            else:
+                self.queue.retry_later(message, self.backoff(message.attempts + 1))
+                self._retried.inc()
+
+        self.queue.ack(delivered)
+        self.queue.ack(duplicates, sent=False)
+
+    def _send(self, message: PushMessage) -> str | None:
+        """发送一条消息，成功返回 None，失败返回错误描述；熔断中时抛出 CircuitOpenError"""
+        started = time.perf_counter()
+        try:
+            error = None if self.client.send_text(message.openid, message.content) else "send_text returned False"
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        self._latency.observe(time.perf_counter() - started)
+        if error is None:
+            self._sent.inc()
+        else:
+            self._failed.inc()
+        return error
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+推送限流器
+以 Redis 中的令牌桶限制微信客服消息接口的调用速率，所有 worker 与实例共享同一个桶
+
+令牌按固定速率补充，桶容量决定允许的突发量。低优先级的推送必须在桶中留下一定数量的令牌才能取用，
+这部分令牌只供高优先级推送（开局发词）使用，因此状态刷新再多也不会挤占发词的配额
+"""
+
+import time
+
+import redis
+
+from src.utils.logger import setup_logger
+from src.utils.metrics import MetricsRegistry, registry as default_registry
+
+logger = setup_logger(__name__)
+
+PRIORITY_HIGH = "high"
+PRIORITY_NORMAL = "normal"
+# 按服务顺序排列
+PRIORITIES = (PRIORITY_HIGH, PRIORITY_NORMAL)
+
+# 令牌桶：补充令牌后，剩余令牌不少于预留量时取用；否则返回需要等待的秒数
+_TAKE = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local reserve = tonumber(ARGV[3])
+local requested = tonumber(ARGV[4])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens - requested >= reserve then
+    tokens = tokens - requested
+else
+    wait = (requested + reserve - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+def priority_rank(priority: str) -> int:
+    """优先级的服务顺序，未知的优先级排在最后"""
+    try:
+        return PRIORITIES.index(priority)
+    except ValueError:
+        return len(PRIORITIES)
+
+
+class RateLimiter:
+    """基于 Redis 令牌桶的分布式限流器"""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        rate_per_second: float,
+        capacity: float,
+        high_priority_reserve: float = 0.0,
+        key: str = "ratelimit:wechat:message",
+        metrics: MetricsRegistry | None = None,
+    ):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        # 各优先级取用后桶中至少要剩余的令牌数
+        self.reserves = {PRIORITY_HIGH: 0.0, PRIORITY_NORMAL: min(high_priority_reserve, capacity - 1)}
+        self.key = key
+        self._take = redis_client.register_script(_TAKE)
+
+        metrics = metrics or default_registry
+        self._throttled = metrics.counter("push_throttled_total", "等待令牌超时而放弃的推送数量")
+        self._wait = metrics.histogram("push_throttle_wait_seconds", "推送等待令牌的时间（秒）")
+
+    def try_acquire(self, priority: str = PRIORITY_NORMAL) -> float:
+        """
+        尝试取用一个令牌
+
+        Args:
+            priority: 优先级
+
+        Returns:
+            0 表示已取得令牌，否则为建议等待的秒数
+        """
+        reserve = self.reserves.get(priority, self.reserves[PRIORITY_NORMAL])
+        return float(self._take(keys=[self.key], args=[self.rate_per_second, self.capacity, reserve, 1]))
+
+    def acquire(self, priority: str = PRIORITY_NORMAL, timeout: float = 10.0) -> bool:
+        """
+        阻塞直到取得令牌或超时
+
+        Args:
+            priority: 优先级
+            timeout: 最长等待秒数
+
+        Returns:
+            是否取得令牌；限流器不可用时放行，避免 Redis 故障导致推送全部停止
+        """
+        started = time.monotonic()
+        deadline = started + timeout
+        while True:
+            try:
+                wait = self.try_acquire(priority)
+            except redis.RedisError as e:
+                logger.warning(f"限流器不可用，直接放行: {e}")
+                return True
+            now = time.monotonic()
+            if wait <= 0:
+                self._wait.observe(now - started, {'priority': priority})
+                return True
+            if now + wait > deadline:
+                self._throttled.inc(labels={'priority': priority})
+                return False
+            time.sleep(wait)
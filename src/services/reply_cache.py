@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+被动回复去重缓存
+微信 5 秒内未收到回复时会以相同消息重试，最多三次；同一条消息只处理一次
+
+- 文本等普通消息以 MsgId 去重，事件消息没有 MsgId，以 FromUserName + CreateTime 去重
+- 首个请求以 SET NX 写入处理中标记后执行命令，工作单元提交成功后写入渲染好的回复；提交失败时释放标记
+- 重试请求读到回复时直接返回；仍在处理中时在请求截止时间内等待首个请求完成，超时则回复 success，不再重复执行
+"""
+
+import time
+from collections.abc import Callable
+
+import redis
+
+from src.repositories.unit_of_work import UnitOfWork
+from src.utils import deadline
+from src.utils.logger import log_exception, setup_logger
+from src.utils.metrics import MetricsRegistry, registry as default_registry
+
+logger = setup_logger(__name__)
+
+# 处理中标记，渲染后的回复总是非空
+_PENDING = b""
+
+# 微信约定的"不回复"应答，收到后不再重试
+NO_REPLY = "success"
+
+
+class ReplyCache:
+    """被动回复去重缓存"""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        ttl_seconds: int = 30,
+        wait_seconds: float = 4.5,
+        poll_interval_seconds: float = 0.05,
+        metrics: MetricsRegistry | None = None,
+    ):
+        """
+        Args:
+            redis_client: Redis 客户端
+            ttl_seconds: 回复保留时间，应覆盖微信的全部重试（约 15 秒）
+            wait_seconds: 重试请求等待首个请求完成的最长时间，应小于微信的 5 秒超时；处于请求截止时间内时不超过剩余时间
+            poll_interval_seconds: 等待期间轮询回复的间隔
+        """
+        self.redis = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+
+        metrics = metrics or default_registry
+        self._duplicates = metrics.counter("wechat_duplicate_message_total", "微信重试的重复消息数量")
+
+    @staticmethod
+    def message_key(msg) -> str:
+        """消息的去重键"""
+        if msg.id:
+            return f"reply:{msg.id}"
+        return f"reply:{msg.source}:{msg.time}"
+
+    def get_or_render(self, msg, render: Callable[[], str]) -> str:
+        """
+        返回消息的回复，同一条消息只调用一次 render
+
+        Args:
+            msg: wechatpy 解析后的消息
+            render: 处理消息并返回渲染好的回复
+
+        Returns:
+            回复内容；重复消息在等待超时时返回 NO_REPLY
+        """
+        key = self.message_key(msg)
+        try:
+            claimed = self.redis.set(key, _PENDING, nx=True, ex=self.ttl_seconds)
+        except redis.RedisError as e:
+            # Redis 不可用时不去重，照常处理
+            log_exception(logger, e, {'operation': 'claim_reply', 'key': key})
+            return render()
+
+        if claimed:
+            return self._render(key, render)
+        reply = self._wait(key)
+        if reply is None:
+            # 首个请求处理失败已释放标记，由本次请求重新处理
+            return self.get_or_render(msg, render)
+        return reply
+
+    def _render(self, key: str, render: Callable[[], str]) -> str:
+        try:
+            reply = render()
+        except Exception:
+            # 处理失败时释放标记，微信重试时重新处理
+            self._delete(key)
+            raise
+        uow = UnitOfWork.current()
+        if uow is None:
+            self._save(key, reply)
+        else:
+            # 修改写回成功后才保存回复；提交失败时释放标记，重试请求重新处理而不是拿到未生效的回复
+            uow.after_commit(lambda: self._save(key, reply))
+            uow.after_rollback(lambda: self._delete(key))
+        return reply
+
+    def _save(self, key: str, reply: str) -> None:
+        try:
+            self.redis.set(key, reply, ex=self.ttl_seconds)
+        except redis.RedisError as e:
+            log_exception(logger, e, {'operation': 'save_reply', 'key': key})
+
+    def _wait(self, key: str) -> str | None:
+        # 重试请求可能在微信 5 秒窗口的后段到达，等待不超过本次请求剩余的时间
+        budget = self.wait_seconds
+        left = deadline.remaining()
+        if left is not None:
+            budget = min(budget, max(left, 0.0))
+        wait_until = time.monotonic() + budget
+        while True:
+            try:
+                reply = self.redis.get(key)
+            except redis.RedisError as e:
+                log_exception(logger, e, {'operation': 'wait_reply', 'key': key})
+                return NO_REPLY
+            if reply:
+                self._duplicates.inc(labels={'outcome': 'cached'})
+                return reply.decode('utf-8')
+            if reply is None:
+                return None
+            if time.monotonic() >= wait_until:
+                self._duplicates.inc(labels={'outcome': 'timeout'})
+                logger.warning("重复消息等待首个请求超时", extra={'key': key})
+                return NO_REPLY
+            time.sleep(self.poll_interval_seconds)
+
+    def _delete(self, key: str) -> None:
+        try:
+            self.redis.delete(key)
+        except redis.RedisError as e:
+            log_exception(logger, e, {'operation': 'release_reply', 'key': key})
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+回复跟踪
+记录每个用户最近一次收到完整状态时所在房间的版本号；房间版本未变化时，
+回复不再追加状态与词语，省去读取与渲染，用户发送"查看状态"可随时获取完整信息
+
+房间的任何修改都会递增版本号，判断偏保守：版本变化但内容相同时仍会发送完整状态
+"""
+
+import redis
+
+from src.utils.logger import log_exception, setup_logger
+from src.utils.metrics import MetricsRegistry, registry as default_registry
+
+logger = setup_logger(__name__)
+
+RoomState = tuple[str, int | None]
+
+
+class ReplyTracker:
+    """回复跟踪"""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        ttl_seconds: int = 24 * 60 * 60,
+        metrics: MetricsRegistry | None = None,
+    ):
+        """
+        Args:
+            redis_client: Redis 客户端
+            ttl_seconds: 记录保留时间，过期后下一次回复发送完整状态
+        """
+        self.redis = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = "lastseen:"
+
+        metrics = metrics or default_registry
+        self._replies = metrics.counter("reply_status_total", "回复中状态块的处理方式（full 完整追加，unchanged 省略）")
+
+    def _key(self, user_id: str) -> str:
+        return f"{self.prefix}{user_id}"
+
+    @staticmethod
+    def _encode(state: RoomState) -> bytes:
+        room_id, version = state
+        return f"{room_id}:{version}".encode()
+
+    def is_current(self, user_id: str, state: RoomState) -> bool:
+        """
+        用户是否已看过房间的当前版本
+
+        Args:
+            user_id: 用户ID
+            state: (房间号, 版本号)，版本号为 None 表示房间正在变化或版本未知
+
+        Returns:
+            已看过时为 True；版本未知或读取失败时为 False，由调用方发送完整状态
+        """
+        if state[1] is None:
+            self._replies.inc(labels={'outcome': 'full'})
+            return False
+        try:
+            seen = self.redis.get(self._key(user_id))
+        except redis.RedisError as e:
+            log_exception(logger, e, {'operation': 'read_last_seen', 'user_id': user_id})
+            seen = None
+        current = seen == self._encode(state)
+        self._replies.inc(labels={'outcome': 'unchanged' if current else 'full'})
+        return current
+
+    def mark(self, user_id: str, state: RoomState) -> None:
+        """记录用户已看过房间的该版本，版本未知时不记录"""
+        if state[1] is None:
+            return
+        try:
+            self.redis.set(self._key(user_id), self._encode(state), ex=self.ttl_seconds)
+        except redis.RedisError as e:
+            log_exception(logger, e, {'operation': 'mark_last_seen', 'user_id': user_id})
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+房间过期处理服务
+房间因超时过期后，批量清除其成员的当前房间并归还房间号；每次扫描后顺带维护房间号池
+
+过期事件有两个来源：
+- Redis 键空间通知（notify-keyspace-events 含 Ex），实时但不保证送达
+- 定期扫描房间过期索引，作为通知丢失时的兜底
+"""
+
+import re
+import threading
+import time
+
+import redis
+
+from src.exceptions import RedisConnectionError, RepositoryException
+from src.repositories.room_id_allocator import RoomIdAllocator
+from src.repositories.room_repository import RoomRepository
+from src.repositories.user_repository import UserRepository
+from src.utils.logger import log_business_event, log_exception, setup_logger
+
+logger = setup_logger(__name__)
+
+_ROOM_KEY = re.compile(r'^room:(\d+)$')
+
+
+class RoomExpiryService:
+    """房间过期处理服务"""
+
+    def __init__(
+        self,
+        room_repo: RoomRepository,
+        user_repo: UserRepository,
+        id_allocator: RoomIdAllocator | None = None,
+    ):
+        self.room_repo = room_repo
+        self.user_repo = user_repo
+        self.id_allocator = id_allocator
+
+    def handle_expired(self, room_id: str) -> int:
+        """
+        处理单个过期房间
+
+        Args:
+            room_id: 房间号
+
+        Returns:
+            被清除当前房间的成员数量；房间仍存在或已被其他进程处理时返回 0
+
+        Raises:
+            RepositoryException: 仓储访问失败
+        """
+        members = self.room_repo.claim_expired(room_id)
+        if members is None:
+            return 0
+
+        # 读改写期间成员可能加入其他房间，按当前房间比较后再清除，不覆盖并发写入
+        cleared = len(self.user_repo.clear_room_many(members, room_id))
+
+        if self.id_allocator is not None:
+            self.id_allocator.release(room_id)
+
+        log_business_event(logger, "过期房间已清理", room_id=room_id, cleared=cleared)
+        return cleared
+
+    def sweep(self, limit: int = 100) -> int:
+        """
+        扫描过期索引，处理所有已过期的房间
+
+        Args:
+            limit: 单批处理的房间数量
+
+        Returns:
+            处理的房间数量
+
+        Raises:
+            RepositoryException: 仓储访问失败
+        """
+        handled = 0
+        while True:
+            room_ids = self.room_repo.expired_room_ids(limit)
+            for room_id in room_ids:
+                self.handle_expired(room_id)
+            handled += len(room_ids)
+            if len(room_ids) < limit:
+                return handled
+
+    def maintain_id_pool(self) -> None:
+        """
+        按批回收房间已不存在但未释放的号码，空闲号码不足时继续填充号码池
+
+        Raises:
+            RepositoryException: 仓储访问失败
+        """
+        if self.id_allocator is None:
+            return
+        self.id_allocator.reclaim()
+        self.id_allocator.replenish()
+
+    def run(
+        self,
+        redis_client: redis.Redis,
+        sweep_interval_seconds: float = 60.0,
+        stop_event: threading.Event | None = None,
+    ) -> None:
+        """
+        持续处理过期房间：订阅键空间通知，并按固定间隔扫描过期索引
+
+        Args:
+            redis_client: 用于订阅通知的 Redis 客户端
+            sweep_interval_seconds: 扫描间隔秒数
+            stop_event: 设置后退出循环
+        """
+        stop_event = stop_event or threading.Event()
+        pubsub = self._subscribe(redis_client)
+        next_sweep = 0.0
+        while not stop_event.is_set():
+            try:
+                if time.monotonic() >= next_sweep:
+                    self.sweep()
+                    self.maintain_id_pool()
+                    next_sweep = time.monotonic() + sweep_interval_seconds
+                if pubsub is None:
+                    stop_event.wait(max(0.0, next_sweep - time.monotonic()))
+                    continue
+                message = pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None:
+                    self._on_expired(message['data'])
+            except (RepositoryException, RedisConnectionError, redis.RedisError) as e:
+                log_exception(logger, e)
+                stop_event.wait(sweep_interval_seconds)
+        if pubsub is not None:
+            pubsub.close()
+
+    def _on_expired(self, key) -> None:
+        if isinstance(key, bytes):
+            key = key.decode('utf-8')
+        match = _ROOM_KEY.match(key)
+        if match:
+            self.handle_expired(match.group(1))
+
+    @staticmethod
+    def _subscribe(redis_client: redis.Redis):
+        """开启并订阅过期事件通知，不可用时只依赖定期扫描"""
+        try:
+            try:
+                redis_client.config_set('notify-keyspace-events', 'Ex')
+            except redis.ResponseError:
+                # 托管 Redis 可能禁用 CONFIG 命令，需由运维预先开启通知
+                logger.warning("无法开启键空间通知，请确认 notify-keyspace-events 已包含 Ex")
+            pubsub = redis_client.pubsub()
+            pubsub.psubscribe('__keyevent@*__:expired')
+            return pubsub
+        except redis.RedisError as e:
+            logger.warning(f"订阅过期事件失败，仅使用定期扫描: {e}")
+            return None
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+微信 access token 管理器
+access token 保存在 Redis 中由所有 worker 共享，后台线程在过期前主动刷新
+
+- 刷新前以 SET NX 加锁，同一时刻只有一个 worker 调用微信 token 接口，其余 worker 等待并读取共享的新值
+- 后台线程定期检查剩余有效期，低于阈值时刷新，请求不会因 token 过期而承担刷新耗时
+- token 被判定失效（如 40001）时，只有仍持有该旧 token 的调用者会触发刷新，已被其他 worker 刷新则直接使用新值
+- token 旁边保存过期时间戳，与 token 在同一事务中写入；读取时一次 MGET 同时取得 token 与剩余有效期
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections.abc import Callable
+
+import redis
+
+from src.utils.logger import log_exception, setup_logger
+from src.utils.metrics import MetricsRegistry, registry as default_registry
+
+logger = setup_logger(__name__)
+
+# 仅当锁仍由自己持有时释放
+_RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class TokenManager:
+    """access token 管理器"""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        session,
+        token_key: str,
+        fetch: Callable[[], dict],
+        refresh_margin_seconds: int = 600,
+        check_interval_seconds: float = 60.0,
+        lock_seconds: int = 30,
+        metrics: MetricsRegistry | None = None,
+    ):
+        """
+        Args:
+            redis_client: Redis 客户端
+            session: wechatpy 的 RedisStorage，token 以 wechatpy 的格式保存，客户端可直接读取
+            token_key: token 在 session 中的键
+            fetch: 调用微信 token 接口，返回包含 access_token 与 expires_in 的结果
+            refresh_margin_seconds: 剩余有效期低于该值时刷新
+            check_interval_seconds: 后台检查间隔
+            lock_seconds: 刷新锁的超时时间，也是等待其他 worker 刷新的最长时间
+        """
+        self.redis = redis_client
+        self.session = session
+        self.token_key = token_key
+        self.fetch = fetch
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self.lock_seconds = lock_seconds
+        self._redis_key = session.key_name(token_key)
+        self._fetched_at_key = f"{self._redis_key}:fetched_at"
+        self._expires_at_key = f"{self._redis_key}:expires_at"
+        self._lock_key = f"{self._redis_key}:lock"
+        self._release_lock = redis_client.register_script(_RELEASE_LOCK)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        # 记录启动线程的进程，fork 后的子进程需要重新启动
+        self._pid: int | None = None
+
+        metrics = metrics or default_registry
+        self._age = metrics.gauge("wechat_token_age_seconds", "当前 access token 距获取时的秒数")
+        self._latency = metrics.histogram("wechat_token_refresh_seconds", "调用微信接口刷新 access token 的耗时（秒）")
+        self._refreshed = metrics.counter("wechat_token_refresh_total", "本进程刷新 access token 的次数")
+        self._failed = metrics.counter("wechat_token_refresh_failed_total", "刷新 access token 失败的次数")
+
+    def current(self) -> tuple[str | None, int]:
+        """
+        读取共享的 token
+
+        Returns:
+            (token, 剩余有效秒数)，不存在时为 (None, 0)
+        """
+        raw, expires_at = self.redis.mget(self._redis_key, self._expires_at_key)
+        if raw is None:
+            return None, 0
+        token = json.loads(raw)
+        if expires_at is None:
+            # 没有过期时间戳的 token（如由旧版本写入）退回读取键的剩余有效期
+            return token, max(self.redis.ttl(self._redis_key), 0)
+        return token, max(int(expires_at) - int(time.time()), 0)
+
+    def refresh(self, min_ttl: int = 60, stale_token: str | None = None) -> tuple[str, int]:
+        """
+        确保共享 token 可用并返回
+
+        Args:
+            min_ttl: 剩余有效期低于该值时刷新
+            stale_token: 已知失效的 token，共享值仍是它时强制刷新
+
+        Returns:
+            (token, 剩余有效秒数)
+
+        Raises:
+            TimeoutError: 等待其他 worker 刷新超时且没有可用的 token
+            WeChatClientException: 调用微信接口失败
+        """
+        deadline = time.monotonic() + self.lock_seconds
+        while True:
+            token, ttl = self.current()
+            if token and token != stale_token and ttl > min_ttl:
+                self._observe_age()
+                return token, ttl
+
+            owner = uuid.uuid4().hex
+            if self.redis.set(self._lock_key, owner, nx=True, ex=self.lock_seconds):
+                try:
+                    # 取得锁后再确认一次，其他 worker 可能刚刚完成刷新
+                    token, ttl = self.current()
+                    if token and token != stale_token and ttl > min_ttl:
+                        return token, ttl
+                    return self._fetch()
+                finally:
+                    self._release_lock(keys=[self._lock_key], args=[owner])
+
+            if time.monotonic() >= deadline:
+                if token and token != stale_token:
+                    return token, ttl
+                raise TimeoutError("等待 access token 刷新超时")
+            time.sleep(0.05)
+
+    def start(self) -> None:
+        """在当前进程启动后台刷新线程，已启动时不做处理"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._start_lock:
+            if self._pid == pid:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="wechat-token-refresher", daemon=True)
+            self._thread.start()
+            self._pid = pid
+
+    def stop(self) -> None:
+        """停止后台刷新线程"""
+        with self._start_lock:
+            thread, self._thread, self._pid = self._thread, None, None
+        self._stop.set()
+        if thread is not None:
+            thread.join()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.refresh(min_ttl=self.refresh_margin_seconds)
+            except Exception as e:
+                log_exception(logger, e, {'operation': 'refresh_access_token'})
+            if self._stop.wait(self.check_interval_seconds):
+                return
+
+    def _fetch(self) -> tuple[str, int]:
+        started = time.perf_counter()
+        try:
+            result = self.fetch()
+        except Exception:
+            self._failed.inc()
+            raise
+        self._latency.observe(time.perf_counter() - started)
+        self._refreshed.inc()
+
+        token = result['access_token']
+        expires_in = int(result.get('expires_in', 7200))
+        now = int(time.time())
+        # 以 wechatpy RedisStorage 的格式写入 token，过期时间戳在同一事务中写入，读取方不会看到不一致的组合
+        pipe = self.redis.pipeline()
+        pipe.set(self._redis_key, json.dumps(token), ex=expires_in)
+        pipe.set(self._expires_at_key, now + expires_in, ex=expires_in)
+        pipe.set(self._fetched_at_key, now, ex=expires_in)
+        pipe.execute()
+        self._age.set(0)
+        logger.info("access token 已刷新", extra={'expires_in': expires_in})
+        return token, expires_in
+
+    def _observe_age(self) -> None:
+        fetched_at = self.redis.get(self._fetched_at_key)
+        if fetched_at is not None:
+            self._age.set(max(0, int(time.time()) - int(fetched_at)))
@@ -1,26 +1,185 @@
+import threading
+
+import requests
 from redis import Redis
 from wechatpy import WeChatClient as BaseWeChatClient
+from wechatpy.exceptions import WeChatClientException
 from wechatpy.session.redisstorage import RedisStorage
 
+from src.exceptions import CircuitOpenError
+from src.services.circuit_breaker import CircuitBreakers
+from src.services.http_session import create_session
+from src.services.token_manager import TokenManager
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# 批量获取用户信息接口单次最多 100 个 openid
+USER_BATCH_SIZE = 100
+
+# 共享 token 剩余有效期低于该秒数时，请求在使用前先刷新
+TOKEN_MIN_TTL_SECONDS = 60
+
+# 熔断器名称，按微信接口区分
+OPERATION_SEND_TEXT = "message.send_text"
+OPERATION_USER_INFO = "user.info"
+OPERATION_USER_BATCH = "user.batch_info"
+
+
+def _is_outage(error: Exception) -> bool:
+    """网络错误、HTTP 错误状态与系统繁忙（-1）视为接口故障；业务错误码说明接口仍可用"""
+    if isinstance(error, requests.RequestException):
+        return True
+    return isinstance(error, WeChatClientException) and error.errcode in (None, -1)
+
+
+class _ManagedWeChatClient(BaseWeChatClient):
+    """access token 交由 TokenManager 统一刷新的 wechatpy 客户端"""
+
+    token_manager: TokenManager | None = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 当前线程最近一次请求使用的 token，收到 token 失效错误时据此判断是否需要刷新
+        self._used_token = threading.local()
+
+    @property
+    def access_token(self):
+        if self.token_manager is None:
+            return super().access_token
+        self.token_manager.start()
+        # 以共享 token 的剩余有效期为准，不使用进程内记录的过期时间：其他 worker 刷新后本进程直接复用；
+        # token 与过期时间戳一次读取，每次调用只有一次 Redis 往返
+        token, ttl = self.token_manager.current()
+        if token and ttl > TOKEN_MIN_TTL_SECONDS:
+            return token
+        token, _ = self.token_manager.refresh(min_ttl=TOKEN_MIN_TTL_SECONDS)
+        return token
+
+    def _handle_result(self, res, method=None, url=None, result_processor=None, **kwargs):
+        params = kwargs.get('params')
+        self._used_token.value = params.get('access_token') if isinstance(params, dict) else None
+        return super()._handle_result(res, method, url, result_processor, **kwargs)
+
+    def fetch_access_token(self):
+        if self.token_manager is None:
+            return self.fetch_access_token_from_wechat()
+        # wechatpy 收到 token 失效错误（40001 等）时调用：只有共享值仍是这次请求使用的 token 时才刷新
+        stale_token = getattr(self._used_token, 'value', None)
+        self._used_token.value = None
+        token, ttl = self.token_manager.refresh(min_ttl=TOKEN_MIN_TTL_SECONDS, stale_token=stale_token)
+        return {'access_token': token, 'expires_in': ttl}
+
+    def fetch_access_token_from_wechat(self):
+        return self._fetch_access_token(
+            url=self.API_BASE_URL + 'token',
+            params={'grant_type': 'client_credential', 'appid': self.appid, 'secret': self.secret}
+        )
+
 
 class WeChatClient:
-    def __init__(self, app_id: str, app_secret: str, redis_client: Redis = None):
+    def __init__(
+        self,
+        app_id: str,
+        app_secret: str,
+        redis_client: Redis = None,
+        api_base_url: str | None = None,
+        token_refresh_margin_seconds: int = 600,
+        http_session: requests.Session | None = None,
+        breakers: CircuitBreakers | None = None,
+    ):
         if redis_client:
             session_interface = RedisStorage(redis_client, prefix="wechatpy")
-            self.client = BaseWeChatClient(app_id, app_secret, session=session_interface)
+            self.client = _ManagedWeChatClient(app_id, app_secret, session=session_interface)
+            # 多个 worker 共享 token，由后台线程在过期前加锁刷新
+            self.token_manager = TokenManager(
+                redis_client,
+                session_interface,
+                self.client.access_token_key,
+                self.client.fetch_access_token_from_wechat,
+                refresh_margin_seconds=token_refresh_margin_seconds,
+            )
+            self.client.token_manager = self.token_manager
         else:
             self.client = BaseWeChatClient(app_id, app_secret)
+            self.token_manager = None
+        if api_base_url:
+            # 指向代理或本地模拟服务
+            self.client.API_BASE_URL = api_base_url
+        # 替换 wechatpy 默认的会话：复用连接，所有请求都有超时
+        self.client._http = http_session or create_session()
+        # 每个接口一个熔断器，微信接口故障时快速失败，不再逐个等待超时
+        self.breakers = breakers or CircuitBreakers()
 
     def send_text(self, openid: str, content: str) -> bool:
+        """
+        发送客服文本消息
+
+        Returns:
+            是否发送成功
+
+        Raises:
+            CircuitOpenError: 发送接口熔断中，由调用方决定稍后重试或丢弃
+        """
         try:
-            self.client.message.send_text(openid, content)
+            self._call(OPERATION_SEND_TEXT, self.client.message.send_text, openid, content)
             return True
+        except CircuitOpenError:
+            raise
         except Exception:
             return False
 
     def get_user_nickname(self, openid: str) -> str:
         try:
-            user_info = self.client.user.get(openid)
+            user_info = self._call(OPERATION_USER_INFO, self.client.user.get, openid)
             return user_info.get("nickname", "")
         except Exception:
+            # 包括熔断中，调用方使用默认昵称
             return ""
+
+    def get_user_nicknames(self, openids: list[str]) -> dict[str, str]:
+        """
+        批量获取昵称，每 100 个 openid 调用一次批量接口
+
+        某一批整体失败（如其中有已失效的 openid）时，只对这一批逐个查询，其余批次不受影响
+
+        Returns:
+            openid 到昵称的映射，获取不到昵称的用户不在其中
+        """
+        nicknames = {}
+        unique = list(dict.fromkeys(openids))
+        for start in range(0, len(unique), USER_BATCH_SIZE):
+            chunk = unique[start:start + USER_BATCH_SIZE]
+            try:
+                user_infos = self._call(OPERATION_USER_BATCH, self.client.user.get_batch, chunk)
+            except CircuitOpenError:
+                # 熔断中不再逐个查询，未获取的用户使用默认昵称
+                break
+            except Exception as e:
+                logger.warning(f"批量获取用户信息失败，逐个查询: {e}", extra={'count': len(chunk)})
+                for openid in chunk:
+                    nickname = self.get_user_nickname(openid)
+                    if nickname:
+                        nicknames[openid] = nickname
+                continue
+            for user_info in user_infos:
+                # 未关注的用户没有昵称
+                if user_info.get("nickname"):
+                    nicknames[user_info["openid"]] = user_info["nickname"]
+        return nicknames
+
+    def _call(self, operation: str, func, *args):
+        """经熔断器调用微信接口"""
+        breaker = self.breakers.get(operation)
+        if not breaker.allow():
+            raise CircuitOpenError(operation)
+        try:
+            result = func(*args)
+        except Exception as e:
+            if _is_outage(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        breaker.record_success()
+        return result
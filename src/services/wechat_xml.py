@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+微信消息 XML 快速解析与渲染
+只处理本服务用到的文本消息与普通事件：直接在请求体字节上提取固定的几个字段，
+文本回复按预编译模板拼接；其他消息类型返回 None，由调用方交给 wechatpy 处理
+
+解析结果与 wechatpy 的消息对象提供相同的属性（type、source、target、time、id、content、event），
+回复与 wechatpy TextReply.render() 的输出一致
+"""
+
+import html
+import re
+import time
+
+# 顶层的简单字段，值为 CDATA 或不含标签的文本
+_FIELD = re.compile(
+    rb"<(ToUserName|FromUserName|CreateTime|MsgType|Content|Event|EventKey|MsgId)>"
+    rb"(?:<!\[CDATA\[(.*?)\]\]>|([^<]*))</\1>",
+    re.S,
+)
+
+# CDATA 中不能出现 ]]>，拆成两段 CDATA
+_CDATA_SPLIT = "]]]]><![CDATA[>"
+
+_TEXT_REPLY = (
+    "<xml>\n"
+    "<MsgType><![CDATA[text]]></MsgType>\n"
+    "<Content><![CDATA[{content}]]></Content>\n"
+    "<FromUserName><![CDATA[{source}]]></FromUserName>\n"
+    "<ToUserName><![CDATA[{target}]]></ToUserName>\n"
+    "<CreateTime>{time}</CreateTime>\n"
+    "</xml>"
+)
+
+
+class InboundMessage:
+    """快速解析得到的文本消息或事件"""
+
+    __slots__ = ('type', 'source', 'target', 'time', 'id', 'content', 'event')
+
+    def __init__(
+        self,
+        type: str,
+        source: str,
+        target: str,
+        time: int,
+        id: int = 0,
+        content: str = "",
+        event: str = "",
+    ):
+        self.type = type
+        self.source = source
+        self.target = target
+        self.time = time
+        self.id = id
+        self.content = content
+        self.event = event
+
+    def __repr__(self) -> str:
+        return f"InboundMessage(type={self.type!r}, source={self.source!r}, id={self.id})"
+
+
+def parse_message(data: bytes) -> InboundMessage | None:
+    """
+    解析文本消息或普通事件
+
+    Args:
+        data: 请求体
+
+    Returns:
+        解析结果；其他消息类型、带场景值的关注事件或格式无法识别时返回 None
+    """
+    fields: dict[bytes, str] = {}
+    try:
+        for name, cdata, text in _FIELD.findall(data):
+            if cdata:
+                if b"]]><![CDATA[" in cdata:
+                    # 值被拆成多段 CDATA，交给完整的 XML 解析
+                    return None
+                value = cdata.decode('utf-8')
+            else:
+                value = text.decode('utf-8')
+                if '&' in value:
+                    value = html.unescape(value)
+            # 与 xmltodict 一致去掉首尾空白
+            fields.setdefault(name, value.strip())
+        msg_type = fields[b'MsgType'].lower()
+        source = fields[b'FromUserName']
+        target = fields[b'ToUserName']
+        create_time = int(fields[b'CreateTime'])
+        msg_id = int(fields.get(b'MsgId') or 0)
+    except (KeyError, ValueError):
+        # 缺少字段、数值格式错误或不是 UTF-8（UnicodeDecodeError 是 ValueError 的子类）
+        return None
+
+    if msg_type == 'text' and b'Content' in fields:
+        return InboundMessage(msg_type, source, target, create_time, msg_id, content=fields[b'Content'])
+    if msg_type == 'event' and b'Event' in fields:
+        event = fields[b'Event'].lower()
+        # 扫码关注等事件由 wechatpy 改写事件类型
+        if event == 'subscribe' and fields.get(b'EventKey'):
+            return None
+        return InboundMessage(msg_type, source, target, create_time, msg_id, event=event)
+    return None
+
+
+def render_text_reply(msg: InboundMessage, content: str) -> str:
+    """
+    渲染被动回复的文本消息
+
+    Args:
+        msg: 收到的消息，回复的收发方与其相反
+        content: 回复内容
+    """
+    return _TEXT_REPLY.format(
+        content=content.replace("]]>", _CDATA_SPLIT),
+        source=msg.target,
+        target=msg.source,
+        time=int(time.time()),
+    )
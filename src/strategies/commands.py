@@ -1,36 +1,63 @@
 #!/usr/bin/env python3
 
-import re
 from asyncio.log import logger
 
 from src.config.commands_config import COMMAND_ALIASES
 from src.config.messages import ERROR_MESSAGES, HELP_MESSAGES
+from src.repositories.unit_of_work import UnitOfWork
 from src.services.game_service import GameService
+from src.services.reply_tracker import ReplyTracker, RoomState
+from src.utils.deadline import has_budget
+
+# 追加状态、词语各需一次房间读取，剩余时间不足该秒数时跳过
+APPEND_BUDGET_SECONDS = 0.5
 
 
 class CommandStrategy:
+    # 命令名称，用于异步回复配置与耗时统计
+    name = ""
+    # 完全匹配的别名
+    aliases: tuple[str, ...] = ()
+    # 前缀匹配的别名，前缀之后的内容由 accepts 校验
+    prefixes: tuple[str, ...] = ()
+    # 回复后是否追加房间状态与词语；查看类命令本身就是这些信息
+    appends_status = True
+
     def matches(self, content: str) -> bool:
-        return False
+        if content in self.aliases:
+            return True
+        return any(content.startswith(prefix) and self.accepts(content[len(prefix):]) for prefix in self.prefixes)
+
+    def accepts(self, argument: str) -> bool:
+        """前缀之后的内容是否构成本命令"""
+        return True
+
+    def argument(self, content: str) -> str:
+        """去掉最长的匹配前缀后的内容"""
+        for prefix in sorted(self.prefixes, key=len, reverse=True):
+            if content.startswith(prefix):
+                return content[len(prefix):]
+        return content
 
     def execute(self, user_id: str, content: str) -> str:
         raise NotImplementedError
 
 
 class HelpCommand(CommandStrategy):
-    def matches(self, content: str) -> bool:
-        return content in COMMAND_ALIASES["help"]
+    name = "help"
+    aliases = tuple(COMMAND_ALIASES["help"])
 
     def execute(self, user_id: str, content: str) -> str:
         return HELP_MESSAGES["INSTRUCTIONS"]
 
 
 class CreateRoomCommand(CommandStrategy):
+    name = "create_room"
+    aliases = tuple(COMMAND_ALIASES["create_room"])
+
     def __init__(self, game_service: GameService):
         self.game_service = game_service
 
-    def matches(self, content: str) -> bool:
-        return content in COMMAND_ALIASES["create_room"]
-
     def execute(self, user_id: str, content: str) -> str:
         success, result = self.game_service.create_room(user_id)
         if success:
@@ -40,16 +67,14 @@ class CreateRoomCommand(CommandStrategy):
 
 
 class JoinRoomCommand(CommandStrategy):
+    name = "join_room"
+    prefixes = (COMMAND_ALIASES["join_room_prefix"],)
+
     def __init__(self, game_service: GameService):
         self.game_service = game_service
 
-    def matches(self, content: str) -> bool:
-        return content.startswith(COMMAND_ALIASES["join_room_prefix"])
-
     def execute(self, user_id: str, content: str) -> str:
-        # 去掉前缀长度
-        prefix = COMMAND_ALIASES["join_room_prefix"]
-        room_id = content[len(prefix):].strip()
+        room_id = self.argument(content).strip()
         if not room_id:
             return "请输入房间号，格式：加入1234"
         success, result = self.game_service.join_room(user_id, room_id)
@@ -57,12 +82,12 @@ class JoinRoomCommand(CommandStrategy):
 
 
 class StartGameCommand(CommandStrategy):
+    name = "start_game"
+    aliases = tuple(COMMAND_ALIASES["start_game"])
+
     def __init__(self, game_service: GameService):
         self.game_service = game_service
 
-    def matches(self, content: str) -> bool:
-        return content in COMMAND_ALIASES["start_game"]
-
     def execute(self, user_id: str, content: str) -> str:
         success, result = self.game_service.start_game(user_id)
         if success:
@@ -81,55 +106,184 @@ class StartGameCommand(CommandStrategy):
         return result
 
 
+class ShowStatusCommand(CommandStrategy):
+    """完整的房间状态与词语，不论房间自上次回复后是否变化"""
+    name = "show_status"
+    aliases = tuple(COMMAND_ALIASES["show_status"])
+    appends_status = False
+
+    def __init__(self, game_service: GameService):
+        self.game_service = game_service
+
+    def execute(self, user_id: str, content: str) -> str:
+        success, status = self.game_service.show_status(user_id)
+        if not success:
+            return status
+        word_success, word = self.game_service.show_word(user_id)
+        if word_success:
+            return f"{status}\n\n{word}"
+        return status
+
 
+class ShowWordCommand(CommandStrategy):
+    name = "show_word"
+    aliases = tuple(COMMAND_ALIASES["show_word"])
+    appends_status = False
+
+    def __init__(self, game_service: GameService):
+        self.game_service = game_service
+
+    def execute(self, user_id: str, content: str) -> str:
+        success, result = self.game_service.show_word(user_id)
+        return result
 
 
 class VoteCommand(CommandStrategy):
+    name = "vote"
+    prefixes = (COMMAND_ALIASES["vote_prefix"],)
+
     def __init__(self, game_service: GameService):
         self.game_service = game_service
 
-    def matches(self, content: str) -> bool:
-        vote_prefix = COMMAND_ALIASES["vote_prefix"]
-        return re.fullmatch(rf"{re.escape(vote_prefix)}\d+", content) is not None
+    def accepts(self, argument: str) -> bool:
+        # 与正则 \d+ 相同：至少一位十进制数字
+        return argument.isdecimal()
 
     def execute(self, user_id: str, content: str) -> str:
         try:
-            vote_prefix = COMMAND_ALIASES["vote_prefix"]
-            target_index = int(content[len(vote_prefix):])
+            target_index = int(self.argument(content))
             success, result = self.game_service.vote_player(user_id, target_index)
             return result
         except ValueError:
             return ERROR_MESSAGES["VOTE_FORMAT_ERROR"]
 
 
+class CommandIndex:
+    """
+    命令索引
+
+    创建时把所有策略的别名编入完全匹配字典与前缀字典树，匹配一次字典查找加一次按字符遍历，
+    耗时与命令、别名数量无关；完全匹配优先于前缀匹配，多个前缀匹配时最长的优先。
+    未声明别名、只重写 matches 的策略按原方式逐个匹配
+    """
+
+    # 字典树节点中保存以该节点结尾的前缀对应的策略
+    _END = ""
+
+    def __init__(self, strategies: list[CommandStrategy]):
+        self._exact: dict[str, CommandStrategy] = {}
+        self._trie: dict = {}
+        self._fallback: list[CommandStrategy] = []
+        for strategy in strategies:
+            if not (strategy.aliases or strategy.prefixes):
+                self._fallback.append(strategy)
+            for alias in strategy.aliases:
+                self._exact.setdefault(alias, strategy)
+            for prefix in strategy.prefixes:
+                node = self._trie
+                for char in prefix:
+                    node = node.setdefault(char, {})
+                node.setdefault(self._END, []).append(strategy)
+
+    def match(self, content: str) -> CommandStrategy | None:
+        """返回匹配已规范化内容的策略，没有时返回 None"""
+        strategy = self._exact.get(content)
+        if strategy is not None:
+            return strategy
+
+        # 沿字典树收集所有匹配的前缀，从最长的开始校验参数
+        candidates = []
+        node = self._trie
+        for length, char in enumerate(content, 1):
+            node = node.get(char)
+            if node is None:
+                break
+            if self._END in node:
+                candidates.append((length, node[self._END]))
+        for length, strategies in reversed(candidates):
+            for strategy in strategies:
+                if strategy.accepts(content[length:]):
+                    return strategy
+
+        for strategy in self._fallback:
+            if strategy.matches(content):
+                return strategy
+        return None
+
+
 class CommandRouter:
-    def __init__(self, game_service: GameService):
+    def __init__(self, game_service: GameService, reply_tracker: ReplyTracker | None = None):
         self.game_service = game_service
+        # 配置后只在房间自上次完整回复后有变化时追加状态与词语
+        self.reply_tracker = reply_tracker
         self.strategies: list[CommandStrategy] = [
             HelpCommand(),
             CreateRoomCommand(game_service),
             JoinRoomCommand(game_service),
             StartGameCommand(game_service),
+            ShowStatusCommand(game_service),
+            ShowWordCommand(game_service),
             VoteCommand(game_service),
         ]
+        self.index = CommandIndex(self.strategies)
+
+    def command_name(self, content: str) -> str | None:
+        """返回内容匹配的命令名称，未知命令返回 None"""
+        strategy = self.index.match(content.strip().lower())
+        return strategy.name if strategy is not None else None
 
     def route(self, user_id: str, content: str) -> str:
         normalized = content.strip().lower()
         response = ERROR_MESSAGES["UNKNOWN_COMMAND"]
         
-        for strategy in self.strategies:
-            if strategy.matches(normalized):
-                logger.info(f"用户 {user_id} 执行命令 {normalized}")
-                response = strategy.execute(user_id, normalized)
-                break
+        strategy = self.index.match(normalized)
+        if strategy is not None:
+            logger.info(f"用户 {user_id} 执行命令 {normalized}")
+            response = strategy.execute(user_id, normalized)
+            if not strategy.appends_status:
+                if isinstance(strategy, ShowStatusCommand):
+                    self._mark_seen(user_id, self.game_service.room_version(user_id))
+                return response
         
-        # 无论执行什么命令（包括未知命令），都尝试追加状态和词语信息
-        status_success, status_msg = self.game_service.show_status(user_id)
-        if status_success:
-            response += f"\n\n{status_msg}"
-            
-        word_success, word_msg = self.game_service.show_word(user_id)
-        if word_success:
-            response += f"\n\n{word_msg}"
+        state = None
+        if self.reply_tracker is not None:
+            state = self.game_service.room_version(user_id)
+            if state is None or self.reply_tracker.is_current(user_id, state):
+                # 不在房间中，或房间自上次完整回复后没有变化
+                return response
+        
+        # 无论执行什么命令（包括未知命令），都尝试追加状态和词语信息；请求即将超时时跳过
+        status_appended = False
+        if has_budget("status_append", APPEND_BUDGET_SECONDS):
+            status_success, status_msg = self.game_service.show_status(user_id)
+            if status_success:
+                response += f"\n\n{status_msg}"
+                status_appended = True
             
+        if has_budget("word_append", APPEND_BUDGET_SECONDS):
+            word_success, word_msg = self.game_service.show_word(user_id)
+            if word_success:
+                response += f"\n\n{word_msg}"
+        
+        if status_appended:
+            self._mark_seen(user_id, state)
         return response
+
+    def _mark_seen(self, user_id: str, state: RoomState | None) -> None:
+        """记录用户已看过的房间版本；房间在本次请求中有修改时，提交后再读取最终版本"""
+        if self.reply_tracker is None or state is None:
+            return
+        if state[1] is not None:
+            self.reply_tracker.mark(user_id, state)
+            return
+        
+        def mark_committed():
+            committed = self.game_service.room_version(user_id)
+            if committed is not None:
+                self.reply_tracker.mark(user_id, committed)
+        
+        uow = UnitOfWork.current()
+        if uow is not None:
+            uow.after_commit(mark_committed)
+        else:
+            mark_committed()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+请求截止时间
+微信被动回复须在 5 秒内返回；每个消息请求带一个截止时间，业务在执行可选步骤
+（追加状态、同步获取昵称、状态推送等）前检查剩余时间，不足时跳过，保证按时回复
+
+截止时间保存在 ContextVar 中，只对当前请求生效；后台线程不受限制
+"""
+
+import time
+from contextvars import ContextVar
+
+from src.utils.logger import setup_logger
+from src.utils.metrics import registry as metrics_registry
+
+logger = setup_logger(__name__)
+
+_deadline: ContextVar[float | None] = ContextVar('request_deadline', default=None)
+
+_skipped = metrics_registry.counter("request_stage_skipped_total", "因请求剩余时间不足而跳过的可选步骤数量")
+
+
+class Deadline:
+    """
+    请求截止时间
+
+    用法::
+
+        with Deadline(4.5, reserve_seconds=0.5):
+            ...  # 期间 has_budget 按剩余时间（已扣除预留时间）判断是否执行可选步骤
+    """
+
+    def __init__(self, budget_seconds: float, reserve_seconds: float = 0.0):
+        """
+        Args:
+            budget_seconds: 从进入上下文起可用的秒数，0 表示不限制
+            reserve_seconds: 为可选步骤之后的收尾工作（如写回修改）预留的秒数，可选步骤只能使用其余时间
+        """
+        self.budget_seconds = budget_seconds
+        self.reserve_seconds = reserve_seconds
+        self._token = None
+
+    def __enter__(self) -> 'Deadline':
+        deadline = None
+        if self.budget_seconds > 0:
+            deadline = time.monotonic() + self.budget_seconds - self.reserve_seconds
+        self._token = _deadline.set(deadline)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        _deadline.reset(self._token)
+        self._token = None
+
+
+def remaining() -> float | None:
+    """当前请求可用于可选步骤的剩余秒数（已扣除预留时间），没有截止时间时返回 None"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def has_budget(stage: str, min_seconds: float) -> bool:
+    """
+    判断是否还有时间执行一个可选步骤，不足时计入跳过次数
+
+    Args:
+        stage: 步骤名称，用作指标标签
+        min_seconds: 执行该步骤需要的剩余秒数
+
+    Returns:
+        没有截止时间或剩余时间足够时为 True
+    """
+    left = remaining()
+    if left is None or left >= min_seconds:
+        return True
+    _skipped.inc(labels={'stage': stage})
+    logger.info("请求剩余时间不足，跳过可选步骤", extra={'stage': stage, 'remaining': round(left, 3)})
+    return False
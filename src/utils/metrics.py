@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+进程内指标模块
+提供计数器、仪表与直方图，并以 Prometheus 文本格式导出（/metrics）
+
+指标只在当前进程内统计，多 worker 部署时每个进程分别导出
+"""
+
+import bisect
+import threading
+from collections.abc import Callable
+
+LabelValues = tuple[tuple[str, str], ...]
+
+# 默认延迟分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels: dict[str, str] | None) -> LabelValues:
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _format_labels(labels: LabelValues, extra: tuple[tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    """单调递增计数器"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, labels: dict[str, str] | None = None) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, labels: dict[str, str] | None = None) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(labels)} {value}" for labels, value in items]
+
+
+class Gauge:
+    """仪表，可直接设置，也可在导出时通过回调取值"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float] | None = None):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self._values: dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, labels: dict[str, str] | None = None) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def value(self, labels: dict[str, str] | None = None) -> float:
+        if self.callback is not None and not labels:
+            return float(self.callback())
+        return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self) -> list[str]:
+        if self.callback is not None:
+            return [f"{self.name} {float(self.callback())}"]
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(labels)} {value}" for labels, value in items]
+
+
+class Histogram:
+    """直方图，记录观测值的分布、总和与次数"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        # 标签 -> (各分桶计数, 总和, 次数)
+        self._values: dict[LabelValues, tuple[list[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: dict[str, str] | None = None) -> None:
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            if index < len(counts):
+                counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def count(self, labels: dict[str, str] | None = None) -> int:
+        return self._values.get(_label_key(labels), ([], 0.0, 0))[2]
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._values.items()]
+        lines = []
+        for labels, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts, strict=True):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(labels, (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表，同名指标只创建一次"""
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Gauge | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, name: str, factory: Callable[[], Counter | Gauge | Histogram]):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._get_or_create(name, lambda: Counter(name, documentation))
+
+    def gauge(self, name: str, documentation: str, callback: Callable[[], float] | None = None) -> Gauge:
+        gauge = self._get_or_create(name, lambda: Gauge(name, documentation, callback))
+        if callback is not None:
+            gauge.callback = callback
+        return gauge
+
+    def histogram(self, name: str, documentation: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(name, lambda: Histogram(name, documentation, buckets))
+
+    def render(self) -> str:
+        """以 Prometheus 文本格式导出所有指标"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# 进程级默认注册表
+registry = MetricsRegistry()
@@ -30,4 +30,12 @@ def client(app):
 @pytest.fixture(scope="session")
 def runner(app):
     """创建CLI运行器"""
-    return app.test_cli_runner()
\ No newline at end of file
+    return app.test_cli_runner()
+
+@pytest.fixture
+def fake_wechat():
+    """本地模拟微信接口服务"""
+    from tests.fakes.wechat_server import FakeWeChatServer
+    server = FakeWeChatServer().start()
+    yield server
+    server.stop()
@@ -0,0 +1,4 @@
+#!/usr/bin/env python3
+"""
+测试用的外部服务模拟
+"""
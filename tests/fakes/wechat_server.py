@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+本地模拟微信公众平台接口
+在后台线程中运行 HTTP 服务，记录收到的请求，用于测试真实的 HTTP 调用路径
+
+支持的接口：
+- GET  /cgi-bin/token                 获取 access token
+- GET  /cgi-bin/user/info             获取单个用户信息
+- POST /cgi-bin/user/info/batchget    批量获取用户信息（任一 openid 无效时整体返回错误，与微信一致）
+- POST /cgi-bin/message/custom/send   发送客服消息
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+INVALID_OPENID = 40003
+
+
+class FakeWeChatServer:
+    """模拟微信接口服务"""
+
+    def __init__(self):
+        # openid -> 昵称，空字符串表示未关注（无昵称）
+        self.users: dict[str, str] = {}
+        self.sent_messages: list[dict] = []
+        # (方法, 路径, 查询参数, 请求体)
+        self.requests: list[tuple[str, str, dict, dict | None]] = []
+        # 当前有效的 access token，每次获取 token 都会签发新值，旧值仍然有效直到调用 revoke_tokens
+        self.access_token = "fake-access-token"
+        self.valid_tokens = {self.access_token}
+        self.token_delay_seconds = 0.0
+        # 为真时除 token 外的接口都返回系统繁忙（-1）
+        self.system_busy = False
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/cgi-bin/"
+
+    def start(self) -> 'FakeWeChatServer':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def calls(self, path: str) -> list[tuple[str, str, dict, dict | None]]:
+        """返回某个接口收到的请求"""
+        with self._lock:
+            return [request for request in self.requests if request[1] == path]
+
+    def revoke_tokens(self) -> None:
+        """使已签发的 token 全部失效，之后的调用返回 40001"""
+        with self._lock:
+            self.valid_tokens = set()
+
+    def make_client(self, redis_client=None, with_token: bool = True, **kwargs):
+        """创建指向本服务的微信客户端，with_token 为真时预先写入有效的 access token"""
+        from src.services.wechat_client import WeChatClient
+
+        client = WeChatClient(
+            "fake-app-id", "fake-secret", redis_client=redis_client, api_base_url=self.base_url, **kwargs
+        )
+        if with_token:
+            client.client.session.set(client.client.access_token_key, self.access_token, 7200)
+        return client
+
+    def _user_info(self, openid: str) -> dict:
+        nickname = self.users[openid]
+        if not nickname:
+            return {'subscribe': 0, 'openid': openid}
+        return {'subscribe': 1, 'openid': openid, 'nickname': nickname}
+
+    def _handle(self, method: str, path: str, query: dict, body: dict | None) -> dict:
+        with self._lock:
+            self.requests.append((method, path, query, body))
+        if path == '/cgi-bin/token':
+            time.sleep(self.token_delay_seconds)
+            issued = len(self.calls(path))
+            with self._lock:
+                self.access_token = f"fake-access-token-{issued}"
+                self.valid_tokens.add(self.access_token)
+            return {'access_token': self.access_token, 'expires_in': 7200}
+        if self.system_busy:
+            return {'errcode': -1, 'errmsg': 'system error'}
+        if query.get('access_token') not in self.valid_tokens:
+            return {'errcode': 40001, 'errmsg': 'invalid credential'}
+        if path == '/cgi-bin/user/info':
+            openid = query.get('openid', '')
+            if openid not in self.users:
+                return {'errcode': INVALID_OPENID, 'errmsg': 'invalid openid'}
+            return self._user_info(openid)
+        if path == '/cgi-bin/user/info/batchget':
+            openids = [item['openid'] for item in body['user_list']]
+            if len(openids) > 100 or any(openid not in self.users for openid in openids):
+                return {'errcode': INVALID_OPENID, 'errmsg': 'invalid openid'}
+            return {'user_info_list': [self._user_info(openid) for openid in openids]}
+        if path == '/cgi-bin/message/custom/send':
+            if body['touser'] not in self.users:
+                return {'errcode': INVALID_OPENID, 'errmsg': 'invalid openid'}
+            with self._lock:
+                self.sent_messages.append(body)
+            return {'errcode': 0, 'errmsg': 'ok'}
+        return {'errcode': 404, 'errmsg': 'unknown api'}
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self, method: str) -> None:
+                url = urlparse(self.path)
+                query = {name: values[0] for name, values in parse_qs(url.query).items()}
+                body = None
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    body = json.loads(self.rfile.read(length).decode('utf-8'))
+                payload = json.dumps(fake._handle(method, url.path, query, body), ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._respond('GET')
+
+            def do_POST(self):
+                self._respond('POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -4,10 +4,11 @@
 """
 
 import random
-from unittest.mock import Mock
 
+import fakeredis
 import pytest
 
+from src.repositories.room_id_allocator import RoomIdAllocator
 from src.repositories.room_repository import RoomRepository
 from src.repositories.user_repository import UserRepository
 from src.services.game_service import GameService
@@ -18,49 +19,8 @@ class TestGameFlow:
     
     @pytest.fixture
     def mock_redis(self):
-        """创建模拟Redis客户端"""
-        mock_redis_client = Mock()
-        
-        # 存储房间和用户数据（使用字节串模拟真实Redis）
-        storage = {}
-        
-        def mock_set(key, value):
-            # Redis存储的是bytes
-            if isinstance(value, str):
-                storage[key] = value.encode('utf-8')
-            else:
-                storage[key] = value
-            return True
-        
-        def mock_setex(key, timeout, value):
-            # 忽略超时，只存储值
-            if isinstance(value, str):
-                storage[key] = value.encode('utf-8')
-            else:
-                storage[key] = value
-            return True
-        
-        def mock_get(key):
-            result = storage.get(key)
-            # 返回bytes或None
-            return result
-        
-        def mock_exists(key):
-            return 1 if key in storage else 0
-        
-        def mock_delete(key):
-            if key in storage:
-                del storage[key]
-                return 1
-            return 0
-        
-        mock_redis_client.set = mock_set
-        mock_redis_client.setex = mock_setex
-        mock_redis_client.get = mock_get
-        mock_redis_client.exists = mock_exists
-        mock_redis_client.delete = mock_delete
-        
-        return mock_redis_client
+        """创建模拟Redis客户端（fakeredis 支持房间状态迁移使用的 Lua 脚本）"""
+        return fakeredis.FakeRedis(decode_responses=False)
     
     @pytest.fixture
     def repositories(self, mock_redis):
@@ -159,6 +119,31 @@ class TestGameFlow:
         finally:
             random.randint = original_randint
 
+    
+    def test_room_id_released_after_game_end(self, repositories, mock_redis):
+        """测试游戏结束后房间号归还号码池"""
+        room_repo, user_repo = repositories
+        allocator = RoomIdAllocator(mock_redis)
+        allocator.replenish()
+        game_service = GameService(room_repo, user_repo, id_allocator=allocator)
+        
+        success, room_id = game_service.create_room("user1")
+        assert success is True
+        assert not mock_redis.sismember("{room:ids}:free", room_id)
+        
+        game_service.join_room("user2", room_id)
+        game_service.join_room("user3", room_id)
+        game_service.start_game("user1")
+        
+        # 三人局淘汰任意一人后剩余不足三人，游戏结束
+        success, result = game_service.vote_player("user1", 2)
+        assert success is True
+        assert "获胜" in result
+        # 已结束的房间先被删除，复用号码的新房间不会写到旧数据上
+        assert mock_redis.sismember("{room:ids}:free", room_id)
+        assert room_repo.get(room_id) is None
+        assert user_repo.get("user1").current_room is None
+
 
 if __name__ == "__main__":
     pytest.main(["-v", __file__])
\ No newline at end of file
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+用户记录压缩任务单元测试
+"""
+
+import io
+import json
+from datetime import UTC, datetime, timedelta
+
+import fakeredis
+import pytest
+
+from src.jobs.compact_users import UserCompactor
+from src.models.user import User
+from src.repositories.codecs import MsgpackCodec
+from src.repositories.user_repository import UserRepository
+
+DAY = 86400
+
+
+class TestUserCompaction:
+    """用户记录压缩测试类"""
+
+    @pytest.fixture
+    def redis_client(self):
+        return fakeredis.FakeRedis(decode_responses=False)
+
+    @staticmethod
+    def _put(redis_client, user: User, idle_days: float | None) -> None:
+        """写入没有过期时间的用户记录"""
+        if idle_days is not None:
+            user.last_active = datetime.now(UTC) - timedelta(days=idle_days)
+        redis_client.set(f"user:{user.openid}", MsgpackCodec().encode(user.to_dict()))
+
+    def test_compaction(self, redis_client):
+        """删除并归档闲置用户，为其他无过期时间的记录补上过期时间"""
+        self._put(redis_client, User(openid="idle", nickname="小明"), idle_days=40)
+        self._put(redis_client, User(openid="playing", current_room="1234"), idle_days=40)
+        self._put(redis_client, User(openid="recent"), idle_days=1)
+        redis_client.set("user:legacy", json.dumps({'openid': "legacy"}))
+        UserRepository(redis_client, ttl_seconds=30 * DAY).save(User(openid="fresh"))
+        archive = io.StringIO()
+
+        report = UserCompactor(
+            redis_client, max_idle_seconds=30 * DAY, ttl_seconds=30 * DAY, batch_size=2, archive=archive
+        ).run()
+
+        assert report.scanned == 5
+        assert report.deleted == 1
+        assert report.archived == 1
+        assert report.ttl_applied == 3
+        assert report.skipped == 1
+        assert report.bytes_reclaimed > 0
+        assert redis_client.exists("user:idle") == 0
+        assert json.loads(archive.getvalue())['nickname'] == "小明"
+        assert 28 * DAY < redis_client.ttl("user:recent") <= 29 * DAY
+        assert redis_client.ttl("user:legacy") > 29 * DAY
+
+    def test_dry_run_changes_nothing(self, redis_client):
+        """试运行只统计不修改"""
+        self._put(redis_client, User(openid="idle"), idle_days=40)
+        self._put(redis_client, User(openid="recent"), idle_days=1)
+
+        report = UserCompactor(redis_client, max_idle_seconds=30 * DAY, ttl_seconds=30 * DAY, dry_run=True).run()
+
+        assert (report.deleted, report.ttl_applied) == (1, 1)
+        assert redis_client.exists("user:idle") == 1
+        assert redis_client.ttl("user:recent") == -1
+
+
+class TestUserTtl:
+    """用户记录过期时间测试类"""
+
+    def test_ttl_refreshed_on_activity(self):
+        """写入设置过期时间，按ID读取时刷新"""
+        redis_client = fakeredis.FakeRedis(decode_responses=False)
+        repo = UserRepository(redis_client, ttl_seconds=100)
+        repo.save(User(openid="u1"))
+        redis_client.expire("user:u1", 10)
+
+        user = repo.get("u1")
+
+        assert user.last_active is not None
+        assert redis_client.ttl("user:u1") > 10
@@ -136,6 +136,19 @@ class TestRoomModel:
         assert "user1" in remaining
         assert "user4" in remaining
     
+    def test_clone_is_independent(self):
+        """测试副本与原对象互不影响"""
+        room = Room(room_id="1234", creator="user1", words={'civilian': '苹果', 'undercover': '香蕉'})
+        room.version = 7
+        
+        copy = room.clone()
+        copy.players.append("user2")
+        copy.words['civilian'] = '梨'
+        
+        assert room.players == ["user1"]
+        assert room.words['civilian'] == '苹果'
+        assert copy.version == 7
+    
     def test_update_last_active(self):
         """测试更新最后活跃时间"""
         room = Room(
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+存储编解码器单元测试
+"""
+
+import json
+from datetime import UTC, datetime
+
+import fakeredis
+import pytest
+
+from src.exceptions import SerializationError
+from src.models.room import Room
+from src.models.user import User
+from src.repositories.codecs import (
+    JsonCodec,
+    MsgpackCodec,
+    decode_record,
+    get_codec,
+    parse_timestamp,
+    to_epoch_us,
+)
+from src.repositories.room_repository import RoomRepository
+from src.repositories.user_repository import UserRepository
+
+
+class TestCodecs:
+    """编解码器测试类"""
+
+    def test_round_trip(self):
+        """两种格式都能还原原始数据，按首字节自动识别"""
+        data = {'openid': "u1", 'nickname': "小明", 'current_room': None,
+                'at': datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=UTC)}
+        packed = MsgpackCodec().encode(data)
+
+        assert packed[0] == 0x01
+        assert decode_record(packed) == data
+        assert decode_record(JsonCodec().encode({'openid': "u1"})) == {'openid': "u1"}
+
+    def test_msgpack_is_smaller(self):
+        """二进制格式比 JSON 更紧凑"""
+        data = User(openid="o" * 28, nickname="小明", current_room="1234").to_dict()
+
+        assert len(MsgpackCodec().encode(data)) < len(JsonCodec().encode(data))
+
+    def test_unknown_format_rejected(self):
+        """未知格式版本与未知编解码器名称会被拒绝"""
+        with pytest.raises(ValueError):
+            decode_record(b'\x7f\x80')
+        with pytest.raises(ValueError):
+            get_codec("xml")
+
+    def test_timestamps(self):
+        """纪元微秒与 ISO-8601 时间戳均可解析且不丢失精度"""
+        moment = datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=UTC)
+
+        assert parse_timestamp(to_epoch_us(moment)) == moment
+        assert parse_timestamp(str(to_epoch_us(moment)).encode()) == moment
+        assert parse_timestamp(moment.isoformat()) == moment
+
+
+class TestRecordMigration:
+    """旧格式记录迁移测试类"""
+
+    @pytest.fixture
+    def redis_client(self):
+        return fakeredis.FakeRedis(decode_responses=False)
+
+    def test_legacy_user_upgraded_on_write(self, redis_client):
+        """旧 JSON 用户记录可以读取，下次写入时升级为二进制格式"""
+        redis_client.set("user:u1", json.dumps({'openid': "u1", 'nickname': "小明", 'current_room': "1234"}))
+        repo = UserRepository(redis_client)
+
+        user = repo.get("u1")
+        assert user == User(openid="u1", nickname="小明", current_room="1234")
+        assert repo.get_many(["u1"]) == {'u1': user}
+
+        repo.save(user)
+        assert redis_client.get("user:u1")[0] == 0x01
+        assert repo.get("u1") == user
+
+    def test_json_codec_still_writes_json(self, redis_client):
+        """配置为 JSON 时保持旧格式写入"""
+        UserRepository(redis_client, codec=get_codec("json")).save(User(openid="u1"))
+
+        assert json.loads(redis_client.get("user:u1"))['openid'] == "u1"
+
+    def test_corrupt_user_raises_serialization_error(self, redis_client):
+        """无法识别的记录转换为序列化异常"""
+        redis_client.set("user:u1", b'\x7f\x80')
+
+        with pytest.raises(SerializationError):
+            UserRepository(redis_client).get("u1")
+
+    def test_room_timestamps_stored_as_epoch(self, redis_client):
+        """房间时间戳以纪元微秒保存，旧的 ISO 字段仍可读取"""
+        repo = RoomRepository(redis_client)
+        room = Room(room_id="1234", creator="u1")
+        repo.save(room)
+
+        assert redis_client.hget("room:1234", "created_at") == str(to_epoch_us(room.created_at)).encode()
+
+        redis_client.hset("room:1234", "created_at", room.created_at.isoformat())
+        assert repo.get("1234").created_at == room.created_at
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+进程内房间缓存单元测试
+"""
+
+from unittest.mock import Mock
+
+import fakeredis
+import pytest
+
+from src.models.room import Room
+from src.repositories.room_cache import RoomCache
+from src.repositories.room_repository import RoomRepository
+
+
+class TestRoomCache:
+    """房间缓存测试类"""
+
+    @pytest.fixture
+    def redis_spy(self):
+        return Mock(wraps=fakeredis.FakeRedis(decode_responses=False))
+
+    def test_hit_only_checks_version(self, redis_spy):
+        """缓存命中时只读取版本号字段，不再读取整个房间"""
+        repo = RoomRepository(redis_spy, cache=RoomCache())
+        repo.save(Room(room_id="1234", creator="u1"))
+        redis_spy.reset_mock()
+
+        room = repo.get("1234")
+
+        assert room.players == ["u1"]
+        assert redis_spy.hget.call_count == 1
+        assert redis_spy.hgetall.call_count == 0
+
+    def test_write_from_other_worker_invalidates(self):
+        """其他 worker 写入后版本号变化，缓存自动失效"""
+        redis_client = fakeredis.FakeRedis(decode_responses=False)
+        worker_a = RoomRepository(redis_client, cache=RoomCache())
+        worker_b = RoomRepository(redis_client, cache=RoomCache())
+        worker_a.save(Room(room_id="1234", creator="u1"))
+        assert worker_a.get("1234").players == ["u1"]
+
+        worker_b.add_player("1234", "u2", 12)
+
+        room = worker_a.get("1234")
+        assert room.players == ["u1", "u2"]
+        assert room.version == worker_b.get("1234").version
+
+    def test_staleness_window_skips_redis(self, redis_spy):
+        """免校验窗口内的读取完全不访问 Redis"""
+        repo = RoomRepository(redis_spy, cache=RoomCache(staleness_seconds=60))
+        repo.save(Room(room_id="1234", creator="u1"))
+        redis_spy.reset_mock()
+
+        repo.get("1234")
+
+        assert redis_spy.hget.call_count == 0
+        assert redis_spy.hgetall.call_count == 0
+
+    def test_returned_room_is_private_copy(self):
+        """修改读取到的房间不会影响缓存内容"""
+        repo = RoomRepository(fakeredis.FakeRedis(decode_responses=False), cache=RoomCache())
+        repo.save(Room(room_id="1234", creator="u1"))
+
+        repo.get("1234").players.append("u2")
+
+        assert repo.get("1234").players == ["u1"]
+
+    def test_lru_eviction_and_ttl(self):
+        """超过容量淘汰最久未使用的条目，超过存活时间的条目失效"""
+        cache = RoomCache(max_size=2)
+        for room_id in ("1", "2", "3"):
+            cache.put(Room(room_id=room_id, creator="u1"))
+        assert len(cache) == 2
+        assert cache.lookup("1") is None
+
+        expired = RoomCache(ttl_seconds=0)
+        expired.put(Room(room_id="1", creator="u1"))
+        assert expired.lookup("1") is None
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+房间号分配器单元测试
+"""
+
+import time
+
+import fakeredis
+import pytest
+
+from src.exceptions import DataAccessError
+from src.models.room import Room
+from src.repositories.room_id_allocator import RoomIdAllocator
+from src.repositories.room_repository import RoomRepository
+
+FREE = "{room:ids}:free"
+LEASED = "{room:ids}:leased"
+
+
+class TestRoomIdAllocator:
+    """房间号分配器测试类"""
+
+    @pytest.fixture
+    def redis_client(self):
+        return fakeredis.FakeRedis(decode_responses=False)
+
+    def test_allocates_unique_ids(self, redis_client):
+        """分配的号码互不重复，且跳过旧版本已占用的房间号"""
+        RoomRepository(redis_client).save(Room(room_id="1234", creator="u1"))
+        allocator = RoomIdAllocator(redis_client, max_digits=4)
+        allocator.replenish()
+
+        ids = {allocator.allocate() for _ in range(200)}
+
+        assert len(ids) == 200
+        assert all(len(room_id) == 4 and room_id.isdigit() for room_id in ids)
+        assert "1234" not in ids
+        assert redis_client.zscore(LEASED, "1234") is not None
+        assert redis_client.scard(FREE) == 9000 - 200 - 1
+
+    def test_allocate_refills_empty_pool_once(self, redis_client):
+        """号码池为空时分配就地填充一批后重试，号码耗尽时报错"""
+        allocator = RoomIdAllocator(redis_client, min_digits=1, max_digits=1, batch_size=4)
+
+        assert allocator.allocate() in {"1", "2", "3", "4"}
+        assert redis_client.scard(FREE) == 3
+
+        # 余下号码取完后再按批填充，直至最多位数
+        ids = {allocator.allocate() for _ in range(8)}
+        assert len(ids) == 8
+        with pytest.raises(DataAccessError):
+            allocator.allocate()
+
+    def test_allocate_reclaims_when_pool_empty(self, redis_client):
+        """号码池已满位数且为空时，分配先回收房间已不存在的号码"""
+        allocator = RoomIdAllocator(redis_client, min_digits=1, max_digits=1, reclaim_grace_seconds=0)
+        allocator.replenish()
+        for _ in range(9):
+            allocator.allocate()
+        time.sleep(0.002)
+
+        assert allocator.allocate().isdigit()
+        assert redis_client.scard(FREE) == 8
+
+    def test_release_returns_id_once(self, redis_client):
+        """释放的号码回到号码池，重复释放无副作用"""
+        allocator = RoomIdAllocator(redis_client, min_digits=1, max_digits=1)
+        allocator.replenish()
+        room_id = allocator.allocate()
+
+        assert allocator.release(room_id) is True
+        assert allocator.release(room_id) is False
+        assert redis_client.sismember(FREE, room_id)
+
+    def test_replenish_in_batches(self, redis_client):
+        """先填满最少位数，空闲号码低于水位时才按批填充更多位数"""
+        allocator = RoomIdAllocator(redis_client, min_digits=1, max_digits=2, low_water=5, batch_size=4)
+
+        assert allocator.replenish() == 9
+        assert allocator.replenish() == 0
+        for _ in range(6):
+            allocator.allocate()
+
+        assert allocator.replenish() == 4
+        assert redis_client.smembers(FREE) >= {b"10", b"11", b"12", b"13"}
+
+        # 多个进程同时填充时不会重复加入号码
+        other = RoomIdAllocator(redis_client, min_digits=1, max_digits=2, low_water=1000, batch_size=4)
+        assert other.replenish() == 99 - 13
+        assert allocator.replenish() == 0
+        ids = [allocator.allocate() for _ in range(redis_client.scard(FREE))]
+        assert len(set(ids)) == len(ids)
+        with pytest.raises(DataAccessError):
+            allocator.allocate()
+
+    def test_reclaims_expired_rooms(self, redis_client):
+        """房间已不存在的号码在宽限期后按批回收，房间仍存在的号码保留"""
+        room_repo = RoomRepository(redis_client)
+        allocator = RoomIdAllocator(
+            redis_client, min_digits=1, max_digits=1, reclaim_grace_seconds=0, batch_size=2
+        )
+        allocator.replenish()
+        live = allocator.allocate()
+        expired = [allocator.allocate() for _ in range(4)]
+        room_repo.save(Room(room_id=live, creator="u1"))
+        time.sleep(0.002)
+
+        assert allocator.reclaim() == 4
+        assert all(redis_client.sismember(FREE, room_id) for room_id in expired)
+        assert not redis_client.sismember(FREE, live)
+        assert allocator.reclaim() == 0
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+房间仓储单元测试
+"""
+
+import json
+
+import fakeredis
+import pytest
+
+from src.exceptions import PlayerEliminatedError, RoomFullError, RoomNotFoundError
+from src.models.room import Room, RoomStatus
+from src.repositories.room_repository import RoomRepository
+
+
+class TestRoomScripts:
+    """房间原子脚本测试类"""
+
+    @pytest.fixture
+    def room_repo(self):
+        return RoomRepository(fakeredis.FakeRedis(decode_responses=False))
+
+    def test_concurrent_joins_do_not_overwrite(self, room_repo):
+        """基于旧快照的并发加入不会互相覆盖"""
+        room_repo.save(Room(room_id="1234", creator="u1"))
+        stale = room_repo.get("1234")
+
+        room_repo.add_player("1234", "u2", 12)
+        room_repo.add_player("1234", "u3", 12)
+
+        assert stale.players == ["u1"]
+        assert room_repo.get("1234").players == ["u1", "u2", "u3"]
+
+    def test_join_errors_map_to_exceptions(self, room_repo):
+        """脚本错误码映射为业务异常"""
+        with pytest.raises(RoomNotFoundError):
+            room_repo.add_player("9999", "u1", 12)
+
+        room_repo.save(Room(room_id="1234", creator="u1", players=["u1", "u2"]))
+        with pytest.raises(RoomFullError):
+            room_repo.add_player("1234", "u3", 2)
+
+    def test_start_and_vote(self, room_repo):
+        """开始游戏后可淘汰玩家，重复淘汰会被拒绝"""
+        room_repo.save(Room(room_id="1234", creator="u1", players=["u1", "u2", "u3"]))
+
+        room = room_repo.start_game(
+            "1234", "u1",
+            words={'civilian': "苹果", 'undercover': "香蕉"},
+            status=RoomStatus.PLAYING,
+            min_players=3,
+            undercover_rules={(3, 5): 1, (6, 8): 2},
+        )
+        assert room.status == RoomStatus.PLAYING
+        assert room.words == {'civilian': "苹果", 'undercover': "香蕉"}
+        assert len(room.undercovers) == 1
+        assert room.eliminated == []
+
+        room = room_repo.eliminate_player("1234", "u1", 2)
+        assert room.eliminated == ["u2"]
+        with pytest.raises(PlayerEliminatedError):
+            room_repo.eliminate_player("1234", "u1", 2)
+
+
+class TestRoomHashStorage:
+    """房间哈希存储测试类"""
+
+    @pytest.fixture
+    def redis_client(self):
+        return fakeredis.FakeRedis(decode_responses=False)
+
+    @pytest.fixture
+    def room_repo(self, redis_client):
+        return RoomRepository(redis_client)
+
+    @staticmethod
+    def _write_legacy(redis_client, room: Room) -> None:
+        """按旧格式写入整个 JSON 文档"""
+        redis_client.setex(f"room:{room.room_id}", 600, json.dumps(room.to_dict(), ensure_ascii=False))
+        redis_client.setex(f"room:{room.room_id}:ver", 600, 42)
+
+    def test_stored_as_hash(self, room_repo, redis_client):
+        """房间以哈希存储，每个字段单独保存"""
+        room_repo.save(Room(room_id="1234", creator="u1", players=["u1", "u2"]))
+
+        assert redis_client.type("room:1234") == b"hash"
+        assert redis_client.hmget("room:1234", ["status", "players"]) == [b"waiting", b'["u1", "u2"]']
+
+    def test_legacy_room_migrated_on_read(self, room_repo, redis_client):
+        """旧格式房间在读取时迁移为哈希，保留过期时间与版本号"""
+        self._write_legacy(redis_client, Room(room_id="1234", creator="u1", players=["u1", "u2"]))
+
+        room = room_repo.get("1234")
+
+        assert room.players == ["u1", "u2"]
+        assert room.version == 42
+        assert redis_client.type("room:1234") == b"hash"
+        assert 0 < redis_client.ttl("room:1234") <= 600
+        assert redis_client.exists("room:1234:ver") == 0
+
+    def test_legacy_room_migrated_by_script(self, room_repo, redis_client):
+        """原子脚本同样能处理旧格式房间"""
+        self._write_legacy(redis_client, Room(room_id="1234", creator="u1"))
+
+        room = room_repo.add_player("1234", "u2", 12)
+
+        assert room.players == ["u1", "u2"]
+        assert room.version == 43
+
+    def test_partial_updates(self, room_repo):
+        """状态更新递增版本号，刷新活跃时间不改变版本号"""
+        room_repo.save(Room(room_id="1234", creator="u1"))
+        version = room_repo.get("1234").version
+
+        assert room_repo.touch("1234") is True
+        assert room_repo.get("1234").version == version
+        assert room_repo.touch("9999") is False
+
+        room = room_repo.set_status("1234", RoomStatus.ENDED)
+        assert room.status == RoomStatus.ENDED
+        assert room.version == version + 1
+        assert room_repo.get("1234").status == RoomStatus.ENDED
+
+
+class TestRoomBulkOperations:
+    """房间批量操作测试类"""
+
+    def test_bulk_round_trip(self):
+        """批量保存、读取（含旧格式数据）与删除"""
+        redis_client = fakeredis.FakeRedis(decode_responses=False)
+        room_repo = RoomRepository(redis_client)
+        room_repo.save_many([Room(room_id="1111", creator="u1"), Room(room_id="2222", creator="u2")])
+        redis_client.set("room:3333", json.dumps(Room(room_id="3333", creator="u3").to_dict()))
+
+        rooms = room_repo.get_many(["1111", "2222", "3333", "9999"])
+
+        assert rooms["1111"].creator == "u1"
+        assert rooms["2222"].version > 0
+        assert rooms["3333"].players == ["u3"]
+        assert rooms["9999"] is None
+
+        room_repo.delete_many(["1111", "3333"])
+
+        assert room_repo.get_many(["1111", "2222", "3333"]) == {'1111': None, '2222': rooms["2222"], '3333': None}
+        assert redis_client.zscore(room_repo.expiry_index_key, "2222") is not None
+        assert redis_client.zscore(room_repo.expiry_index_key, "1111") is None
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+工作单元（身份映射）单元测试
+"""
+
+from unittest.mock import Mock
+
+import fakeredis
+import pytest
+
+from src.exceptions import DataAccessError
+from src.models.room import Room
+from src.models.user import User
+from src.repositories.room_id_allocator import RoomIdAllocator
+from src.repositories.room_repository import RoomRepository
+from src.repositories.unit_of_work import UnitOfWork
+from src.repositories.user_repository import UserRepository
+from src.services.game_service import GameService
+
+
+def round_trips(redis_spy) -> int:
+    """统计读取类 Redis 调用次数"""
+    return (
+        redis_spy.get.call_count + redis_spy.getex.call_count
+        + redis_spy.mget.call_count + redis_spy.hgetall.call_count
+    )
+
+
+class TestUnitOfWork:
+    """工作单元测试类"""
+
+    @pytest.fixture
+    def redis_spy(self):
+        """包装 fakeredis，便于统计 Redis 调用次数"""
+        return Mock(wraps=fakeredis.FakeRedis(decode_responses=False))
+
+    @pytest.fixture
+    def repositories(self, redis_spy):
+        return RoomRepository(redis_spy), UserRepository(redis_spy)
+
+    def test_get_loads_each_entity_once(self, repositories, redis_spy):
+        """同一工作单元内重复读取只访问一次Redis"""
+        room_repo, user_repo = repositories
+        room_repo.save(Room(room_id="1234", creator="u1"))
+        user_repo.save(User(openid="u1", current_room="1234"))
+        redis_spy.reset_mock()
+
+        with UnitOfWork():
+            first = user_repo.get("u1")
+            assert user_repo.get("u1") is first
+            assert room_repo.get("1234") is room_repo.get("1234")
+            assert user_repo.get("missing") is None
+            assert user_repo.get("missing") is None
+
+        assert round_trips(redis_spy) == 3
+
+    def test_save_is_deferred_until_commit(self, repositories, redis_spy):
+        """工作单元内的保存在退出时统一写回"""
+        room_repo, user_repo = repositories
+
+        with UnitOfWork():
+            user_repo.save(User(openid="u1"))
+            user = user_repo.get("u1")
+            user.join_room("1234")
+            user_repo.save(user)
+            assert redis_spy.set.call_count == 0
+
+        assert redis_spy.set.call_count == 1
+        assert user_repo.get("u1").current_room == "1234"
+
+    def test_rollback_on_exception(self, repositories):
+        """发生异常时不写回脏实体"""
+        _, user_repo = repositories
+
+        with pytest.raises(RuntimeError), UnitOfWork():
+            user_repo.save(User(openid="u1"))
+            raise RuntimeError("boom")
+
+        assert user_repo.get("u1") is None
+
+    def test_deleted_entity_not_written_back(self, repositories):
+        """删除后的实体不会在提交时被写回"""
+        room_repo, _ = repositories
+
+        with UnitOfWork():
+            room_repo.save(Room(room_id="1234", creator="u1"))
+            room_repo.delete("1234")
+            assert room_repo.exists("1234") is False
+
+        assert room_repo.get("1234") is None
+
+    def test_status_and_word_share_loaded_entities(self, repositories, redis_spy):
+        """状态与词语查询共用同一份已加载的用户和房间"""
+        room_repo, user_repo = repositories
+        service = GameService(room_repo, user_repo)
+        room_repo.save(Room(room_id="1234", creator="u1", players=["u1", "u2"]))
+        user_repo.save(User(openid="u1", nickname="玩家1", current_room="1234"))
+        user_repo.save(User(openid="u2", nickname="玩家2", current_room="1234"))
+        redis_spy.reset_mock()
+
+        with UnitOfWork():
+            service.show_status("u1")
+            service.show_word("u1")
+
+        # u1 与房间各读取一次，其余成员通过一次 MGET 读取
+        assert round_trips(redis_spy) == 3
+
+    def test_get_many_uses_single_mget(self, repositories, redis_spy):
+        """批量读取只发起一次 MGET，且复用已加载的用户"""
+        room_repo, user_repo = repositories
+        service = GameService(room_repo, user_repo)
+        players = [f"u{i}" for i in range(1, 13)]
+        room_repo.save(Room(room_id="1234", creator="u1", players=players))
+        for i, player in enumerate(players, start=1):
+            user_repo.save(User(openid=player, nickname=f"昵称{i}", current_room="1234"))
+        redis_spy.reset_mock()
+
+        with UnitOfWork():
+            success, status = service.show_status("u1")
+
+        assert success is True
+        assert "12. 昵称12" in status
+        assert round_trips(redis_spy) == 3
+        assert len(redis_spy.mget.call_args.args[0]) == 11
+
+    def test_after_commit_runs_only_on_success(self, repositories):
+        """提交后回调在写回之后执行；发生异常时丢弃，改为执行回滚回调"""
+        _, user_repo = repositories
+        seen = []
+
+        with UnitOfWork() as uow:
+            user_repo.save(User(openid="u1", nickname="玩家1"))
+            uow.after_commit(lambda: seen.append(user_repo.get("u1").nickname))
+            assert seen == []
+        assert seen == ["玩家1"]
+
+        with pytest.raises(RuntimeError), UnitOfWork() as uow:
+            uow.after_commit(lambda: seen.append("committed"))
+            uow.after_rollback(lambda: seen.append("rolled back"))
+            raise RuntimeError("boom")
+        assert seen == ["玩家1", "rolled back"]
+
+    def test_write_failure_reported_by_operation(self, repositories, redis_spy):
+        """业务操作内写回失败时返回错误回复，已写入的房间被删除、房间号归还"""
+        room_repo, user_repo = repositories
+        allocator = RoomIdAllocator(redis_spy)
+        allocator.replenish()
+        service = GameService(room_repo, user_repo, id_allocator=allocator)
+        user_repo._write_many = Mock(side_effect=DataAccessError(message="写入失败", error_code="REPO-DATA-001"))
+
+        with UnitOfWork():
+            success, message = service.create_room("u1")
+
+        assert success is False
+        assert message == "创建房间失败，请稍后重试"
+        assert redis_spy.zcard("{room:ids}:leased") == 0
+        assert redis_spy.scard("{room:ids}:free") == 9000
+        assert redis_spy.keys("room:[0-9]*") == []
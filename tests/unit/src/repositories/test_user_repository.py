@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+用户仓储单元测试
+"""
+
+from unittest.mock import Mock
+
+import fakeredis
+import pytest
+import redis
+
+from src.exceptions import RedisConnectionError
+from src.models.user import User
+from src.repositories.unit_of_work import UnitOfWork
+from src.repositories.user_repository import UserRepository
+
+
+class TestUserBulkOperations:
+    """用户批量操作测试类"""
+
+    @pytest.fixture
+    def redis_spy(self):
+        return Mock(wraps=fakeredis.FakeRedis(decode_responses=False))
+
+    def test_save_many_and_delete_many(self, redis_spy):
+        """批量保存使用一次流水线，批量删除使用一次 DEL"""
+        repo = UserRepository(redis_spy)
+        users = [User(openid=f"u{i}", nickname=f"玩家{i}") for i in range(5)]
+
+        repo.save_many(users)
+
+        assert redis_spy.pipeline.call_count == 1
+        assert redis_spy.set.call_count == 0
+        assert repo.get_many([user.openid for user in users]) == {user.openid: user for user in users}
+
+        repo.delete_many(["u0", "u1"])
+
+        assert redis_spy.delete.call_count == 1
+        assert repo.get("u0") is None
+        assert repo.get("u2") is not None
+
+    def test_unit_of_work_commits_in_one_pipeline(self, redis_spy):
+        """工作单元提交时同一仓储的脏实体以一次流水线写回"""
+        repo = UserRepository(redis_spy)
+
+        with UnitOfWork():
+            repo.save_many([User(openid="u1"), User(openid="u2")])
+            repo.save(User(openid="u3"))
+
+        assert redis_spy.pipeline.call_count == 1
+        assert set(repo.get_many(["u1", "u2", "u3"])) == {"u1", "u2", "u3"}
+
+    def test_save_many_translates_connection_error(self):
+        """批量写入的连接错误转换为 RedisConnectionError"""
+        redis_client = Mock()
+        redis_client.pipeline.return_value.execute.side_effect = redis.ConnectionError("down")
+
+        with pytest.raises(RedisConnectionError):
+            UserRepository(redis_client).save_many([User(openid="u1"), User(openid="u2")])
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+异步回复单元测试
+"""
+
+from src.exceptions import RoomNotFoundError
+from src.services.async_reply import AsyncReplier, CommandLatency
+from src.services.message_service import MessageService
+from src.services.reply_cache import NO_REPLY
+from src.utils.metrics import MetricsRegistry
+
+TEXT_XML = (
+    "<xml><ToUserName>gh</ToUserName><FromUserName>u1</FromUserName><CreateTime>1700000000</CreateTime>"
+    "<MsgType>text</MsgType><Content>{content}</Content><MsgId>1</MsgId></xml>"
+)
+
+
+class RecordingPush:
+    """记录推送内容的推送服务"""
+
+    def __init__(self, enabled: bool = True):
+        self._enabled = enabled
+        self.sent = []
+
+    def enabled(self):
+        return self._enabled
+
+    def send_text(self, openid, content, priority=None, idempotency_key=None):
+        self.sent.append((openid, content, priority))
+        return True
+
+
+class StubRouter:
+    """按内容返回固定结果的命令路由"""
+
+    def __init__(self, error: Exception | None = None):
+        self.error = error
+
+    def command_name(self, content):
+        return {"开始": "start_game", "创建": "create_room"}.get(content)
+
+    def route(self, user_id, content):
+        if self.error is not None:
+            raise self.error
+        return f"{content}完成"
+
+
+def make_service(push, router=None, **kwargs):
+    replier = AsyncReplier(push, metrics=MetricsRegistry(), **kwargs)
+    service = MessageService(game_service=None, token="token", async_replies=replier)
+    service.router = router or StubRouter()
+    return service, replier
+
+
+class TestAsyncReply:
+    """异步回复测试类"""
+
+    def test_configured_command_acked_and_pushed(self):
+        """配置的命令先回复 success，结果以高优先级推送"""
+        push = RecordingPush()
+        service, replier = make_service(push, commands=frozenset({"start_game"}))
+
+        assert service.handle_wechat_message(TEXT_XML.format(content="开始")) == NO_REPLY
+        replier.join()
+        assert push.sent == [("u1", "开始完成", "high")]
+
+        reply = service.handle_wechat_message(TEXT_XML.format(content="创建"))
+        assert "创建完成" in reply
+
+    def test_slow_command_switches_to_async(self):
+        """估计耗时超过阈值的命令自动改为异步"""
+        push = RecordingPush()
+        service, replier = make_service(push, cost_threshold_seconds=1.0)
+        replier.latency.observe("create_room", 3.0)
+
+        assert service.handle_wechat_message(TEXT_XML.format(content="创建")) == NO_REPLY
+        replier.join()
+        assert push.sent[0][1] == "创建完成"
+
+    def test_push_disabled_replies_synchronously(self):
+        """未启用推送时始终同步回复"""
+        push = RecordingPush(enabled=False)
+        service, _ = make_service(push, commands=frozenset({"start_game"}))
+
+        assert "开始完成" in service.handle_wechat_message(TEXT_XML.format(content="开始"))
+        assert push.sent == []
+
+    def test_business_error_pushed_to_user(self):
+        """后台执行抛出的业务异常以提示信息推送给用户"""
+        push = RecordingPush()
+        error = RoomNotFoundError("1234")
+        service, replier = make_service(push, router=StubRouter(error), commands=frozenset({"start_game"}))
+
+        service.handle_wechat_message(TEXT_XML.format(content="开始"))
+        replier.join()
+
+        assert push.sent == [("u1", error.message, "high")]
+
+    def test_latency_moving_average(self):
+        """耗时估计为指数加权移动平均"""
+        latency = CommandLatency(alpha=0.5, metrics=MetricsRegistry())
+
+        assert latency.estimate("vote") is None
+        latency.observe("vote", 1.0)
+        latency.observe("vote", 3.0)
+
+        assert latency.estimate("vote") == 2.0
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+熔断器单元测试
+"""
+
+import pytest
+
+from src.exceptions import CircuitOpenError
+from src.services.circuit_breaker import CircuitBreaker, CircuitBreakers, CircuitState
+from src.services.push_service import PushService
+from src.services.wechat_client import OPERATION_SEND_TEXT
+from src.utils.metrics import MetricsRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(clock, failure_threshold=3, recovery_seconds=30.0):
+    return CircuitBreaker("message.send_text", failure_threshold, recovery_seconds, MetricsRegistry(), clock=clock)
+
+
+class TestCircuitBreaker:
+    """熔断器测试类"""
+
+    def test_opens_after_consecutive_failures(self):
+        """连续失败达到阈值后熔断，成功会清零失败计数"""
+        clock = FakeClock()
+        breaker = make_breaker(clock)
+
+        for _ in range(2):
+            assert breaker.allow()
+            breaker.record_failure()
+        breaker.record_success()
+        for _ in range(2):
+            breaker.record_failure()
+        assert breaker.state is CircuitState.CLOSED
+
+        breaker.record_failure()
+        assert breaker.state is CircuitState.OPEN
+        assert breaker.allow() is False
+
+    def test_half_open_allows_single_probe(self):
+        """冷却结束后只放行一次探测调用，失败继续熔断，成功恢复"""
+        clock = FakeClock()
+        breaker = make_breaker(clock, failure_threshold=1)
+        breaker.record_failure()
+
+        clock.now = 30.0
+        assert breaker.state is CircuitState.HALF_OPEN
+        assert breaker.allow() is True
+        assert breaker.allow() is False
+        breaker.record_failure()
+        assert breaker.state is CircuitState.OPEN
+        assert breaker.snapshot() == {'state': 'open', 'failures': 2, 'retry_in_seconds': 30.0}
+
+        clock.now = 60.0
+        assert breaker.allow() is True
+        breaker.record_success()
+        assert breaker.state is CircuitState.CLOSED
+        assert breaker.allow() is True
+
+    def test_client_fails_fast_while_open(self, fake_wechat):
+        """系统繁忙触发熔断后不再调用微信接口，推送返回失败，昵称使用默认值"""
+        fake_wechat.users = {"u1": "小明"}
+        fake_wechat.system_busy = True
+        client = fake_wechat.make_client(breakers=CircuitBreakers(failure_threshold=2, metrics=MetricsRegistry()))
+
+        assert client.send_text("u1", "你好") is False
+        assert client.send_text("u1", "你好") is False
+        with pytest.raises(CircuitOpenError):
+            client.send_text("u1", "你好")
+        assert len(fake_wechat.calls('/cgi-bin/message/custom/send')) == 2
+        assert PushService(client).send_text("u1", "你好") is False
+
+        assert client.get_user_nickname("u1") == ""
+        assert client.get_user_nickname("u1") == ""
+        assert client.get_user_nickname("u1") == ""
+        assert len(fake_wechat.calls('/cgi-bin/user/info')) == 2
+        assert client.breakers.snapshot()[OPERATION_SEND_TEXT]['state'] == 'open'
+
+    def test_business_errors_do_not_open(self, fake_wechat):
+        """无效 openid 等业务错误说明接口可用，不计入失败"""
+        client = fake_wechat.make_client(breakers=CircuitBreakers(failure_threshold=2, metrics=MetricsRegistry()))
+
+        for _ in range(5):
+            assert client.send_text("ghost", "你好") is False
+
+        assert len(fake_wechat.calls('/cgi-bin/message/custom/send')) == 5
+        assert client.breakers.any_open() is False
+
+    def test_health_reports_circuits(self, app, client, monkeypatch, fake_wechat):
+        """健康检查展示熔断器状态，熔断时标记为降级但仍返回 200"""
+        wechat = fake_wechat.make_client(breakers=CircuitBreakers(failure_threshold=1, metrics=MetricsRegistry()))
+        wechat.breakers.get(OPERATION_SEND_TEXT).record_failure()
+        monkeypatch.setattr(app, 'wechat_client', wechat, raising=False)
+
+        response = client.get('/health')
+
+        assert response.status_code == 200
+        assert response.json['status'] == 'degraded'
+        assert response.json['circuits'][OPERATION_SEND_TEXT]['state'] == 'open'
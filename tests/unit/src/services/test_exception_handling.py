@@ -8,6 +8,7 @@ import os
 import sys
 from unittest.mock import Mock
 
+import fakeredis
 import pytest
 
 # 添加项目根目录到Python路径
@@ -16,6 +17,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
 from src.exceptions import InvalidCommandError  # Client Exceptions
 from src.models.room import Room, RoomStatus
 from src.models.user import User
+from src.repositories.room_repository import RoomRepository
 from src.services.game_service import GameService
 
 
@@ -35,6 +37,17 @@ class TestGameServiceExceptions:
         room_repo, user_repo = mock_repos
         return GameService(room_repo, user_repo)
 
+    @pytest.fixture
+    def room_store(self):
+        """基于 fakeredis 的房间仓储，房间状态迁移由 Lua 脚本原子完成"""
+        return RoomRepository(fakeredis.FakeRedis(decode_responses=False))
+
+    @pytest.fixture
+    def scripted_service(self, room_store, mock_repos):
+        """使用真实房间仓储的游戏服务实例"""
+        _, user_repo = mock_repos
+        return GameService(room_store, user_repo)
+
     def test_user_not_in_room_exception(self, game_service, mock_repos):
         """测试用户不在房间的异常"""
         room_repo, user_repo = mock_repos
@@ -84,9 +97,9 @@ class TestGameServiceExceptions:
         assert success is False
         assert "游戏尚未开始" in result
 
-    def test_game_already_started_exception(self, game_service, mock_repos):
+    def test_game_already_started_exception(self, scripted_service, room_store, mock_repos):
         """测试尝试重复开始游戏的异常"""
-        room_repo, user_repo = mock_repos
+        _, user_repo = mock_repos
         
         # 创建用户和已开始的房间
         user = User(openid="user1", nickname="玩家1", current_room="1234")
@@ -94,17 +107,17 @@ class TestGameServiceExceptions:
         room.status = RoomStatus.PLAYING  # 游戏已开始
         
         user_repo.get.return_value = user
-        room_repo.get.return_value = room
+        room_store.save(room)
         
         # 尝试再次开始游戏
-        success, result = game_service.start_game("user1")
+        success, result = scripted_service.start_game("user1")
         
         assert success is False
         assert "游戏已经开始了" in result
 
-    def test_insufficient_players_exception(self, game_service, mock_repos):
+    def test_insufficient_players_exception(self, scripted_service, room_store, mock_repos):
         """测试玩家数量不足的异常"""
-        room_repo, user_repo = mock_repos
+        _, user_repo = mock_repos
         
         # 创建用户和只有2人的房间（少于最低玩家数）
         user = User(openid="user1", nickname="玩家1", current_room="1234")
@@ -112,17 +125,17 @@ class TestGameServiceExceptions:
         room.status = RoomStatus.WAITING  # 游戏未开始
         
         user_repo.get.return_value = user
-        room_repo.get.return_value = room
+        room_store.save(room)
         
         # 尝试开始游戏（需要至少3人）
-        success, result = game_service.start_game("user1")
+        success, result = scripted_service.start_game("user1")
         
         assert success is False
         assert "人数不足以开启游戏" in result
 
-    def test_room_permission_error(self, game_service, mock_repos):
+    def test_room_permission_error(self, scripted_service, room_store, mock_repos):
         """测试权限错误异常"""
-        room_repo, user_repo = mock_repos
+        _, user_repo = mock_repos
         
         # 创建用户和房间，但user2不是房主
         user = User(openid="user2", nickname="玩家2", current_room="1234")
@@ -130,10 +143,10 @@ class TestGameServiceExceptions:
         room.status = RoomStatus.WAITING
         
         user_repo.get.return_value = user
-        room_repo.get.return_value = room
+        room_store.save(room)
         
         # 非房主尝试开始游戏
-        success, result = game_service.start_game("user2")
+        success, result = scripted_service.start_game("user2")
         
         assert success is False
         assert "只有房主可以进行" in result
@@ -158,9 +171,9 @@ class TestGameServiceExceptions:
         assert success is False
         assert "您已被淘汰" in result
 
-    def test_invalid_player_index_error(self, game_service, mock_repos):
+    def test_invalid_player_index_error(self, scripted_service, room_store, mock_repos):
         """测试无效玩家索引的异常"""
-        room_repo, user_repo = mock_repos
+        _, user_repo = mock_repos
         
         # 创建用户和房间
         user = User(openid="user1", nickname="玩家1", current_room="1234")
@@ -169,17 +182,17 @@ class TestGameServiceExceptions:
         room.words = {'civilian': '苹果', 'undercover': '香蕉'}
         
         user_repo.get.return_value = user
-        room_repo.get.return_value = room
+        room_store.save(room)
         
         # 使用超出范围的索引进行投票
-        success, result = game_service.vote_player("user1", 10)  # 索引10不存在
+        success, result = scripted_service.vote_player("user1", 10)  # 索引10不存在
         
         assert success is False
         assert "无效的玩家序号" in result
 
-    def test_room_full_error(self, game_service, mock_repos):
+    def test_room_full_error(self, scripted_service, room_store, mock_repos):
         """测试房间已满的异常"""
-        room_repo, user_repo = mock_repos
+        _, user_repo = mock_repos
         
         from src.config.game_config import GameConfig
         
@@ -197,10 +210,10 @@ class TestGameServiceExceptions:
                 return User(openid=user_id, nickname=f"玩家{user_id}", current_room="1234")
         
         user_repo.get.side_effect = mock_get
-        room_repo.get.return_value = room
+        room_store.save(room)
         
         # 尝试加入已满的房间
-        success, result = game_service.join_room("user50", "1234")
+        success, result = scripted_service.join_room("user50", "1234")
         
         assert success is False
         assert "该房间已满" in result
@@ -5,17 +5,20 @@
 
 import os
 import sys
+import time
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
 
 from unittest.mock import Mock
 
+import fakeredis
 import pytest
 
 from src.models.room import Room, RoomStatus
 from src.models.user import User
-from src.services.game_service import GameService
+from src.repositories.room_repository import RoomRepository
+from src.services.game_service import ROOM_TOUCH_INTERVAL_SECONDS, GameService
 
 
 class TestGameService:
@@ -34,6 +37,17 @@ class TestGameService:
         room_repo, user_repo = mock_repos
         return GameService(room_repo, user_repo)
     
+    @pytest.fixture
+    def room_store(self):
+        """基于 fakeredis 的房间仓储，房间状态迁移由 Lua 脚本原子完成"""
+        return RoomRepository(fakeredis.FakeRedis(decode_responses=False))
+    
+    @pytest.fixture
+    def scripted_service(self, room_store, mock_repos):
+        """使用真实房间仓储的游戏服务实例"""
+        _, user_repo = mock_repos
+        return GameService(room_store, user_repo)
+    
     def test_create_room_success(self, game_service, mock_repos):
         """测试成功创建房间"""
         room_repo, user_repo = mock_repos
@@ -71,21 +85,19 @@ class TestGameService:
         assert success is False
         assert "创建房间" in result and ("失败" in result or "错误" in result)
     
-    def test_join_room_success(self, game_service, mock_repos):
+    def test_join_room_success(self, scripted_service, room_store, mock_repos):
         """测试成功加入房间"""
-        room_repo, user_repo = mock_repos
+        _, user_repo = mock_repos
         
-        # 创建模拟房间
-        room = Room(room_id="1234", creator="user1", players=["user1"])
+        # 创建房间
+        room_store.save(Room(room_id="1234", creator="user1", players=["user1"]))
         
         # 设置模拟行为 - 用户不在任何房间中
         user_repo.get.return_value = None  # 用户尚未加入任何房间
-        room_repo.get.return_value = room
-        room_repo.save.return_value = True
         user_repo.save.return_value = True
         
         # 调用被测试方法
-        success, result = game_service.join_room("user2", "1234")
+        success, result = scripted_service.join_room("user2", "1234")
         
         # 验证结果
         assert success is True
@@ -93,82 +105,81 @@ class TestGameService:
         assert "当前房间人数：2" in result
         
         # 验证房间状态
+        room = room_store.get("1234")
         assert len(room.players) == 2
         assert "user2" in room.players
     
-    def test_join_room_not_found(self, game_service, mock_repos):
+    def test_join_room_not_found(self, scripted_service, mock_repos):
         """测试加入不存在的房间"""
-        room_repo, user_repo = mock_repos
+        _, user_repo = mock_repos
         
         # 设置模拟行为 - 用户不在任何房间中，房间不存在
         user_repo.get.return_value = None  # 用户尚未加入任何房间
-        room_repo.get.return_value = None  # 房间不存在
         
         # 调用被测试方法
-        success, result = game_service.join_room("user2", "1234")
+        success, result = scripted_service.join_room("user2", "1234")
         
         # 验证结果
         assert success is False
         assert "房间" in result and "不存在" in result  # 容忍更详细的错误消息
     
-    def test_join_room_already_playing(self, game_service, mock_repos):
+    def test_join_room_already_playing(self, scripted_service, room_store, mock_repos):
         """测试加入已开始游戏的房间"""
-        room_repo, user_repo = mock_repos
+        _, user_repo = mock_repos
         
-        # 创建模拟房间（游戏中状态）
+        # 创建房间（游戏中状态）
         room = Room(room_id="1234", creator="user1", players=["user1"])
         room.status = RoomStatus.PLAYING
+        room_store.save(room)
         
         # 设置模拟行为 - 用户不在任何房间中
         user_repo.get.return_value = None  # 用户尚未加入任何房间
-        room_repo.get.return_value = room
         
         # 调用被测试方法
-        success, result = game_service.join_room("user2", "1234")
+        success, result = scripted_service.join_room("user2", "1234")
         
         # 验证结果
         assert success is False
         assert result == "游戏已经开始，无法加入房间"
     
-    def test_start_game_success(self, game_service, mock_repos):
+    def test_start_game_success(self, scripted_service, room_store, mock_repos):
         """测试成功开始游戏"""
-        room_repo, user_repo = mock_repos
+        _, user_repo = mock_repos
         
         # 创建模拟用户和房间
         user = User(openid="user1", nickname="玩家1", current_room="1234")
-        room = Room(room_id="1234", creator="user1", players=["user1", "user2", "user3"])
+        room_store.save(Room(room_id="1234", creator="user1", players=["user1", "user2", "user3"]))
         
         # 设置模拟行为
         user_repo.get.return_value = user
-        room_repo.get.return_value = room
-        room_repo.save.return_value = True
         
         # 调用被测试方法
-        success, result = game_service.start_game("user1")
+        success, result = scripted_service.start_game("user1")
         
         # 验证结果
         assert success is True
         assert result == "游戏开始成功"
         
         # 验证房间状态
+        room = room_store.get("1234")
         assert room.status == RoomStatus.PLAYING
         assert room.words is not None
         assert len(room.undercovers) == 1  # 3人游戏应该有1个卧底
+        assert room.undercovers[0] in room.players
     
-    def test_start_game_not_creator(self, game_service, mock_repos):
+    def test_start_game_not_creator(self, scripted_service, room_store, mock_repos):
         """测试非房主尝试开始游戏"""
-        room_repo, user_repo = mock_repos
+        _, user_repo = mock_repos
         
         # 创建模拟用户和房间
         user = User(openid="user2", nickname="玩家2", current_room="1234")
-        room = Room(room_id="1234", creator="user1", players=["user1", "user2", "user3"])
+        room_store.save(Room(room_id="1234", creator="user1", players=["user1", "user2", "user3"]))
         
         # 设置模拟行为
         user_repo.get.return_value = user
-        room_repo.get.return_value = room
         
         # 调用被测试方法
-        success, result = game_service.start_game("user2")
+        success, result = scripted_service.start_game("user2")
         
         # 验证结果
         assert success is False
@@ -196,29 +207,53 @@ class TestGameService:
         assert success is True
         assert result == "您的词语：苹果"  # user1是平民
     
-    def test_vote_player_success(self, game_service, mock_repos):
+    def test_vote_player_success(self, scripted_service, room_store, mock_repos):
         """测试成功投票"""
-        room_repo, user_repo = mock_repos
+        _, user_repo = mock_repos
         
         # 创建模拟用户和房间
         user = User(openid="user1", nickname="玩家1", current_room="1234")
         room = Room(room_id="1234", creator="user1", players=["user1", "user2", "user3"])
         room.status = RoomStatus.PLAYING
         room.undercovers = ['user2']  # user2是卧底
+        room_store.save(room)
         
         # 设置模拟行为
         user_repo.get.return_value = user
-        room_repo.get.return_value = room
-        room_repo.save.return_value = True
+        members = {pid: User(openid=pid, current_room="1234") for pid in room.players}
+        user_repo.get_many.return_value = members
         
         # 调用被测试方法
-        success, result = game_service.vote_player("user1", 2)  # 投票给user3（索引2）
+        success, result = scripted_service.vote_player("user1", 2)  # 投票给user3（索引2）
         
         # 验证结果
         assert success is True
         # 由于投票淘汰了卧底user2，游戏结束，返回胜利消息
         assert "平民获胜" in result or "投票成功" in result
-        assert len(room.eliminated) > 0
+        assert len(room_store.get("1234").eliminated) > 0
+        
+        # 游戏结束后所有成员批量离开房间
+        user_repo.get_many.assert_called_once_with(room.players)
+        user_repo.save_many.assert_called_once_with(list(members.values()))
+        assert all(member.current_room is None for member in members.values())
+
+    def test_reading_idle_room_refreshes_activity(self, scripted_service, room_store, mock_repos):
+        """玩家查看闲置超过刷新间隔的房间时延长过期时间，不改变版本号"""
+        _, user_repo = mock_repos
+        user_repo.get.return_value = User(openid="user1", current_room="1234")
+        user_repo.get_many.return_value = {}
+        room_store.save(Room(room_id="1234", creator="user1", players=["user1", "user2"]))
+        version = room_store.get_version("1234")
+        idle_since = int((time.time() - ROOM_TOUCH_INTERVAL_SECONDS - 60) * 1_000_000)
+        room_store.redis.hset("room:1234", "last_active", idle_since)
+        room_store.redis.expire("room:1234", 60)
+        
+        success, _ = scripted_service.show_status("user1")
+        
+        assert success is True
+        assert int(room_store.redis.hget("room:1234", "last_active")) > idle_since
+        assert room_store.redis.ttl("room:1234") > 60
+        assert room_store.get_version("1234") == version
 
 
 if __name__ == "__main__":
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+出站 HTTP 会话单元测试
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src.services.http_session import create_session
+
+
+class StandInServer:
+    """按路径返回预设响应的本地 HTTP/1.1 服务，记录请求与客户端连接"""
+
+    def __init__(self):
+        # 路径 -> 依次返回的状态码，用完后返回 200
+        self.statuses: dict[str, list[int]] = {}
+        self.delay_seconds = 0.0
+        self.requests: list[tuple[str, str]] = []
+        self.connections: set[int] = set()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def _respond(self):
+                server.requests.append((self.command, self.path))
+                server.connections.add(self.client_address[1])
+                length = int(self.headers.get('Content-Length') or 0)
+                self.rfile.read(length)
+                time.sleep(server.delay_seconds)
+                pending = server.statuses.get(self.path)
+                status = pending.pop(0) if pending else 200
+                self.send_response(status)
+                self.send_header('Content-Length', '2')
+                self.end_headers()
+                self.wfile.write(b'{}')
+
+            do_GET = _respond
+            do_POST = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stand_in():
+    server = StandInServer()
+    yield server
+    server.stop()
+
+
+class TestHttpSession:
+    """出站 HTTP 会话测试类"""
+
+    def test_connections_reused(self, stand_in):
+        """连续调用复用同一个 keep-alive 连接"""
+        session = create_session()
+
+        for _ in range(5):
+            assert session.get(f"{stand_in.url}/ok").status_code == 200
+
+        assert len(stand_in.connections) == 1
+
+    def test_default_read_timeout(self, stand_in):
+        """未指定超时的请求也受默认读取超时约束"""
+        stand_in.delay_seconds = 1.0
+        session = create_session(read_timeout=0.1, max_retries=0)
+
+        started = time.monotonic()
+        with pytest.raises(requests.exceptions.RequestException):
+            session.get(f"{stand_in.url}/slow")
+        assert time.monotonic() - started < 0.9
+
+    def test_idempotent_requests_retried(self, stand_in):
+        """GET 遇到 503 时重试"""
+        stand_in.statuses["/flaky"] = [503, 503, 200]
+        session = create_session(max_retries=2, backoff_factor=0)
+
+        assert session.get(f"{stand_in.url}/flaky").status_code == 200
+        assert stand_in.requests == [("GET", "/flaky")] * 3
+
+    def test_post_not_retried(self, stand_in):
+        """POST 不重试，避免重复发送消息"""
+        stand_in.statuses["/send"] = [503, 200]
+        session = create_session(max_retries=2, backoff_factor=0)
+
+        assert session.post(f"{stand_in.url}/send", data=b'{}').status_code == 503
+        assert stand_in.requests == [("POST", "/send")]
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+昵称服务单元测试
+"""
+
+import threading
+
+import fakeredis
+
+from src.repositories.room_repository import RoomRepository
+from src.repositories.unit_of_work import UnitOfWork
+from src.repositories.user_repository import UserRepository
+from src.services.game_service import GameService
+from src.services.nickname_service import NicknameService
+from src.utils.metrics import MetricsRegistry
+
+
+class CountingPush:
+    """统计昵称查询次数的模拟推送服务"""
+
+    def __init__(self, release: threading.Event | None = None):
+        self.release = release
+        self.lookups = []
+
+    def enabled(self):
+        return True
+
+    def send_text(self, openid, content, priority=None, idempotency_key=None):
+        return True
+
+    def get_user_nickname(self, openid):
+        if self.release is not None:
+            self.release.wait(timeout=5)
+        self.lookups.append(openid)
+        return "昵称" + openid
+
+
+def make_service(push):
+    r = fakeredis.FakeRedis(decode_responses=False)
+    user_repo = UserRepository(r)
+    nicknames = NicknameService(r, push, user_repo, metrics=MetricsRegistry())
+    service = GameService(RoomRepository(r), user_repo, push, nicknames=nicknames)
+    return r, user_repo, nicknames, service
+
+
+class TestNicknameService:
+    """昵称服务测试类"""
+
+    def test_join_does_not_wait_for_wechat(self):
+        """未命中缓存时先以占位昵称回复，提交后由后台补全"""
+        release = threading.Event()
+        push = CountingPush(release)
+        _, user_repo, nicknames, service = make_service(push)
+
+        with UnitOfWork():
+            ok, _ = service.create_room("u1")
+            assert ok
+            # 提交前不会开始获取
+            assert push.lookups == []
+        assert user_repo.get("u1").nickname == "玩家1"
+
+        release.set()
+        nicknames.join()
+
+        assert push.lookups == ["u1"]
+        user = user_repo.get("u1")
+        assert user.nickname == "昵称u1"
+        assert user.current_room is not None
+
+    def test_cached_nickname_used_directly(self):
+        """命中缓存时直接使用，不调用微信接口"""
+        push = CountingPush()
+        r, user_repo, nicknames, service = make_service(push)
+        r.set("nickname:u1", "缓存昵称".encode())
+
+        with UnitOfWork():
+            ok, _ = service.create_room("u1")
+        nicknames.join()
+
+        assert ok
+        assert push.lookups == []
+        assert user_repo.get("u1").nickname == "缓存昵称"
+
+    def test_single_flight_across_workers(self):
+        """多个 worker 同时未命中时只有一个调用微信接口"""
+        push = CountingPush()
+        r = fakeredis.FakeRedis(decode_responses=False)
+        user_repo = UserRepository(r)
+        first = NicknameService(r, push, user_repo, metrics=MetricsRegistry())
+        second = NicknameService(r, push, user_repo, metrics=MetricsRegistry())
+        r.set("nickname:lock:u1", 1, ex=30)
+
+        assert second.enrich("u1") is None
+        r.delete("nickname:lock:u1")
+        assert first.enrich("u1") == "昵称u1"
+        assert second.cached("u1") == "昵称u1"
+        assert push.lookups == ["u1"]
+
+    def test_update_nickname_keeps_concurrent_changes(self):
+        """写回昵称只修改昵称字段"""
+        push = CountingPush()
+        _, user_repo, nicknames, service = make_service(push)
+        ok, room_id = service.create_room("u1")
+        nicknames.join()
+
+        assert user_repo.update_nickname("u1", "新昵称") is True
+        assert user_repo.update_nickname("missing", "x") is False
+        user = user_repo.get("u1")
+        assert (user.nickname, user.current_room) == ("新昵称", room_id)
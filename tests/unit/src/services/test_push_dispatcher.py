@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+推送分发器单元测试
+"""
+
+import threading
+
+from src.services.push_dispatcher import PushDispatcher
+from src.services.push_service import PushService
+from src.utils.metrics import MetricsRegistry
+
+
+class SlowClient:
+    """阻塞直到放行的模拟微信客户端"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.sent = []
+
+    def send_text(self, openid, content):
+        self.release.wait(timeout=5)
+        self.sent.append(openid)
+        return openid != "bad"
+
+
+class TestPushDispatcher:
+    """推送分发器测试类"""
+
+    def test_send_returns_before_delivery(self):
+        """推送在后台线程执行，请求线程提交后立即返回"""
+        client = SlowClient()
+        metrics = MetricsRegistry()
+        dispatcher = PushDispatcher(max_workers=4, metrics=metrics)
+        push = PushService(client, dispatcher=dispatcher)
+
+        for openid in ("u1", "u2", "bad"):
+            assert push.send_text(openid, "您的词语：苹果") is True
+        assert client.sent == []
+
+        client.release.set()
+        dispatcher.join()
+
+        assert sorted(client.sent) == ["bad", "u1", "u2"]
+        assert metrics.counter("push_sent_total", "").value() == 2
+        assert metrics.counter("push_failed_total", "").value() == 1
+        assert metrics.histogram("push_send_seconds", "").count() == 3
+        dispatcher.shutdown()
+
+    def test_full_queue_drops(self):
+        """队列已满时丢弃推送并计数"""
+        client = SlowClient()
+        metrics = MetricsRegistry()
+        dispatcher = PushDispatcher(max_workers=1, max_queue=1, metrics=metrics)
+
+        results = [dispatcher.submit(client.send_text, f"u{i}", "") for i in range(5)]
+
+        assert results.count(False) >= 3
+        assert metrics.counter("push_dropped_total", "").value() == results.count(False)
+        assert metrics.gauge("push_queue_depth", "").value() <= 1
+        client.release.set()
+        dispatcher.shutdown()
@@ -19,7 +19,7 @@ class MockPush:
         self.calls = []
     def enabled(self):
         return True
-    def send_text(self, openid, content):
+    def send_text(self, openid, content, priority=None, idempotency_key=None):
         self.calls.append((openid, content))
         return True
     def get_user_nickname(self, openid):
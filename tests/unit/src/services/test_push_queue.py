@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+持久化推送队列与推送消费者单元测试
+"""
+
+import json
+
+import fakeredis
+
+from src.exceptions import CircuitOpenError
+from src.repositories.room_repository import RoomRepository
+from src.repositories.user_repository import UserRepository
+from src.services.game_service import GameService
+from src.services.push_queue import PushQueue
+from src.services.push_service import PushService
+from src.services.push_worker import PushWorker
+from src.services.wechat_client import OPERATION_SEND_TEXT
+from src.utils.metrics import MetricsRegistry
+
+
+class FlakyClient:
+    """前 failures 次发送失败的模拟微信客户端"""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.sent = []
+
+    def send_text(self, openid, content):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("api unavailable")
+        self.sent.append((openid, content))
+        return True
+
+    def get_user_nickname(self, openid):
+        return ""
+
+
+class OpenCircuitClient:
+    """发送接口熔断中的模拟微信客户端"""
+
+    def send_text(self, openid, content):
+        raise CircuitOpenError(OPERATION_SEND_TEXT)
+
+
+def make_worker(client, **kwargs):
+    redis_client = fakeredis.FakeRedis()
+    queue = PushQueue(redis_client)
+    queue.ensure_group()
+    worker = PushWorker(queue, client, "worker-1", metrics=MetricsRegistry(), **kwargs)
+    return redis_client, queue, worker
+
+
+class TestPushQueue:
+    """持久化推送队列测试类"""
+
+    def test_send_text_enqueues_and_worker_delivers(self):
+        """send_text 只写入流，由消费者发送并确认删除"""
+        client = FlakyClient()
+        redis_client, queue, worker = make_worker(client)
+        push = PushService(client, queue=queue)
+
+        assert push.send_text("u1", "您的词语：苹果") is True
+        assert client.sent == []
+        assert redis_client.xlen(queue.stream_key) == 1
+
+        assert worker.run_once() == 1
+        assert client.sent == [("u1", "您的词语：苹果")]
+        assert redis_client.xlen(queue.stream_key) == 0
+        assert redis_client.xpending(queue.stream_key, queue.group)['pending'] == 0
+
+    def test_idempotency_key(self):
+        """相同幂等键只入队一次，已发送的键重复投递时直接确认"""
+        client = FlakyClient()
+        redis_client, queue, worker = make_worker(client)
+
+        assert queue.enqueue("u1", "hi", idempotency_key="word:1234:1:u1") is True
+        assert queue.enqueue("u1", "hi", idempotency_key="word:1234:1:u1") is True
+        assert redis_client.xlen(queue.stream_key) == 1
+        worker.run_once()
+
+        # 模拟确认前崩溃导致的重复投递
+        redis_client.xadd(queue.stream_key, {'key': "word:1234:1:u1", 'openid': "u1", 'content': "hi", 'attempts': 0})
+        worker.run_once()
+
+        assert client.sent == [("u1", "hi")]
+        assert redis_client.xlen(queue.stream_key) == 0
+
+    def test_repeated_word_push_enqueued_once(self):
+        """同一局的发词推送重复发送时，每个玩家只入队一条"""
+        client = FlakyClient()
+        redis_client, queue, worker = make_worker(client)
+        game_service = GameService(
+            RoomRepository(redis_client), UserRepository(redis_client), PushService(client, queue=queue)
+        )
+        _, room_id = game_service.create_room("u1")
+        game_service.join_room("u2", room_id)
+        game_service.join_room("u3", room_id)
+        assert game_service.start_game("u1")[0] is True
+        assert redis_client.xlen(queue.stream_key) == 3
+
+        # 模拟调用方重试：同一房间同一版本再次发词
+        game_service._push_words(game_service.room_repo.get(room_id))
+
+        assert redis_client.xlen(queue.stream_key) == 3
+        worker.run_once()
+        assert sorted(openid for openid, _ in client.sent) == ["u1", "u2", "u3"]
+
+    def test_retry_with_backoff(self):
+        """发送失败后按指数退避进入重试集合，到期后重新发送"""
+        client = FlakyClient(failures=1)
+        redis_client, queue, worker = make_worker(client, backoff_seconds=0)
+        queue.enqueue("u1", "hi")
+
+        worker.run_once()
+        assert client.sent == []
+        assert redis_client.zcard(queue.retry_key) == 1
+        assert redis_client.xlen(queue.stream_key) == 0
+
+        worker.run_once()
+        assert client.sent == [("u1", "hi")]
+        assert redis_client.zcard(queue.retry_key) == 0
+        assert [worker.backoff(n) for n in (1, 2, 3)] == [0, 0, 0]
+
+        worker.backoff_seconds = 2.0
+        worker.max_backoff_seconds = 10.0
+        assert [worker.backoff(n) for n in (1, 2, 3, 4)] == [2.0, 4.0, 8.0, 10.0]
+
+    def test_dead_letter_after_max_attempts(self):
+        """超过最大尝试次数后转入死信流"""
+        client = FlakyClient(failures=10)
+        redis_client, queue, worker = make_worker(client, max_attempts=2, backoff_seconds=0)
+        queue.enqueue("u1", "hi")
+
+        worker.run_once()
+        worker.run_once()
+
+        assert client.sent == []
+        assert redis_client.zcard(queue.retry_key) == 0
+        assert redis_client.xlen(queue.stream_key) == 0
+        [(_, fields)] = redis_client.xrange(queue.dead_letter_key)
+        assert fields[b'openid'] == b"u1"
+        assert fields[b'attempts'] == b"2"
+        assert fields[b'error'] == b"api unavailable"
+
+    def test_worker_defers_without_counting_attempt(self):
+        """熔断期间消息留在重试集合中，不计入尝试次数"""
+        redis_client, queue, worker = make_worker(OpenCircuitClient(), max_attempts=1, backoff_seconds=0)
+        queue.enqueue("u1", "hi")
+
+        worker.run_once()
+
+        assert redis_client.xlen(queue.dead_letter_key) == 0
+        [entry] = redis_client.zrange(queue.retry_key, 0, -1)
+        assert int(json.loads(entry)['attempts']) == 0
+
+
+    def test_stale_messages_claimed_from_crashed_consumer(self):
+        """崩溃的消费者未确认的消息由其他消费者认领"""
+        client = FlakyClient()
+        redis_client, queue, worker = make_worker(client, claim_idle_seconds=0)
+        queue.enqueue("u1", "hi")
+        # 另一消费者读取后崩溃，未确认
+        assert len(queue.read("crashed", 10)) == 1
+        assert queue.read("worker-1", 10) == []
+
+        worker.run_once()
+
+        assert client.sent == [("u1", "hi")]
+        assert redis_client.xpending(queue.stream_key, queue.group)['pending'] == 0
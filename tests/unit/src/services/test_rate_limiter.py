@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+推送限流器单元测试
+"""
+
+import threading
+import time
+
+import fakeredis
+
+from src.services.push_dispatcher import PushDispatcher
+from src.services.rate_limiter import PRIORITY_HIGH, PRIORITY_NORMAL, RateLimiter
+from src.utils.metrics import MetricsRegistry
+
+
+def make_limiter(redis_client=None, **kwargs):
+    metrics = MetricsRegistry()
+    limiter = RateLimiter(redis_client or fakeredis.FakeRedis(), metrics=metrics, **kwargs)
+    return limiter, metrics
+
+
+class TestRateLimiter:
+    """推送限流器测试类"""
+
+    def test_burst_then_throttled(self):
+        """桶中令牌用完后需要等待补充"""
+        limiter, metrics = make_limiter(rate_per_second=0.01, capacity=3)
+
+        assert [limiter.try_acquire() for _ in range(3)] == [0, 0, 0]
+        assert limiter.try_acquire() > 0
+        assert limiter.acquire(timeout=0) is False
+        assert metrics.counter("push_throttled_total", "").value({'priority': PRIORITY_NORMAL}) == 1
+
+    def test_reserve_kept_for_high_priority(self):
+        """普通推送不能动用为高优先级预留的令牌"""
+        limiter, _ = make_limiter(rate_per_second=0.01, capacity=4, high_priority_reserve=2)
+
+        assert [limiter.try_acquire(PRIORITY_NORMAL) for _ in range(2)] == [0, 0]
+        assert limiter.try_acquire(PRIORITY_NORMAL) > 0
+        assert [limiter.try_acquire(PRIORITY_HIGH) for _ in range(2)] == [0, 0]
+        assert limiter.try_acquire(PRIORITY_HIGH) > 0
+
+    def test_bucket_shared_between_instances(self):
+        """不同进程的限流器共享同一个桶"""
+        redis_client = fakeredis.FakeRedis()
+        first, _ = make_limiter(redis_client, rate_per_second=0.01, capacity=2)
+        second, _ = make_limiter(redis_client, rate_per_second=0.01, capacity=2)
+
+        assert first.try_acquire() == 0
+        assert second.try_acquire() == 0
+        assert first.try_acquire() > 0
+
+    def test_tokens_refill(self):
+        """令牌按速率补充"""
+        limiter, _ = make_limiter(rate_per_second=1000, capacity=1)
+
+        assert limiter.acquire() is True
+        assert limiter.acquire(timeout=1.0) is True
+
+    def test_dispatcher_serves_high_priority_first(self):
+        """分发队列中高优先级推送先发送"""
+        release = threading.Event()
+        order = []
+
+        def send(openid, content):
+            release.wait(timeout=5)
+            order.append(openid)
+            return True
+
+        dispatcher = PushDispatcher(max_workers=1, metrics=MetricsRegistry())
+        dispatcher.submit(send, "blocking", "")
+        # 等待工作线程取走第一条推送，后续推送留在队列中排序
+        while dispatcher._queue.qsize():
+            time.sleep(0.001)
+        dispatcher.submit(send, "status", "", priority=PRIORITY_NORMAL)
+        dispatcher.submit(send, "word", "", priority=PRIORITY_HIGH)
+        release.set()
+        dispatcher.join()
+
+        assert order == ["blocking", "word", "status"]
+        dispatcher.shutdown()
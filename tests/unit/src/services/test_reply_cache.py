@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+被动回复去重缓存单元测试
+"""
+
+import threading
+import time
+
+import fakeredis
+import pytest
+from wechatpy import parse_message
+
+from src.exceptions import DataAccessError
+from src.repositories.unit_of_work import UnitOfWork
+from src.services.message_service import MessageService
+from src.services.reply_cache import NO_REPLY, ReplyCache
+from src.utils.deadline import Deadline
+from src.utils.metrics import MetricsRegistry
+
+TEXT_XML = (
+    "<xml><ToUserName>gh</ToUserName><FromUserName>u1</FromUserName><CreateTime>1700000000</CreateTime>"
+    "<MsgType>text</MsgType><Content>开始</Content><MsgId>{msg_id}</MsgId></xml>"
+)
+EVENT_XML = (
+    "<xml><ToUserName>gh</ToUserName><FromUserName>u1</FromUserName><CreateTime>{create_time}</CreateTime>"
+    "<MsgType>event</MsgType><Event>subscribe</Event></xml>"
+)
+
+
+class SlowRouter:
+    """记录调用次数、可设置耗时的命令路由"""
+
+    def __init__(self, delay_seconds: float = 0.0):
+        self.delay_seconds = delay_seconds
+        self.calls = 0
+
+    def route(self, user_id, content):
+        self.calls += 1
+        time.sleep(self.delay_seconds)
+        return f"第 {self.calls} 次处理"
+
+
+class FailingRepository:
+    """提交时写入失败的仓储"""
+
+    def _write_many(self, entities):
+        raise DataAccessError(message="写入失败", error_code="REPO-DATA-001")
+
+
+def make_service(router, **kwargs):
+    cache = ReplyCache(fakeredis.FakeRedis(), metrics=MetricsRegistry(), **kwargs)
+    service = MessageService(game_service=None, token="token", reply_cache=cache)
+    service.router = router
+    return service
+
+
+class TestReplyCache:
+    """被动回复去重缓存测试类"""
+
+    def test_retry_returns_cached_reply(self):
+        """相同 MsgId 的重试直接返回首次回复，不同 MsgId 照常处理"""
+        router = SlowRouter()
+        service = make_service(router)
+
+        first = service.handle_wechat_message(TEXT_XML.format(msg_id=1))
+        retry = service.handle_wechat_message(TEXT_XML.format(msg_id=1))
+        other = service.handle_wechat_message(TEXT_XML.format(msg_id=2))
+
+        assert retry == first
+        assert "第 1 次处理" in first
+        assert "第 2 次处理" in other
+        assert router.calls == 2
+
+    def test_concurrent_retry_coalesced(self):
+        """首个请求仍在处理时，重试等待并返回同一回复"""
+        router = SlowRouter(delay_seconds=0.3)
+        service = make_service(router)
+        replies = []
+
+        threads = [
+            threading.Thread(target=lambda: replies.append(service.handle_wechat_message(TEXT_XML.format(msg_id=1))))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert router.calls == 1
+        assert len(set(replies)) == 1
+
+    def test_wait_timeout_replies_success(self):
+        """等待超时的重试回复 success，不重复执行命令"""
+        router = SlowRouter(delay_seconds=0.5)
+        service = make_service(router, wait_seconds=0.1)
+        first = threading.Thread(target=service.handle_wechat_message, args=(TEXT_XML.format(msg_id=1),))
+        first.start()
+        time.sleep(0.05)
+
+        assert service.handle_wechat_message(TEXT_XML.format(msg_id=1)) == NO_REPLY
+        first.join()
+        assert router.calls == 1
+
+    def test_wait_bounded_by_request_deadline(self):
+        """重试请求剩余时间不足时不等满等待时间，按时回复 success"""
+        cache = ReplyCache(fakeredis.FakeRedis(), wait_seconds=4.5, metrics=MetricsRegistry())
+        msg = parse_message(TEXT_XML.format(msg_id=1))
+        cache.redis.set(cache.message_key(msg), b"")
+
+        started = time.monotonic()
+        with Deadline(0.1):
+            assert cache.get_or_render(msg, lambda: "不应执行") == NO_REPLY
+        assert time.monotonic() - started < 1.0
+
+    def test_failure_releases_message(self):
+        """处理失败时不缓存，重试重新处理"""
+        cache = ReplyCache(fakeredis.FakeRedis(), metrics=MetricsRegistry())
+        msg = parse_message(TEXT_XML.format(msg_id=1))
+
+        def fail():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_render(msg, fail)
+        assert cache.get_or_render(msg, lambda: "<xml>ok</xml>") == "<xml>ok</xml>"
+
+    def test_reply_saved_only_after_commit(self):
+        """工作单元提交失败时不保存回复并释放标记，重试重新处理"""
+        redis_client = fakeredis.FakeRedis()
+        cache = ReplyCache(redis_client, metrics=MetricsRegistry())
+        msg = parse_message(TEXT_XML.format(msg_id=42))
+
+        with pytest.raises(DataAccessError), UnitOfWork() as uow:
+            uow.register_dirty(FailingRepository(), "room:", "2180", object())
+            assert cache.get_or_render(msg, lambda: "<xml>房间创建成功</xml>") == "<xml>房间创建成功</xml>"
+            assert redis_client.get("reply:42") == b""
+        assert redis_client.get("reply:42") is None
+
+        with UnitOfWork():
+            assert cache.get_or_render(msg, lambda: "<xml>重新处理</xml>") == "<xml>重新处理</xml>"
+        assert redis_client.get("reply:42").decode('utf-8') == "<xml>重新处理</xml>"
+
+    def test_event_key_uses_sender_and_create_time(self):
+        """事件没有 MsgId，以发送者与创建时间去重"""
+        first = parse_message(EVENT_XML.format(create_time=1700000000))
+        later = parse_message(EVENT_XML.format(create_time=1700000001))
+
+        assert ReplyCache.message_key(first) == "reply:u1:1700000000"
+        assert ReplyCache.message_key(later) != ReplyCache.message_key(first)
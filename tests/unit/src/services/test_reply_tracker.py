@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+增量回复单元测试
+"""
+
+import fakeredis
+import pytest
+
+from src.config.messages import ERROR_MESSAGES
+from src.repositories.room_repository import RoomRepository
+from src.repositories.unit_of_work import UnitOfWork
+from src.repositories.user_repository import UserRepository
+from src.services.game_service import GameService
+from src.services.reply_tracker import ReplyTracker
+from src.strategies.commands import CommandRouter
+from src.utils.metrics import MetricsRegistry
+
+UNKNOWN = ERROR_MESSAGES["UNKNOWN_COMMAND"]
+
+
+class TestReplyTracker:
+    """增量回复测试类"""
+
+    @pytest.fixture
+    def metrics(self):
+        return MetricsRegistry()
+
+    @pytest.fixture
+    def tracker(self, metrics):
+        return ReplyTracker(fakeredis.FakeRedis(), metrics=metrics)
+
+    @pytest.fixture
+    def router(self, tracker):
+        redis_client = fakeredis.FakeRedis()
+        game_service = GameService(RoomRepository(redis_client), UserRepository(redis_client))
+        return CommandRouter(game_service, reply_tracker=tracker)
+
+    @staticmethod
+    def send(router, user_id, content):
+        """模拟一次请求：命令在工作单元内执行"""
+        with UnitOfWork():
+            return router.route(user_id, content)
+
+    def test_mark_and_compare(self, tracker, metrics):
+        """只有房间号与版本号都一致时才视为已看过"""
+        assert not tracker.is_current("u1", ("1234", 3))
+        tracker.mark("u1", ("1234", 3))
+        assert tracker.is_current("u1", ("1234", 3))
+        assert not tracker.is_current("u1", ("1234", 4))
+        assert not tracker.is_current("u1", ("5678", 3))
+
+        # 版本未知时不记录，也不视为已看过
+        tracker.mark("u1", ("1234", None))
+        assert tracker.is_current("u1", ("1234", 3))
+        assert not tracker.is_current("u1", ("1234", None))
+
+        replies = metrics.counter("reply_status_total", "")
+        assert replies.value({'outcome': 'unchanged'}) == 2
+        assert replies.value({'outcome': 'full'}) == 4
+
+    def test_status_appended_only_when_room_changed(self, router):
+        """房间没有变化时回复不再追加状态，有人加入后重新追加"""
+        created = self.send(router, "u1", "创建")
+        room_id = router.game_service.user_repo.get("u1").current_room
+        assert "房间号" in created.split("\n\n", 1)[1]
+
+        # 创建房间在提交后才有版本号，提交后记录，下一条消息不再重复状态
+        assert self.send(router, "u1", "随便说说") == UNKNOWN
+
+        joined = self.send(router, "u2", f"加入{room_id}")
+        assert "房间号" in joined
+        assert self.send(router, "u2", "随便说说") == UNKNOWN
+
+        # 对 u1 而言房间已变化
+        assert self.send(router, "u1", "随便说说") != UNKNOWN
+        assert self.send(router, "u1", "随便说说") == UNKNOWN
+
+    def test_explicit_status_is_always_full(self, router):
+        """查看状态不论房间是否变化都返回完整状态"""
+        self.send(router, "u1", "创建")
+        assert self.send(router, "u1", "随便说说") == UNKNOWN
+
+        status = self.send(router, "u1", "查看状态")
+        assert "房间号" in status
+        assert self.send(router, "u1", "查看状态") == status
+
+    def test_not_in_room(self, router):
+        """不在房间中的用户只收到命令本身的回复"""
+        assert self.send(router, "u1", "随便说说") == UNKNOWN
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+房间过期处理服务单元测试
+"""
+
+import time
+
+import fakeredis
+import pytest
+
+from src.models.room import Room
+from src.models.user import User
+from src.repositories import user_repository
+from src.repositories.room_id_allocator import RoomIdAllocator
+from src.repositories.room_repository import RoomRepository
+from src.repositories.user_repository import UserRepository
+from src.services.game_service import GameService
+from src.services.room_expiry_service import RoomExpiryService
+
+
+class TestRoomExpiry:
+    """房间过期处理测试类"""
+
+    @pytest.fixture
+    def redis_client(self):
+        return fakeredis.FakeRedis(decode_responses=False)
+
+    @pytest.fixture
+    def repos(self, redis_client):
+        return RoomRepository(redis_client), UserRepository(redis_client)
+
+    @pytest.fixture
+    def expiry_service(self, repos, redis_client):
+        room_repo, user_repo = repos
+        return RoomExpiryService(room_repo, user_repo, RoomIdAllocator(redis_client, min_digits=1, max_digits=1))
+
+    @staticmethod
+    def _seed_room(repos, players: list[str]) -> None:
+        room_repo, user_repo = repos
+        room_repo.save(Room(room_id="1", creator=players[0], players=players))
+        for player in players:
+            user_repo.save(User(openid=player, current_room="1"))
+
+    def test_expired_room_clears_members(self, repos, redis_client, expiry_service):
+        """房间过期后清除仍指向该房间的成员，已转入其他房间的成员不受影响"""
+        room_repo, user_repo = repos
+        self._seed_room(repos, ["u1", "u2", "u3"])
+        user_repo.save(User(openid="u3", current_room="2"))
+
+        assert expiry_service.handle_expired("1") == 0
+
+        redis_client.delete("room:1")
+        assert expiry_service.handle_expired("1") == 2
+        assert user_repo.get("u1").current_room is None
+        assert user_repo.get("u3").current_room == "2"
+        assert redis_client.exists("room:1:members") == 0
+
+        # 已被认领的房间不会重复处理
+        assert expiry_service.handle_expired("1") == 0
+
+    def test_member_joining_elsewhere_during_cleanup_is_kept(self, repos, redis_client, expiry_service, monkeypatch):
+        """清理读取成员后、写回前有成员加入其他房间时，不覆盖其新的当前房间"""
+        room_repo, user_repo = repos
+        self._seed_room(repos, ["u1", "u2"])
+        redis_client.delete("room:1")
+
+        decode = user_repository.decode_record
+        joined = []
+
+        def decode_then_join(payload):
+            if not joined:
+                joined.append(True)
+                user_repo.save(User(openid="u2", nickname="小明", current_room="2"))
+            return decode(payload)
+
+        monkeypatch.setattr(user_repository, "decode_record", decode_then_join)
+
+        assert expiry_service.handle_expired("1") == 1
+        assert user_repo.get("u1").current_room is None
+        u2 = user_repo.get("u2")
+        assert (u2.current_room, u2.nickname) == ("2", "小明")
+
+    def test_sweep_handles_due_rooms(self, repos, redis_client, expiry_service):
+        """扫描过期索引处理已到期的房间"""
+        room_repo, user_repo = repos
+        self._seed_room(repos, ["u1", "u2"])
+        assert expiry_service.sweep() == 0
+
+        redis_client.delete("room:1")
+        redis_client.zadd(room_repo.expiry_index_key, {"1": 0})
+
+        assert expiry_service.sweep() == 1
+        assert user_repo.get("u2").current_room is None
+        assert redis_client.zcard(room_repo.expiry_index_key) == 0
+
+    def test_notification_key_filter(self, repos, redis_client, expiry_service):
+        """只处理房间键的过期通知"""
+        room_repo, user_repo = repos
+        self._seed_room(repos, ["u1"])
+        redis_client.delete("room:1")
+
+        expiry_service._on_expired(b"room:1:members")
+        assert user_repo.get("u1").current_room == "1"
+
+        expiry_service._on_expired(b"room:1")
+        assert user_repo.get("u1").current_room is None
+
+    def test_maintains_id_pool(self, repos, redis_client):
+        """扫描后回收未释放的号码，并在空闲号码不足时填充更多位数"""
+        room_repo, user_repo = repos
+        allocator = RoomIdAllocator(redis_client, min_digits=1, max_digits=2, reclaim_grace_seconds=0, low_water=5)
+        service = RoomExpiryService(room_repo, user_repo, allocator)
+        service.maintain_id_pool()
+        leaked = [allocator.allocate() for _ in range(9)]
+        time.sleep(0.002)
+
+        service.maintain_id_pool()
+
+        # 9 个号码的房间都不存在，全部回收后空闲号码已高于水位，不需要增加位数
+        assert redis_client.scard("{room:ids}:free") == 9
+        assert set(leaked) == {m.decode() for m in redis_client.smembers("{room:ids}:free")}
+
+
+class TestStaleRoomSelfHealing:
+    """失效房间指针自愈测试类"""
+
+    def test_stale_pointer_cleared_on_read(self):
+        """房间已过期时首次读取清除指针，之后可以正常加入其他房间"""
+        redis_client = fakeredis.FakeRedis(decode_responses=False)
+        room_repo, user_repo = RoomRepository(redis_client), UserRepository(redis_client)
+        game_service = GameService(room_repo, user_repo)
+        user_repo.save(User(openid="u1", current_room="1111"))
+        room_repo.save(Room(room_id="2222", creator="u2"))
+
+        success, result = game_service.show_status("u1")
+        assert success is False
+        assert "不存在" in result
+        assert user_repo.get("u1").current_room is None
+
+        success, _ = game_service.join_room("u1", "2222")
+        assert success is True
+
+    def test_reused_room_id_does_not_trap_user(self):
+        """房间号被新房间复用后，原成员不会被判定为仍在房间中"""
+        redis_client = fakeredis.FakeRedis(decode_responses=False)
+        room_repo, user_repo = RoomRepository(redis_client), UserRepository(redis_client)
+        game_service = GameService(room_repo, user_repo)
+        user_repo.save(User(openid="u1", current_room="1111"))
+        room_repo.save(Room(room_id="1111", creator="u2"))
+
+        success, _ = game_service.join_room("u1", "1111")
+
+        assert success is True
+        assert room_repo.get("1111").players == ["u2", "u1"]
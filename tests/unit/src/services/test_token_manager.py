@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+access token 管理器单元测试（使用本地模拟微信接口）
+"""
+
+import threading
+import time
+
+import fakeredis
+
+from src.utils.metrics import registry
+
+
+def make_clients(fake_wechat, redis_client, count: int):
+    clients = [fake_wechat.make_client(redis_client, with_token=False) for _ in range(count)]
+    for client in clients:
+        # 测试中不启动后台刷新线程
+        client.token_manager.start = lambda: None
+    return clients
+
+
+def expire_soon(manager, seconds: int) -> None:
+    """模拟共享 token 的剩余有效期只剩 seconds 秒"""
+    manager.redis.set(manager._expires_at_key, int(time.time()) + seconds)
+    manager.redis.expire(manager._redis_key, seconds)
+
+
+def refresh_count() -> float:
+    return registry.counter("wechat_token_refresh_total", "").value()
+
+
+class TestTokenManager:
+    """access token 管理器测试类"""
+
+    def test_concurrent_workers_refresh_once(self, fake_wechat):
+        """多个 worker 同时缺少 token 时只有一个调用 token 接口，其余读取共享值"""
+        fake_wechat.users = {"u1": "小明"}
+        fake_wechat.token_delay_seconds = 0.2
+        clients = make_clients(fake_wechat, fakeredis.FakeRedis(), 4)
+        refreshed = refresh_count()
+        results = []
+
+        def lookup(client):
+            results.append(client.get_user_nickname("u1"))
+
+        threads = [threading.Thread(target=lookup, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == ["小明"] * 4
+        assert len(fake_wechat.calls('/cgi-bin/token')) == 1
+        assert refresh_count() - refreshed == 1
+
+    def test_refresh_ahead_of_expiry(self, fake_wechat):
+        """剩余有效期低于阈值时提前刷新，未到阈值时复用"""
+        r = fakeredis.FakeRedis()
+        [client] = make_clients(fake_wechat, r, 1)
+        manager = client.token_manager
+
+        token, _ = manager.refresh(min_ttl=600)
+        assert manager.refresh(min_ttl=600)[0] == token
+
+        expire_soon(manager, 300)
+        new_token, ttl = manager.refresh(min_ttl=600)
+
+        assert new_token != token
+        assert ttl == 7200
+        assert len(fake_wechat.calls('/cgi-bin/token')) == 2
+        assert registry.gauge("wechat_token_age_seconds", "").value() == 0
+
+    def test_current_reads_token_and_expiry_together(self, fake_wechat):
+        """读取 token 只需一次往返，不再单独查询剩余有效期"""
+        r = fakeredis.FakeRedis()
+        [client] = make_clients(fake_wechat, r, 1)
+        manager = client.token_manager
+        token, _ = manager.refresh()
+
+        def ttl(*args):
+            raise AssertionError("不应单独查询 TTL")
+
+        r.ttl = ttl
+        current, remaining = manager.current()
+        assert current == token
+        assert 7190 < remaining <= 7200
+        assert client.client.access_token == token
+
+    def test_invalid_token_refreshed_once(self, fake_wechat):
+        """token 失效时刷新后重试，已被其他 worker 刷新则直接使用新值"""
+        fake_wechat.users = {"u1": "小明"}
+        r = fakeredis.FakeRedis()
+        first, second = make_clients(fake_wechat, r, 2)
+        assert first.get_user_nickname("u1") == "小明"
+        assert second.get_user_nickname("u1") == "小明"
+        assert len(fake_wechat.calls('/cgi-bin/token')) == 1
+
+        fake_wechat.revoke_tokens()
+        assert first.get_user_nickname("u1") == "小明"
+        assert second.get_user_nickname("u1") == "小明"
+
+        assert len(fake_wechat.calls('/cgi-bin/token')) == 2
+
+    def test_worker_reuses_token_refreshed_elsewhere(self, fake_wechat):
+        """其他 worker 提前刷新后，本进程记录的过期时间临近也不会再次调用 token 接口"""
+        fake_wechat.users = {"u1": "小明"}
+        r = fakeredis.FakeRedis()
+        first, second = make_clients(fake_wechat, r, 2)
+        assert first.get_user_nickname("u1") == "小明"
+        assert len(fake_wechat.calls('/cgi-bin/token')) == 1
+
+        # second 的后台线程在剩余有效期低于阈值时刷新
+        expire_soon(second.token_manager, 300)
+        token, _ = second.token_manager.refresh(min_ttl=600)
+        assert len(fake_wechat.calls('/cgi-bin/token')) == 2
+
+        # first 进程内记录的过期时间即将到达，仍以共享 token 的有效期为准
+        first.client.expires_at = int(time.time()) + 30
+        assert first.get_user_nickname("u1") == "小明"
+
+        assert len(fake_wechat.calls('/cgi-bin/token')) == 2
+        assert fake_wechat.calls('/cgi-bin/user/info')[-1][2]['access_token'] == token
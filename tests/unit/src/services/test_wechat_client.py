@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+微信客户端单元测试（使用本地模拟微信接口）
+"""
+
+import fakeredis
+
+from src.repositories.room_repository import RoomRepository
+from src.repositories.user_repository import UserRepository
+from src.services.game_service import GameService
+from src.services.nickname_service import NicknameService
+from src.services.push_service import PushService
+from src.utils.metrics import MetricsRegistry
+
+
+class TestWeChatClient:
+    """微信客户端测试类"""
+
+    def test_send_text_and_single_lookup(self, fake_wechat):
+        """单条消息与单个用户查询走真实 HTTP 调用"""
+        fake_wechat.users = {"u1": "小明"}
+        client = fake_wechat.make_client()
+
+        assert client.send_text("u1", "你好") is True
+        assert client.send_text("ghost", "你好") is False
+        assert client.get_user_nickname("u1") == "小明"
+        assert client.get_user_nickname("ghost") == ""
+        assert fake_wechat.sent_messages[0]['text'] == {'content': "你好"}
+
+    def test_batch_lookup_in_chunks_of_100(self, fake_wechat):
+        """批量查询每 100 个 openid 调用一次接口"""
+        fake_wechat.users = {f"u{i}": f"昵称{i}" for i in range(150)}
+        client = fake_wechat.make_client()
+
+        nicknames = client.get_user_nicknames([f"u{i}" for i in range(150)])
+
+        assert len(nicknames) == 150
+        assert nicknames["u149"] == "昵称149"
+        batches = fake_wechat.calls('/cgi-bin/user/info/batchget')
+        assert [len(body['user_list']) for _, _, _, body in batches] == [100, 50]
+        assert fake_wechat.calls('/cgi-bin/user/info') == []
+
+    def test_batch_partial_failure(self, fake_wechat):
+        """批量接口因无效 openid 整体失败时逐个查询，未关注的用户没有昵称"""
+        fake_wechat.users = {"u1": "小明", "u2": ""}
+        client = fake_wechat.make_client()
+
+        nicknames = client.get_user_nicknames(["u1", "u2", "ghost"])
+
+        assert nicknames == {"u1": "小明"}
+        assert len(fake_wechat.calls('/cgi-bin/user/info/batchget')) == 1
+        assert len(fake_wechat.calls('/cgi-bin/user/info')) == 3
+
+    def test_game_start_fills_room_nicknames_in_one_request(self, fake_wechat):
+        """开局时房间内缺失的昵称以一次批量请求补全"""
+        players = ["u1", "u2", "u3", "u4"]
+        fake_wechat.users = {openid: "昵称" + openid for openid in players}
+        r = fakeredis.FakeRedis(decode_responses=False)
+        room_repo, user_repo = RoomRepository(r), UserRepository(r)
+        push = PushService(fake_wechat.make_client(r))
+        # 成员在昵称服务启用前加入，只有占位昵称
+        service = GameService(room_repo, user_repo)
+        ok, room_id = service.create_room("u1")
+        for openid in players[1:]:
+            service.join_room(openid, room_id)
+        r.set("nickname:u4", "缓存昵称".encode())
+
+        nicknames = NicknameService(r, push, user_repo, metrics=MetricsRegistry())
+        service = GameService(room_repo, user_repo, push, nicknames=nicknames)
+        ok, _ = service.start_game("u1")
+        nicknames.join()
+
+        assert ok
+        [(_, _, _, body)] = fake_wechat.calls('/cgi-bin/user/info/batchget')
+        assert [item['openid'] for item in body['user_list']] == ["u1", "u2", "u3"]
+        assert fake_wechat.calls('/cgi-bin/user/info') == []
+        assert [user.nickname for user in user_repo.get_many(players[:3]).values()] == ["昵称u1", "昵称u2", "昵称u3"]
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+安全模式消息加解密单元测试（与 wechatpy 的实现互相验证）
+"""
+
+import pytest
+import xmltodict
+from wechatpy.crypto import WeChatCrypto
+from wechatpy.exceptions import InvalidAppIdException, InvalidSignatureException
+
+from src.services.message_service import MessageService
+from src.services.wechat_crypto import MessageCrypto
+
+TOKEN = "token"
+AES_KEY = "abcdefghijklmnopqrstuvwxyz0123456789ABCDEFG"
+APP_ID = "wx0123456789abcdef"
+
+TEXT_XML = (
+    "<xml><ToUserName><![CDATA[gh_1]]></ToUserName><FromUserName><![CDATA[u1]]></FromUserName>"
+    "<CreateTime>1700000000</CreateTime><MsgType><![CDATA[text]]></MsgType>"
+    "<Content><![CDATA[{content}]]></Content><MsgId>1</MsgId></xml>"
+)
+
+
+def encrypted_request(content: str, nonce: str = "nonce", timestamp: str = "1700000000") -> tuple[bytes, str]:
+    """由 wechatpy 生成加密请求体与 msg_signature"""
+    envelope = xmltodict.parse(WeChatCrypto(TOKEN, AES_KEY, APP_ID).encrypt_message(
+        TEXT_XML.format(content=content), nonce, timestamp
+    ))['xml']
+    body = f"<xml><ToUserName><![CDATA[gh_1]]></ToUserName><Encrypt><![CDATA[{envelope['Encrypt']}]]></Encrypt></xml>"
+    return body.encode(), envelope['MsgSignature']
+
+
+class EchoRouter:
+    def route(self, user_id, content):
+        return f"收到：{content}"
+
+
+class TestMessageCrypto:
+    """安全模式消息加解密测试类"""
+
+    def test_decrypts_wechatpy_message(self):
+        """解密 wechatpy 加密的消息"""
+        body, signature = encrypted_request("开始")
+        crypto = MessageCrypto(TOKEN, AES_KEY, APP_ID)
+
+        plaintext = crypto.decrypt_message(body, signature, "1700000000", "nonce")
+
+        assert plaintext.decode() == TEXT_XML.format(content="开始")
+
+    @pytest.mark.parametrize("reply", ["", "短", "中" * 10, "x" * 1000])
+    def test_wechatpy_decrypts_reply(self, reply):
+        """wechatpy 能解密本实现加密的回复，覆盖各种填充长度"""
+        encrypted = MessageCrypto(TOKEN, AES_KEY, APP_ID).encrypt_message(reply, "n1", "1700000001")
+        envelope = xmltodict.parse(encrypted)['xml']
+
+        decrypted = WeChatCrypto(TOKEN, AES_KEY, APP_ID).decrypt_message(
+            encrypted, envelope['MsgSignature'], "1700000001", "n1"
+        )
+
+        assert decrypted == reply
+
+    def test_rejects_bad_signature_and_app_id(self):
+        """签名不一致或 AppID 不属于本公众号时拒绝"""
+        body, signature = encrypted_request("开始")
+
+        with pytest.raises(InvalidSignatureException):
+            MessageCrypto(TOKEN, AES_KEY, APP_ID).decrypt_message(body, "0" * 40, "1700000000", "nonce")
+        with pytest.raises(InvalidAppIdException):
+            MessageCrypto(TOKEN, AES_KEY, "wx_other").decrypt_message(body, signature, "1700000000", "nonce")
+        with pytest.raises(ValueError):
+            MessageCrypto(TOKEN, "short", APP_ID)
+
+    @pytest.mark.parametrize("encrypt", ["<![CDATA[]]>", "<![CDATA[  ]]>", ""])
+    def test_rejects_empty_ciphertext(self, encrypt):
+        """密文为空时按签名错误拒绝"""
+        crypto = MessageCrypto(TOKEN, AES_KEY, APP_ID)
+        body = f"<xml><Encrypt>{encrypt}</Encrypt></xml>".encode()
+        signature = crypto.signature("1700000000", "nonce", "")
+
+        with pytest.raises(InvalidSignatureException):
+            crypto.decrypt_message(body, signature, "1700000000", "nonce")
+
+    def test_rejects_non_ascii_ciphertext(self):
+        """密文或签名含非 ASCII 字符时按签名错误拒绝"""
+        crypto = MessageCrypto(TOKEN, AES_KEY, APP_ID)
+        body = "<xml><Encrypt><![CDATA[密文]]></Encrypt></xml>".encode()
+
+        with pytest.raises(InvalidSignatureException):
+            crypto.decrypt_message(body, "0" * 40, "1700000000", "nonce")
+
+        body, _ = encrypted_request("开始")
+        with pytest.raises(InvalidSignatureException):
+            crypto.decrypt_message(body, "签名", "1700000000", "nonce")
+
+    def test_encrypted_pipeline(self):
+        """加密消息经解密、路由、加密后返回，回复可由 wechatpy 解密"""
+        service = MessageService(game_service=None, token=TOKEN, crypto=MessageCrypto(TOKEN, AES_KEY, APP_ID))
+        service.router = EchoRouter()
+        body, signature = encrypted_request("帮助")
+
+        encrypted = service.handle_encrypted_message(body, signature, "1700000000", "nonce")
+        envelope = xmltodict.parse(encrypted)['xml']
+        reply = WeChatCrypto(TOKEN, AES_KEY, APP_ID).decrypt_message(
+            encrypted, envelope['MsgSignature'], envelope['TimeStamp'], "nonce"
+        )
+
+        assert xmltodict.parse(reply)['xml']['Content'] == "收到：帮助"
+        assert service.handle_encrypted_message(body, "bad", "1700000000", "nonce") is None
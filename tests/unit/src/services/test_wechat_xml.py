@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+微信消息 XML 快速解析与渲染单元测试
+"""
+
+import pytest
+import xmltodict
+from wechatpy import parse_message as parse_with_wechatpy
+from wechatpy.replies import create_reply
+
+from src.services import wechat_xml
+from src.services.wechat_xml import parse_message, render_text_reply
+
+TEXT_XML = (
+    "<xml><ToUserName><![CDATA[gh_1]]></ToUserName><FromUserName><![CDATA[u1]]></FromUserName>"
+    "<CreateTime>1700000000</CreateTime><MsgType><![CDATA[text]]></MsgType>"
+    "<Content><![CDATA[{content}]]></Content><MsgId>24123456789012345</MsgId></xml>"
+)
+EVENT_XML = (
+    "<xml><ToUserName><![CDATA[gh_1]]></ToUserName><FromUserName><![CDATA[u1]]></FromUserName>"
+    "<CreateTime>1700000000</CreateTime><MsgType><![CDATA[event]]></MsgType>"
+    "<Event><![CDATA[{event}]]></Event>{extra}</xml>"
+)
+
+
+class TestWeChatXml:
+    """快速解析与渲染测试类"""
+
+    @pytest.mark.parametrize("xml", [
+        TEXT_XML.format(content="加入1234"),
+        TEXT_XML.format(content=" 开始 \n"),
+        EVENT_XML.format(event="subscribe", extra=""),
+        EVENT_XML.format(event="CLICK", extra="<EventKey><![CDATA[menu]]></EventKey>"),
+    ])
+    def test_matches_wechatpy(self, xml):
+        """文本消息与普通事件的解析结果与 wechatpy 一致"""
+        data = xml.encode('utf-8')
+        fast = parse_message(data)
+        expected = parse_with_wechatpy(data)
+
+        for name in ('type', 'source', 'target', 'time', 'id'):
+            assert getattr(fast, name) == getattr(expected, name)
+        if fast.type == 'text':
+            assert fast.content == expected.content
+        else:
+            assert fast.event == expected.event
+
+    def test_plain_text_values_unescaped(self):
+        """非 CDATA 的值按 XML 实体解码"""
+        data = (
+            b"<xml><ToUserName>gh_1</ToUserName><FromUserName>u1</FromUserName><CreateTime>1</CreateTime>"
+            b"<MsgType>text</MsgType><Content>a &amp; b &lt;c&gt;</Content><MsgId>7</MsgId></xml>"
+        )
+
+        assert parse_message(data).content == "a & b <c>"
+
+    @pytest.mark.parametrize("xml", [
+        "<xml><ToUserName>gh_1</ToUserName><FromUserName>u1</FromUserName><CreateTime>1</CreateTime>"
+        "<MsgType>image</MsgType><PicUrl>http://x</PicUrl><MsgId>7</MsgId></xml>",
+        EVENT_XML.format(event="subscribe", extra="<EventKey><![CDATA[qrscene_1]]></EventKey>"),
+        TEXT_XML.format(content="a]]]]><![CDATA[>b"),
+        "<xml><Encrypt><![CDATA[abc]]></Encrypt></xml>",
+        "",
+    ])
+    def test_falls_back_to_wechatpy(self, xml):
+        """其他消息类型、扫码关注、拆分的 CDATA 与无法识别的格式返回 None"""
+        assert parse_message(xml.encode('utf-8')) is None
+
+    def test_render_matches_wechatpy(self, monkeypatch):
+        """文本回复与 wechatpy 渲染结果一致"""
+        monkeypatch.setattr(wechat_xml.time, 'time', lambda: 1700000001)
+        data = TEXT_XML.format(content="帮助").encode('utf-8')
+        reply = create_reply("房间号：1234\n请输入'开始'", parse_with_wechatpy(data))
+        reply.time = 1700000001
+
+        assert render_text_reply(parse_message(data), "房间号：1234\n请输入'开始'") == reply.render()
+
+    def test_render_escapes_cdata_terminator(self):
+        """回复内容中的 ]]> 不会截断 CDATA"""
+        msg = parse_message(TEXT_XML.format(content="帮助").encode('utf-8'))
+
+        rendered = xmltodict.parse(render_text_reply(msg, "a]]>b"))['xml']
+
+        assert rendered['Content'] == "a]]>b"
+        assert rendered['ToUserName'] == "u1"
+        assert rendered['FromUserName'] == "gh_1"
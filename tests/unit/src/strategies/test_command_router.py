@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 
+import time
+
 from src.config.messages import ERROR_MESSAGES, HELP_MESSAGES
-from src.strategies.commands import CommandRouter
+from src.strategies.commands import CommandIndex, CommandRouter, CommandStrategy
+from src.utils.deadline import Deadline
 
 
 class StubGameService:
@@ -45,3 +48,56 @@ def test_unknown_command():
     assert ERROR_MESSAGES["UNKNOWN_COMMAND"] in resp
     assert "房间号：1234" in resp
 
+
+
+def test_command_name():
+    router = CommandRouter(StubGameService())
+    assert router.command_name(" 开始 ") == "start_game"
+    assert router.command_name("加入1234") == "join_room"
+    assert router.command_name("t3") == "vote"
+    assert router.command_name("随便说说") is None
+
+
+def test_appends_skipped_near_deadline():
+    router = CommandRouter(StubGameService())
+    with Deadline(0.01):
+        time.sleep(0.02)
+        resp = router.route("u1", "t1")
+    assert resp == "投票成功"
+
+
+def test_prefix_arguments_validated():
+    router = CommandRouter(StubGameService())
+    assert router.command_name("t12") == "vote"
+    assert router.command_name("t") is None
+    assert router.command_name("t1a") is None
+    assert router.command_name("加入") == "join_room"
+    assert router.route("u1", "加入").startswith("请输入房间号")
+
+
+class SynonymCommand(CommandStrategy):
+    def __init__(self, name, aliases=(), prefixes=()):
+        self.name = name
+        self.aliases = aliases
+        self.prefixes = prefixes
+
+
+class KeywordCommand(CommandStrategy):
+    name = "keyword"
+
+    def matches(self, content):
+        return "卧底" in content
+
+
+def test_index_scales_to_thousands_of_aliases():
+    synonyms = SynonymCommand("synonym", aliases=tuple(f"别名{i}" for i in range(5000)))
+    prefixed = SynonymCommand("prefixed", prefixes=tuple(f"p{i}-" for i in range(5000)))
+    longer = SynonymCommand("longer", prefixes=("p1-x",))
+    index = CommandIndex([synonyms, prefixed, longer, KeywordCommand()])
+
+    assert index.match("别名4999") is synonyms
+    assert index.match("p4999-abc") is prefixed
+    assert index.match("p1-xyz") is longer
+    assert index.match("p1-abc") is prefixed
+    assert index.match("谁是卧底呢").name == "keyword"
+    assert index.match("p5000-") is None
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+请求截止时间单元测试
+"""
+
+from src.utils.deadline import Deadline, has_budget, remaining
+from src.utils.metrics import registry
+
+
+def skipped(stage: str) -> float:
+    return registry.counter("request_stage_skipped_total", "").value({'stage': stage})
+
+
+class TestDeadline:
+    """请求截止时间测试类"""
+
+    def test_no_deadline_outside_request(self):
+        """请求之外及预算为 0 时不限制"""
+        assert remaining() is None
+        assert has_budget("status_append", 100.0)
+        with Deadline(0):
+            assert remaining() is None
+
+    def test_budget_checked_and_reset(self):
+        """剩余时间不足时跳过并计数，退出后恢复"""
+        before = skipped("nickname_lookup")
+        with Deadline(1.0):
+            assert 0.9 < remaining() <= 1.0
+            assert has_budget("nickname_lookup", 0.5)
+            assert not has_budget("nickname_lookup", 2.0)
+        assert remaining() is None
+        assert skipped("nickname_lookup") == before + 1
+
+    def test_reserve_excluded_from_budget(self):
+        """预留给写回的时间不计入可选步骤的剩余时间"""
+        with Deadline(1.0, reserve_seconds=0.4):
+            assert 0.5 < remaining() <= 0.6
+            assert not has_budget("status_push", 0.8)
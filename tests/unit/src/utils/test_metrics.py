@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+进程内指标单元测试
+"""
+
+from src.utils.metrics import MetricsRegistry
+
+
+class TestMetrics:
+    """指标测试类"""
+
+    def test_render_prometheus_text(self):
+        """导出 Prometheus 文本格式"""
+        metrics = MetricsRegistry()
+        metrics.counter("push_sent_total", "发送成功").inc()
+        metrics.counter("push_sent_total", "发送成功").inc(2, labels={'kind': "text"})
+        metrics.gauge("push_queue_depth", "队列深度", callback=lambda: 7)
+        latency = metrics.histogram("push_send_seconds", "耗时", buckets=(0.1, 1.0))
+        latency.observe(0.05)
+        latency.observe(0.5)
+        latency.observe(5)
+
+        text = metrics.render()
+
+        assert "# TYPE push_sent_total counter" in text
+        assert "push_sent_total 1.0" in text
+        assert 'push_sent_total{kind="text"} 2.0' in text
+        assert "push_queue_depth 7.0" in text
+        assert 'push_send_seconds_bucket{le="0.1"} 1' in text
+        assert 'push_send_seconds_bucket{le="1.0"} 2' in text
+        assert 'push_send_seconds_bucket{le="+Inf"} 3' in text
+        assert "push_send_seconds_count 3" in text